@@ -1,23 +1,220 @@
 
 import discord
 from discord.ext import commands
+from discord import app_commands
 import aiohttp
 import asyncio
 from datetime import datetime
 import json
-from typing import Dict, Any
+import codecs
+from typing import Dict, Any, Optional, Tuple, List, Callable, Awaitable, Literal
 import re
 import urllib.parse
 import random
 import string
 import os  # <- Hozzáadva
+import time
+from collections import OrderedDict, deque
+import csv
+import io
+import gzip
+import tempfile
+import logging
+import logging.handlers
+import queue
+import sys
+import atexit
+import sqlite3
+import hashlib
+import math
+import secrets
+from concurrent.futures import ThreadPoolExecutor
+import functools
+import itertools
+import signal
+import threading
+import traceback
+from contextlib import contextmanager, asynccontextmanager
+import contextvars
+from aiohttp import web
+
+try:
+    import orjson  # opcionális, gyorsabb JSON dekóder
+except ImportError:
+    orjson = None
 
 # Bot setup
-intents = discord.Intents.default()
-intents.message_content = True
-intents.members = True
+# Slash command config
+SLASH_CONFIG = {
+    # a '!' parancsokhoz kell; slash parancsokkal kikapcsolható (DISCORD_MESSAGE_CONTENT=0)
+    'message_content': os.environ.get("DISCORD_MESSAGE_CONTENT", "1") == "1",
+    # a legutóbb szinkronizált parancsfa hash-e
+    'sync_state_file': os.environ.get("SLASH_SYNC_STATE_FILE", "slash_sync.json"),
+    # guild-re szinkronizálás (azonnali), különben globális
+    'guild_id': int(os.environ.get("SLASH_GUILD_ID", "0")) or None,
+    'force_sync': os.environ.get("SLASH_FORCE_SYNC", "0") == "1",
+}
+
+# Gateway config
+GATEWAY_CONFIG = {
+    # full: minden alap intent + members, teljes tag-cache és chunkolás
+    # lean: csak guilds/messages, nincs tag-cache és indulási chunkolás
+    'mode': os.environ.get("GATEWAY_MODE", "full").lower(),
+    # üzenet-cache mérete (0 = mód szerinti alapérték)
+    'max_messages': int(os.environ.get("GATEWAY_MAX_MESSAGES", "0")),
+}
+
+def build_gateway_options(mode: str, message_content: bool) -> Dict[str, Any]:
+    """Client kwargs (intents, member cache, chunking, message cache) for a gateway mode"""
+    if mode == 'lean':
+        # a jogosultságot az interakció/üzenet saját tag-adatából nézzük, cache nem kell
+        intents = discord.Intents.none()
+        intents.guilds = True
+        intents.guild_messages = True
+        intents.message_content = message_content
+        return {
+            'intents': intents,
+            'member_cache_flags': discord.MemberCacheFlags.none(),
+            'chunk_guilds_at_startup': False,
+            'max_messages': GATEWAY_CONFIG['max_messages'] or 100,
+        }
+    
+    intents = discord.Intents.default()
+    intents.message_content = message_content
+    intents.members = True
+    return {
+        'intents': intents,
+        'max_messages': GATEWAY_CONFIG['max_messages'] or 1000,
+    }
+
+gateway_options = build_gateway_options(GATEWAY_CONFIG['mode'], SLASH_CONFIG['message_content'])
+
+# Cluster config
+CLUSTER_CONFIG = {
+    # AutoShardedBot; a SHARD_* változók csak ekkor számítanak
+    'enabled': os.environ.get("CLUSTER_MODE", "0") == "1",
+    'shard_count': int(os.environ.get("SHARD_COUNT", "0")) or None,  # None = Discord ajánlása
+    'shard_ids': os.environ.get("SHARD_IDS", ""),  # "0-3" vagy "0,2,4"; üres = az összes
+    # csak a 0. cluster futtatja a globális feladatokat (parancs szinkron, mirror szinkron)
+    'cluster_id': int(os.environ.get("CLUSTER_ID", "0")),
+    # >1: ez a folyamat koordinátor, ennyi bot folyamatot indít és állít le
+    'processes': int(os.environ.get("CLUSTER_PROCESSES", "1")),
+    'identify_interval': float(os.environ.get("CLUSTER_IDENTIFY_INTERVAL", "5")),
+    'shutdown_timeout': float(os.environ.get("CLUSTER_SHUTDOWN_TIMEOUT", "30")),
+    # leálláskor ennyit várunk a folyamatban lévő KeyAuth kérésekre
+    'drain_timeout': float(os.environ.get("SHUTDOWN_DRAIN_TIMEOUT", "10")),
+}
+
+def parse_shard_ids(spec: str) -> Optional[List[int]]:
+    """'0-3' / '0,2,4' / '0-1,4' -> shard id list ('' = None, all shards)"""
+    shard_ids = []
+    for part in filter(None, (p.strip() for p in spec.split(','))):
+        if '-' in part:
+            first, last = part.split('-', 1)
+            shard_ids.extend(range(int(first), int(last) + 1))
+        else:
+            shard_ids.append(int(part))
+    return sorted(set(shard_ids)) or None
+
+def build_shard_options() -> Dict[str, Any]:
+    if not CLUSTER_CONFIG['enabled']:
+        return {}
+    shard_ids = parse_shard_ids(CLUSTER_CONFIG['shard_ids'])
+    shard_count = CLUSTER_CONFIG['shard_count']
+    if shard_ids is not None:
+        if shard_count is None:
+            raise ValueError("SHARD_IDS requires SHARD_COUNT")
+        if shard_ids[-1] >= shard_count:
+            raise ValueError(f"SHARD_IDS {CLUSTER_CONFIG['shard_ids']} out of range for SHARD_COUNT {shard_count}")
+    return {'shard_ids': shard_ids, 'shard_count': shard_count}
 
-bot = commands.Bot(command_prefix='!', intents=intents)
+def is_primary_cluster() -> bool:
+    return CLUSTER_CONFIG['cluster_id'] == 0
+
+BotBase = commands.AutoShardedBot if CLUSTER_CONFIG['enabled'] else commands.Bot
+
+class CorvusBot(BotBase):
+    """Bot with KeyAuth HTTP client lifecycle tied to setup/shutdown"""
+    metrics_runner = None
+    warmup_task = None
+    jobs = None
+    watchdog = None
+    closing = False
+    
+    async def setup_hook(self):
+        if WATCHDOG_CONFIG['enabled']:
+            self.watchdog = LoopWatchdog(WATCHDOG_CONFIG, self.gateway_heartbeat_interval)
+            self.watchdog.start()
+        log.info("gateway mode", extra={
+            'mode': GATEWAY_CONFIG['mode'], 'intents': self.intents.value, 'max_messages': self._connection.max_messages,
+            'cluster': CLUSTER_CONFIG['cluster_id'], 'shard_ids': self.shard_ids, 'shard_count': self.shard_count
+        })
+        try:
+            # Railway / koordinátor SIGTERM-et küld: rendezett leállás
+            asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(self.close()))
+        except (NotImplementedError, RuntimeError):
+            pass
+        await keyauth.open()
+        log.info("keyauth connection pool opened", extra={'limit_per_host': HTTP_POOL_CONFIG['limit_per_host']})
+        if WARMUP_CONFIG['connections'] > 0:
+            # a gateway csatlakozással párhuzamosan fut, nem késlelteti a bejelentkezést
+            self.warmup_task = asyncio.create_task(self.warm_up_keyauth())
+        self.metrics_runner = await start_metrics_server()
+        if KEYGEN_CONFIG['issued_file'] and os.path.exists(KEYGEN_CONFIG['issued_file']):
+            loaded = await asyncio.to_thread(issued_keys.load_file, KEYGEN_CONFIG['issued_file'])
+            log.info("issued key index loaded", extra={'keys': loaded, 'index': issued_keys.mode})
+        if MIRROR_CONFIG['enabled']:
+            keyauth.mirror = LicenseMirror(MIRROR_CONFIG['path'])
+            await keyauth.mirror.open()
+            if is_primary_cluster():
+                keyauth.mirror.start(keyauth, MIRROR_CONFIG['sync_interval'])
+        if JOB_CONFIG['enabled']:
+            self.jobs = JobQueue(JOB_CONFIG['path'], JOB_KINDS, BULK_CONFIG['progress_interval'])
+            self.jobs.on_progress = on_job_progress
+            self.jobs.on_finish = on_job_finish
+            # a félbehagyott jobokat csak egy folyamat veheti át
+            await self.jobs.open(recover=is_primary_cluster())
+            if is_primary_cluster():
+                self.jobs.start(JOB_CONFIG['workers'])
+        if is_primary_cluster():
+            await sync_command_tree(self)
+    
+    def gateway_heartbeat_interval(self) -> Optional[float]:
+        """Heartbeat interval from the gateway HELLO (sharded mode: the first connected shard)"""
+        shard_ids = list(self.shards) if isinstance(self, commands.AutoShardedBot) else [None]
+        for shard_id in shard_ids:
+            keep_alive = getattr(self._get_websocket(shard_id=shard_id), '_keep_alive', None)
+            if keep_alive:
+                return keep_alive.interval
+        return None
+    
+    async def warm_up_keyauth(self):
+        connections = min(WARMUP_CONFIG['connections'], HTTP_POOL_CONFIG['limit_per_host'])
+        timing = await keyauth.warm_up(connections)
+        level = logging.WARNING if timing['errors'] else logging.INFO
+        log.log(level, "keyauth warm-up finished", extra=timing)
+        keyauth.start_keepalive(WARMUP_CONFIG['ping_interval'], connections)
+    
+    async def close(self):
+        """Shutdown order: job workers -> drain KeyAuth calls -> gateway + Discord HTTP -> KeyAuth pool/mirror -> metrics"""
+        if self.closing:
+            return
+        self.closing = True
+        if self.warmup_task:
+            self.warmup_task.cancel()
+        if self.jobs:
+            # a megkezdett elemek befejeződnek, a többi újraindítás után folytatódik
+            await self.jobs.stop(CLUSTER_CONFIG['drain_timeout'])
+        drained = await keyauth.drain(CLUSTER_CONFIG['drain_timeout'])
+        log.info("shutting down", extra={'cluster': CLUSTER_CONFIG['cluster_id'], 'drained': drained})
+        await super().close()
+        if self.jobs:
+            await self.jobs.close()
+        await keyauth.close()
+        if self.metrics_runner:
+            await self.metrics_runner.cleanup()
+        if self.watchdog:
+            self.watchdog.stop()
 
 # KeyAuth API config
 KEYAUTH_CONFIG = {
@@ -26,19 +223,1355 @@ KEYAUTH_CONFIG = {
     'application_name': 'igen'
 }
 
+# Logging config
+LOG_CONFIG = {
+    'level': os.environ.get("LOG_LEVEL", "INFO").upper(),
+    'format': os.environ.get("LOG_FORMAT", "json"),  # json / text
+    # DEBUG szinten a nyers válaszok ekkora hányadát naplózzuk (0.0 - 1.0)
+    'body_sample_rate': float(os.environ.get("LOG_BODY_SAMPLE_RATE", "0.0")),
+}
+
+log = logging.getLogger("corvus")
+
+# Titkok és licenc kulcsok kitakarása a naplókból
+_SECRET_PATTERNS = [
+    (re.compile(r'(sellerkey=)[^&\s]+', re.IGNORECASE), r'\1***'),
+    (re.compile(r'\b(Corvus-[A-Za-z0-9]{2})[A-Za-z0-9]{2}-[A-Za-z0-9]{4}-[A-Za-z0-9]{3}\b'), r'\1**-****-***'),
+]
+
+def redact(text: str) -> str:
+    if not text:
+        return text
+    text = text.replace(KEYAUTH_CONFIG['seller_key'], '***')
+    for pattern, replacement in _SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+_LOG_RECORD_FIELDS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+class StructuredFormatter(logging.Formatter):
+    """JSON (or key=value text) lines with extra fields, redacted; runs on the listener thread"""
+    def __init__(self, fmt_type: str = "json"):
+        super().__init__()
+        self.fmt_type = fmt_type
+    
+    def format(self, record: logging.LogRecord) -> str:
+        fields = {k: v for k, v in vars(record).items() if k not in _LOG_RECORD_FIELDS}
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'msg': record.getMessage(),
+            **fields,
+        }
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc'] = record.exc_text
+        if self.fmt_type == "json":
+            return redact(json.dumps(entry, default=str, ensure_ascii=False))
+        extras = ' '.join(f"{k}={v}" for k, v in fields.items())
+        line = f"{entry['ts']} {record.levelname:<7} {entry['msg']} {extras}".rstrip()
+        if 'exc' in entry:
+            line += f"\n{entry['exc']}"
+        return redact(line)
+
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+def setup_logging():
+    """Route the corvus logger through a queue so the event loop never blocks on stdout"""
+    global _log_listener
+    if _log_listener:
+        return
+    log_queue = queue.SimpleQueue()
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(StructuredFormatter(LOG_CONFIG['format']))
+    _log_listener = logging.handlers.QueueListener(log_queue, stream_handler, respect_handler_level=False)
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    for logger, level in ((log, LOG_CONFIG['level']), (logging.getLogger("discord"), logging.INFO)):
+        logger.addHandler(queue_handler)
+        logger.setLevel(level)
+        logger.propagate = False
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+def log_response_body(action: str, status: int, body: str):
+    """Sampled DEBUG log of raw response bodies"""
+    if LOG_CONFIG['body_sample_rate'] <= 0 or not log.isEnabledFor(logging.DEBUG):
+        return
+    if random.random() < LOG_CONFIG['body_sample_rate']:
+        log.debug("keyauth response body", extra={'action': action, 'status': status, 'body': body[:2000]})
+
+# Prometheus metrics endpoint (METRICS_PORT üresen hagyva = kikapcsolva)
+METRICS_CONFIG = {
+    'host': os.environ.get("METRICS_HOST", "0.0.0.0"),
+    'port': int(os.environ.get("METRICS_PORT", "0") or 0),
+}
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+def _format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    if not labels:
+        return ""
+    escaped = (
+        f'{k}="{str(v).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), chr(92) + "n")}"'
+        for k, v in labels
+    )
+    return "{" + ",".join(escaped) + "}"
+
+class Metrics:
+    """Minimal in-process registry rendering Prometheus text format"""
+    def __init__(self):
+        self._meta: Dict[str, Tuple[str, str]] = {}
+        self._values: Dict[str, Dict[Tuple, Any]] = {}
+        self._collectors: List[Callable[[], None]] = []
+    
+    def describe(self, name: str, kind: str, help_text: str):
+        self._meta[name] = (kind, help_text)
+        self._values.setdefault(name, {})
+    
+    def add_collector(self, collector: Callable[[], None]):
+        """Callback run right before rendering, to copy external stats into gauges"""
+        self._collectors.append(collector)
+    
+    def inc(self, name: str, value: float = 1, **labels):
+        series = self._values.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + value
+    
+    def set(self, name: str, value: float, **labels):
+        self._values.setdefault(name, {})[tuple(sorted(labels.items()))] = value
+    
+    def observe(self, name: str, value: float, **labels):
+        series = self._values.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        hist = series.get(key)
+        if hist is None:
+            hist = series[key] = [[0] * len(LATENCY_BUCKETS), 0.0, 0]
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if value <= bound:
+                hist[0][i] += 1
+        hist[1] += value
+        hist[2] += 1
+    
+    @contextmanager
+    def time(self, name: str, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+    
+    def render(self) -> str:
+        for collector in self._collectors:
+            try:
+                collector()
+            except Exception:
+                log.exception("metrics collector failed")
+        lines = []
+        for name, series in self._values.items():
+            kind, help_text = self._meta.get(name, ('untyped', ''))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series.items():
+                if kind == 'histogram':
+                    buckets, total, count = value
+                    for bound, bucket_count in zip(LATENCY_BUCKETS, buckets):
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', str(bound)),))} {bucket_count}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {total}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {count}")
+                else:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics()
+metrics.describe('keyauth_request_duration_seconds', 'histogram', 'KeyAuth seller API attempt latency by action')
+metrics.describe('keyauth_requests_total', 'counter', 'KeyAuth seller API attempts by action and outcome')
+metrics.describe('keyauth_requests_in_flight', 'gauge', 'KeyAuth seller API requests currently running')
+metrics.describe('keyauth_connect_duration_seconds', 'histogram', 'New KeyAuth connection setup time (dns / connect incl. TLS)')
+metrics.describe('keyauth_schedule_wait_seconds', 'histogram', 'Time spent waiting for an upstream slot')
+metrics.describe('keyauth_lookup_saved_seconds', 'histogram', 'Key info lookup time saved against verify-then-fetchuser')
+metrics.describe('keyauth_lookups_total', 'counter', 'Key info lookups by mode and answering endpoint')
+metrics.describe('discord_handler_duration_seconds', 'histogram', 'Command and modal handler duration')
+metrics.describe('discord_api_duration_seconds', 'histogram', 'Discord REST call latency by operation')
+metrics.describe('discord_api_requests_total', 'counter', 'Discord REST calls by operation and status')
+
+# Discord REST útvonal -> művelet név (defer/send_message/send_modal mind interaction callback)
+_DISCORD_OPS = (
+    (re.compile(r'/interactions/\d+/[^/]+/callback$'), 'interaction_response'),
+    (re.compile(r'/webhooks/\d+/[^/]+/messages/'), 'followup_edit'),
+    (re.compile(r'/webhooks/\d+/[^/]+$'), 'followup'),
+    (re.compile(r'/channels/\d+/messages/\d+$'), 'message_edit'),
+    (re.compile(r'/channels/\d+/messages$'), 'message_send'),
+)
+
+def discord_op_name(method: str, path: str) -> str:
+    for pattern, name in _DISCORD_OPS:
+        if pattern.search(path):
+            return name
+    return 'other'
+
+def build_discord_http_trace() -> aiohttp.TraceConfig:
+    """Times every Discord REST call (interaction callbacks, followups, sends and edits)"""
+    trace_config = aiohttp.TraceConfig()
+    
+    async def on_request_start(session, ctx, params):
+        ctx.started = time.perf_counter()
+    
+    async def on_request_end(session, ctx, params):
+        op = discord_op_name(params.method, params.url.path)
+        metrics.observe('discord_api_duration_seconds', time.perf_counter() - ctx.started, op=op)
+        metrics.inc('discord_api_requests_total', op=op, status=str(params.response.status))
+    
+    async def on_request_exception(session, ctx, params):
+        op = discord_op_name(params.method, params.url.path)
+        metrics.inc('discord_api_requests_total', op=op, status='error')
+    
+    trace_config.on_request_start.append(on_request_start)
+    trace_config.on_request_end.append(on_request_end)
+    trace_config.on_request_exception.append(on_request_exception)
+    return trace_config
+
+def timed_handler(kind: str, name: Optional[str] = None):
+    """Decorator recording handler duration: modal on_submit methods are labelled by their class,
+    slash command callbacks by the given command name"""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(first, *args, **kwargs):
+            with metrics.time('discord_handler_duration_seconds', kind=kind, handler=name or type(first).__name__):
+                return await func(first, *args, **kwargs)
+        return wrapper
+    return decorator
+
+async def start_metrics_server() -> Optional[web.AppRunner]:
+    if not METRICS_CONFIG['port']:
+        return None
+    
+    async def handle_metrics(request):
+        return web.Response(text=metrics.render(), content_type='text/plain', charset='utf-8',
+                            headers={'X-Content-Type-Options': 'nosniff'})
+    
+    app = web.Application()
+    app.router.add_get('/metrics', handle_metrics)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    # egy gépen futó cluster folyamatok külön portot kapnak
+    port = METRICS_CONFIG['port'] + CLUSTER_CONFIG['cluster_id']
+    await web.TCPSite(runner, METRICS_CONFIG['host'], port).start()
+    log.info("metrics endpoint started", extra={'port': port})
+    return runner
+
+# Event loop watchdog (opt-in): loop lag mérés, stall esetén stack minta + slow callback figyelés
+WATCHDOG_CONFIG = {
+    'enabled': os.environ.get("LOOP_WATCHDOG", "0") == "1",
+    'interval': float(os.environ.get("LOOP_WATCHDOG_INTERVAL", "0.5")),
+    # ennél hosszabb blokkolás stall-nak számít
+    'stall_threshold': float(os.environ.get("LOOP_STALL_THRESHOLD", "0.25")),
+    # stall után ennyi ideig marad bekapcsolva az asyncio slow callback figyelés (debug mód)
+    'debug_window': float(os.environ.get("LOOP_SLOW_CALLBACK_WINDOW", "60")),
+    # figyelmeztetés, ha a blokkolás eléri a gateway heartbeat intervallum ekkora részét
+    'heartbeat_warn_ratio': float(os.environ.get("LOOP_HEARTBEAT_WARN_RATIO", "0.5")),
+    'history': int(os.environ.get("LOOP_STALL_HISTORY", "20")),
+    'stack_depth': 15,
+}
+
+# Discord jelenleg ~41.25 mp-et küld a HELLO-ban, amíg nem ismert, ezzel számolunk
+DEFAULT_HEARTBEAT_INTERVAL = 41.25
+
+class SlowCallbackCapture(logging.Filter):
+    """Takes asyncio's 'Executing <handle> took N seconds' warnings away from the stderr fallback"""
+    def __init__(self, watchdog: "LoopWatchdog"):
+        super().__init__()
+        self.watchdog = watchdog
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not (isinstance(record.msg, str) and record.msg.startswith('Executing ')
+                and isinstance(record.args, tuple) and len(record.args) == 2):
+            return True
+        handle, duration = record.args
+        self.watchdog.record_slow_callback(str(handle), float(duration))
+        return False
+
+class LoopWatchdog:
+    """Measures loop lag from inside the loop; a helper thread notices stalls while the loop is
+    still blocked and samples the stack of whatever is running on it"""
+    def __init__(self, config: Dict[str, Any], heartbeat_interval: Callable[[], Optional[float]] = None):
+        self.interval = config['interval']
+        self.threshold = config['stall_threshold']
+        self.debug_window = config['debug_window']
+        self.warn_ratio = config['heartbeat_warn_ratio']
+        self.stack_depth = config['stack_depth']
+        self.heartbeat_interval = heartbeat_interval or (lambda: None)
+        self.stalls: deque = deque(maxlen=config['history'])
+        self.slow_callbacks: deque = deque(maxlen=config['history'])
+        self.lags: deque = deque(maxlen=240)
+        self.stats = {'samples': 0, 'stalls': 0, 'heartbeat_warnings': 0, 'slow_callbacks': 0, 'max_lag': 0.0}
+        self.debug_until = 0.0
+        self.last_heartbeat_interval = DEFAULT_HEARTBEAT_INTERVAL
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+        self._last_tick = 0.0
+        self._current: Optional[Dict[str, Any]] = None  # a szál által észlelt, még tartó stall
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._filter: Optional[SlowCallbackCapture] = None
+        self._owns_debug = False
+    
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread_id = threading.get_ident()
+        self._last_tick = time.monotonic()
+        self._filter = SlowCallbackCapture(self)
+        logging.getLogger('asyncio').addFilter(self._filter)
+        self._task = asyncio.create_task(self._tick())
+        self._thread = threading.Thread(target=self._monitor, name="loop-watchdog", daemon=True)
+        self._thread.start()
+        log.info("loop watchdog started", extra={'interval_s': self.interval, 'threshold_s': self.threshold})
+    
+    def stop(self):
+        self._stopped.set()
+        if self._task:
+            self._task.cancel()
+        if self._filter:
+            logging.getLogger('asyncio').removeFilter(self._filter)
+        self._set_slow_callback_detection(False)
+    
+    def _sample(self) -> Dict[str, Any]:
+        """Stack of the loop thread and the task it is running (called from the watchdog thread)"""
+        frame = sys._current_frames().get(self._loop_thread_id)
+        stack = traceback.format_list(traceback.extract_stack(frame)[-self.stack_depth:]) if frame else []
+        task = asyncio.current_task(self._loop)
+        coro = task.get_coro() if task else None
+        return {
+            'task': task.get_name() if task else None,
+            'coro': getattr(coro, '__qualname__', None) or (repr(coro) if coro else None),
+            'stack': ''.join(stack),
+        }
+    
+    def _monitor(self):
+        while not self._stopped.wait(self.interval / 2):
+            blocked = time.monotonic() - self._last_tick - self.interval
+            if blocked < self.threshold:
+                continue
+            with self._lock:
+                stall = self._current
+                if stall is None:
+                    stall = self._current = {'started': time.time() - blocked, 'heartbeat_warned': False,
+                                             **self._sample()}
+                    log.warning("event loop stalled", extra={
+                        'blocked_ms': round(blocked * 1000), 'task': stall['task'], 'coro': stall['coro'],
+                        'stack': stall['stack'],
+                    })
+                stall['blocked'] = blocked
+                if not stall['heartbeat_warned'] and blocked >= self.last_heartbeat_interval * self.warn_ratio:
+                    # friss minta: ami most blokkol, az veszélyezteti a heartbeatet
+                    stall.update(self._sample(), heartbeat_warned=True)
+                    self.stats['heartbeat_warnings'] += 1
+                    log.error("event loop blocked close to the gateway heartbeat interval", extra={
+                        'blocked_ms': round(blocked * 1000), 'heartbeat_interval_s': self.last_heartbeat_interval,
+                        'task': stall['task'], 'coro': stall['coro'], 'stack': stall['stack'],
+                    })
+    
+    async def _tick(self):
+        while True:
+            started = time.monotonic()
+            self._last_tick = started
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_tick = now
+            self._record_lag(max(0.0, now - started - self.interval), now)
+    
+    def _record_lag(self, lag: float, now: float):
+        self.stats['samples'] += 1
+        self.stats['max_lag'] = max(self.stats['max_lag'], lag)
+        self.lags.append(lag)
+        metrics.observe('event_loop_lag_seconds', lag)
+        self.last_heartbeat_interval = self.heartbeat_interval() or self.last_heartbeat_interval
+        
+        with self._lock:
+            stall, self._current = self._current, None
+        if stall is None and lag >= self.threshold:
+            # két vizsgálat közé esett, a stack már nem elérhető
+            stall = {'started': time.time() - lag, 'heartbeat_warned': False, 'task': None, 'coro': None, 'stack': ''}
+        if stall is not None:
+            stall['duration'] = lag
+            self.stalls.append(stall)
+            self.stats['stalls'] += 1
+            metrics.inc('event_loop_stalls_total')
+            log.warning("event loop stall ended", extra={
+                'duration_ms': round(lag * 1000), 'task': stall['task'], 'coro': stall['coro']
+            })
+            self._set_slow_callback_detection(True)
+            self.debug_until = now + self.debug_window
+        elif self.debug_until and now >= self.debug_until:
+            self._set_slow_callback_detection(False)
+    
+    def _set_slow_callback_detection(self, enabled: bool):
+        """asyncio debug mode reports every callback slower than the stall threshold"""
+        if enabled and not self._loop.get_debug():
+            self._loop.slow_callback_duration = self.threshold
+            self._loop.set_debug(True)
+            self._owns_debug = True
+        elif not enabled and self._owns_debug:
+            # csak a saját bekapcsolásunkat vonjuk vissza (PYTHONASYNCIODEBUG maradjon)
+            self._loop.set_debug(False)
+            self._owns_debug = False
+            self.debug_until = 0.0
+    
+    def record_slow_callback(self, handle: str, duration: float):
+        self.slow_callbacks.append({'when': time.time(), 'handle': handle[:500], 'duration': duration})
+        self.stats['slow_callbacks'] += 1
+        metrics.inc('event_loop_slow_callbacks_total')
+        log.warning("slow callback", extra={'duration_ms': round(duration * 1000), 'handle': handle[:500]})
+    
+    def lag_percentile(self, pct: float) -> float:
+        ordered = sorted(self.lags)
+        if not ordered:
+            return 0.0
+        return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+metrics.describe('event_loop_lag_seconds', 'histogram', 'Event loop scheduling lag sampled by the watchdog')
+metrics.describe('event_loop_stalls_total', 'counter', 'Event loop stalls above LOOP_STALL_THRESHOLD')
+metrics.describe('event_loop_slow_callbacks_total', 'counter', 'Callbacks slower than the stall threshold (asyncio debug)')
+
+# HTTP connection pool config (Railway változókkal felülírható)
+HTTP_POOL_CONFIG = {
+    'limit': int(os.environ.get("KEYAUTH_POOL_LIMIT", "20")),
+    'limit_per_host': int(os.environ.get("KEYAUTH_POOL_PER_HOST", "10")),
+    'ttl_dns_cache': int(os.environ.get("KEYAUTH_DNS_TTL", "300")),
+    'keepalive_timeout': float(os.environ.get("KEYAUTH_KEEPALIVE", "60")),
+}
+
+# Warm start config
+WARMUP_CONFIG = {
+    # induláskor ennyi kapcsolatot nyitunk előre (DNS + TCP + TLS), 0 = kikapcsolva
+    'connections': int(os.environ.get("KEYAUTH_WARMUP_CONNECTIONS", "2")),
+    'timeout': float(os.environ.get("KEYAUTH_WARMUP_TIMEOUT", "10")),
+    # tétlen állapotban ilyen időközönként pingelünk, hogy a pool kapcsolatai ne záródjanak le
+    # (a keepalive_timeout alatt kell maradnia), 0 = kikapcsolva
+    'ping_interval': float(os.environ.get("KEYAUTH_KEEPALIVE_PING", "45")),
+}
+
+# Response decoding
+_KEY_TOKEN_RE = re.compile(r'[A-Za-z0-9\-]{10,}')
+_WHOLE_KEY_RE = re.compile(r'^[A-Za-z0-9\-]{10,}$')
+SUCCESS_KEYWORDS = ('success', 'successful', 'deleted', 'reset', 'banned', 'unbanned', 'verified')
+ERROR_KEYWORDS = ('error', 'invalid', 'failed', 'not found', 'unhandled')
+
+def _minimal_needles(keywords) -> Tuple[str, ...]:
+    """Drop keywords that contain another keyword ('successful' -> 'success' already matches)"""
+    return tuple(k for k in keywords if not any(other != k and other in k for other in keywords))
+
+# Egy lowercase másolaton C-szintű substring keresés; mérve gyorsabb, mint egy re alternáció
+_SUCCESS_NEEDLES = _minimal_needles(SUCCESS_KEYWORDS)
+_ERROR_NEEDLES = _minimal_needles(ERROR_KEYWORDS)
+
+def _json_loads(text: str):
+    if orjson is not None:
+        try:
+            return orjson.loads(text)
+        except orjson.JSONDecodeError:
+            raise json.JSONDecodeError("orjson decode error", text, 0)
+    return json.loads(text)
+
+class KeyAuthResponse(dict):
+    """Decoded API response: still a plain dict for callers, plus outcome and extracted keys"""
+    __slots__ = ('outcome', 'license_keys')
+    
+    def __init__(self, payload: Dict[str, Any], outcome: str, license_keys: List[str] = None):
+        super().__init__(payload)
+        self.outcome = outcome
+        self.license_keys = license_keys or []
+    
+    def copy(self) -> "KeyAuthResponse":
+        return KeyAuthResponse(self, self.outcome, list(self.license_keys))
+
+def find_license_keys(payload: Dict[str, Any]) -> List[str]:
+    if 'key' in payload:
+        return [payload['key']]
+    if 'keys' in payload and isinstance(payload['keys'], list):
+        return list(payload['keys'])
+    if isinstance(payload.get('message'), str):
+        return _KEY_TOKEN_RE.findall(payload['message'])
+    return []
+
+def classify_text(text: str) -> Optional[bool]:
+    """True on any success keyword, False on an error keyword, None otherwise (lowercases once)"""
+    lowered = text.lower()
+    for needle in _SUCCESS_NEEDLES:
+        if needle in lowered:
+            return True
+    for needle in _ERROR_NEEDLES:
+        if needle in lowered:
+            return False
+    return None
+
+def decode_response(action: str, status: int, response_text: str) -> KeyAuthResponse:
+    """JSON first (orjson if installed), then single-pass plain-text classification"""
+    # Próbáljuk JSON-ként értelmezni (csak ha objektumnak tűnik)
+    payload = None
+    if response_text[:1] == '{':
+        try:
+            payload = _json_loads(response_text)
+        except json.JSONDecodeError:
+            pass
+    if isinstance(payload, dict):
+        keys = find_license_keys(payload) if action == 'add' else []
+        return KeyAuthResponse(payload, 'json', keys)
+    
+    # Ha nem JSON, akkor szöveges válasz
+    if not response_text or response_text.isspace():
+        return KeyAuthResponse({"success": False, "message": "Empty response from API"}, 'text')
+    
+    # Kulcs generálás - ha kulcs formátumú a válasz
+    if action == 'add' and _WHOLE_KEY_RE.match(response_text):
+        return KeyAuthResponse(
+            {"success": True, "key": response_text, "message": "License key generated"}, 'text', [response_text]
+        )
+    
+    verdict = classify_text(response_text)
+    if verdict is None:
+        # Alapértelmezett
+        if status == 200:
+            payload = {"success": True, "message": response_text}
+        else:
+            payload = {"success": False, "message": f"HTTP {status}: {response_text}"}
+    else:
+        payload = {"success": verdict, "message": response_text}
+    
+    keys = _KEY_TOKEN_RE.findall(response_text) if action == 'add' else []
+    return KeyAuthResponse(payload, 'text', keys)
+
+class JsonArrayStream:
+    """Incremental parser for a `{..., "<array_field>": [...], ...}` response: array items come out as
+    their text arrives, the other top-level fields are kept in `fields`, the whole body never is"""
+    def __init__(self, array_field: str, plain_limit: int = 65536):
+        self.array_field = array_field
+        self.plain_limit = plain_limit
+        self.fields: Dict[str, Any] = {}
+        self.plain: Optional[str] = None  # nem JSON objektum: a (csonkolt) szöveg
+        self._decoder = json.JSONDecoder()
+        self._buffer = ''
+        self._pos = 0
+        self._state = 'start'
+        self._field = None
+    
+    @property
+    def complete(self) -> bool:
+        return self._state == 'done'
+    
+    def _decode(self, index: int, eof: bool):
+        """(value, end) or None while the value may still be incomplete"""
+        try:
+            value, end = self._decoder.raw_decode(self._buffer, index)
+        except json.JSONDecodeError:
+            return None
+        # a puffer végén álló szám még folytatódhat
+        return (value, end) if end < len(self._buffer) or eof else None
+    
+    def feed(self, text: str, eof: bool = False) -> list:
+        """Add the next chunk of text; returns the array items completed by it"""
+        if self.plain is not None:
+            self.plain = (self.plain + text)[:self.plain_limit]
+            return []
+        self._buffer = self._buffer[self._pos:] + text
+        self._pos = 0
+        items = []
+        buffer = self._buffer
+        while self._state != 'done':
+            index = self._pos
+            while index < len(buffer) and buffer[index] in ' \t\r\n':
+                index += 1
+            if index >= len(buffer):
+                self._pos = index
+                break
+            char = buffer[index]
+            state = self._state
+            if state == 'start':
+                if char != '{':
+                    self.plain = buffer[index:self.plain_limit + index]
+                    return items
+                self._pos, self._state = index + 1, 'field'
+            elif state == 'field':
+                if char == '}':
+                    self._pos, self._state = index + 1, 'done'
+                elif char == ',':
+                    self._pos = index + 1
+                else:
+                    decoded = self._decode(index, eof)
+                    if decoded is None:
+                        break
+                    self._field, self._pos = decoded[0], decoded[1]
+                    self._state = 'colon'
+            elif state == 'colon':
+                self._pos, self._state = index + 1, 'value'
+            elif state == 'value' and self._field == self.array_field and char == '[':
+                self._pos, self._state = index + 1, 'item'
+            elif state == 'value':
+                decoded = self._decode(index, eof)
+                if decoded is None:
+                    break
+                self.fields[self._field], self._pos = decoded
+                self._state = 'field'
+            elif char == ']':
+                self._pos, self._state = index + 1, 'field'
+            elif char == ',':
+                self._pos = index + 1
+            else:
+                decoded = self._decode(index, eof)
+                if decoded is None:
+                    break
+                items.append(decoded[0])
+                self._pos = decoded[1]
+        return items
+
+# Response cache config (másodpercben, 0 = nincs cache)
+CACHE_CONFIG = {
+    'max_entries': int(os.environ.get("KEYAUTH_CACHE_SIZE", "1024")),
+    'ttl': {
+        'verify': float(os.environ.get("KEYAUTH_CACHE_TTL_VERIFY", "60")),
+        'fetchuser': float(os.environ.get("KEYAUTH_CACHE_TTL_FETCHUSER", "60")),
+    },
+}
+
+class ResponseCache:
+    """Bounded TTL + LRU cache for read-only KeyAuth responses, keyed by (action, key)"""
+    def __init__(self, max_entries: int, ttl: Dict[str, float]):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'expired': 0, 'invalidations': 0}
+    
+    def _lookup(self, action: str, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get((action, key))
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at <= time.monotonic():
+            del self._entries[(action, key)]
+            self.stats['expired'] += 1
+            return None
+        self._entries.move_to_end((action, key))
+        return value.copy()
+    
+    def get(self, action: str, key: str) -> Optional[Dict[str, Any]]:
+        return self.get_first((action,), key)
+    
+    def get_first(self, actions: Tuple[str, ...], key: str) -> Optional[Dict[str, Any]]:
+        """First cached answer among `actions`; counted as one hit or one miss"""
+        for action in actions:
+            value = self._lookup(action, key)
+            if value is not None:
+                self.stats['hits'] += 1
+                return value
+        self.stats['misses'] += 1
+        return None
+    
+    def put(self, action: str, key: str, value: Dict[str, Any]):
+        ttl = self.ttl.get(action, 0)
+        if ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[(action, key)] = (time.monotonic() + ttl, value.copy())
+        self._entries.move_to_end((action, key))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+    
+    def invalidate(self, key: str):
+        """Drop every cached action for this license key"""
+        for action in list(self.ttl):
+            if self._entries.pop((action, key), None) is not None:
+                self.stats['invalidations'] += 1
+    
+    def clear(self):
+        self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        stats = dict(self.stats)
+        stats['size'] = len(self._entries)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+# Pre-flight: a maszkra nem illeszkedő vagy nemrég nem létezőnek / töröltnek jelentett kulcs nem megy ki a hálózatra
+KEY_FORMAT_CONFIG = {
+    # a generált kulcsok maszkja, '*' = egy véletlen betű vagy szám
+    'mask': os.environ.get("KEY_MASK", "Corvus-****-****-***"),
+    # további elfogadott maszkok (pl. régi formátum), vesszővel elválasztva
+    'extra_masks': [m.strip() for m in os.environ.get("KEY_MASKS_EXTRA", "").split(',') if m.strip()],
+    'preflight': os.environ.get("KEY_PREFLIGHT", "1") == "1",
+}
+
+NEGATIVE_CACHE_CONFIG = {
+    'max_entries': int(os.environ.get("KEYAUTH_NEGATIVE_CACHE_SIZE", "4096")),
+    'ttl': float(os.environ.get("KEYAUTH_NEGATIVE_CACHE_TTL", "300")),
+}
+
+class KeyFormat:
+    """Compiled matcher for the accepted key masks; a length index rejects most typos before the regex"""
+    def __init__(self, masks: List[str], enabled: bool = True):
+        self.masks = tuple(masks)
+        self.enabled = enabled and bool(self.masks)
+        self.lengths = frozenset(len(mask) for mask in self.masks)
+        alternatives = []
+        for mask in self.masks:
+            parts = []
+            for is_wild, run in itertools.groupby(mask, key=lambda ch: ch == '*'):
+                run = ''.join(run)
+                parts.append(f"[A-Za-z0-9]{{{len(run)}}}" if is_wild else re.escape(run))
+            alternatives.append(''.join(parts))
+        self._fullmatch = re.compile('|'.join(alternatives)).fullmatch if alternatives else None
+    
+    def matches(self, key: str) -> bool:
+        if not self.enabled:
+            return True
+        return len(key) in self.lengths and self._fullmatch(key) is not None
+    
+    def describe(self) -> str:
+        return " or ".join(f"`{mask}`" for mask in self.masks)
+
+key_format = KeyFormat([KEY_FORMAT_CONFIG['mask'], *KEY_FORMAT_CONFIG['extra_masks']], KEY_FORMAT_CONFIG['preflight'])
+
+# ezekre az akciókra a "not found" válasz a kulcsról szól (fetchuser / resetuser: csak a user hiányzik)
+KEY_NOT_FOUND_ACTIONS = frozenset({'verify', 'del'})
+_NOT_FOUND_RE = re.compile(r"not found|does ?n[o']t exist|no such key", re.IGNORECASE)
+
+def is_key_not_found(action: str, result: Dict[str, Any]) -> bool:
+    return (action in KEY_NOT_FOUND_ACTIONS and not result.get('success')
+            and bool(_NOT_FOUND_RE.search(str(result.get('message', '')))))
+
+class NegativeCache:
+    """Bounded TTL + LRU set of keys KeyAuth recently reported as missing (or that we deleted)"""
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self.stats = {'hits': 0, 'stored': 0, 'evictions': 0, 'expired': 0, 'invalidations': 0}
+    
+    def get(self, key: str) -> Optional[str]:
+        """The remembered reason, or None"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, reason = entry
+        if expires_at <= time.monotonic():
+            del self._entries[key]
+            self.stats['expired'] += 1
+            return None
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return reason
+    
+    def put(self, key: str, reason: str):
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, reason)
+        self._entries.move_to_end(key)
+        self.stats['stored'] += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+    
+    def discard(self, key: str):
+        if self._entries.pop(key, None) is not None:
+            self.stats['invalidations'] += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'size': len(self._entries)}
+
+# fetch_info_by_key: verify / fetchuser sorrend tanulása, opcionális hedged mód (mindkettő egyszerre)
+LOOKUP_CONFIG = {
+    'hedge': os.environ.get("KEYAUTH_HEDGED_LOOKUP", "0") == "1",
+    'hint_entries': int(os.environ.get("KEYAUTH_LOOKUP_HINTS", "10000")),
+    'ewma_alpha': 0.2,
+}
+
+LOOKUP_ACTIONS = ('verify', 'fetchuser')
+
+class EndpointSelector:
+    """Learns which lookup endpoint answers: per key (bounded LRU) and globally (EWMA success rate),
+    and keeps latency EWMAs to estimate the time saved against the verify-then-fetchuser path"""
+    def __init__(self, hint_entries: int, alpha: float):
+        self.hint_entries = hint_entries
+        self.alpha = alpha
+        self._hints: "OrderedDict[str, str]" = OrderedDict()
+        # kezdetben a régi sorrend: előbb verify
+        self.success = {'verify': 1.0, 'fetchuser': 0.5}
+        self.latency: Dict[str, Optional[float]] = {action: None for action in LOOKUP_ACTIONS}
+        self.stats = {'lookups': 0, 'hedged': 0, 'reordered': 0, 'hinted': 0, 'both_failed': 0,
+                      'saved_seconds': 0.0}
+    
+    def order(self, key: str, touch: bool = True) -> Tuple[str, str]:
+        """Endpoint order for a lookup; touch=False only peeks (no LRU refresh, no hint counted)"""
+        first = self._hints.get(key)
+        if first is not None and touch:
+            self._hints.move_to_end(key)
+            self.stats['hinted'] += 1
+        elif self.success['fetchuser'] > self.success['verify']:
+            first = 'fetchuser'
+        else:
+            first = 'verify'
+        return (first, 'fetchuser' if first == 'verify' else 'verify')
+    
+    def forget(self, key: str):
+        self._hints.pop(key, None)
+    
+    def _ewma(self, old: Optional[float], value: float) -> float:
+        return value if old is None else old + self.alpha * (value - old)
+    
+    def record(self, key: str, order: Tuple[str, str], winner: Optional[str], outcomes: Dict[str, bool],
+               timings: Dict[str, float], elapsed: float, hedged: bool):
+        """Feed one lookup back; `outcomes`/`timings` only hold requests that actually completed"""
+        stats = self.stats
+        stats['lookups'] += 1
+        stats['hedged'] += hedged
+        stats['reordered'] += order[0] != 'verify'
+        for action, succeeded in outcomes.items():
+            self.success[action] = self._ewma(self.success[action], 1.0 if succeeded else 0.0)
+            self.latency[action] = self._ewma(self.latency[action], timings[action])
+        if winner is None:
+            stats['both_failed'] += 1
+            self._hints.pop(key, None)
+        elif self.hint_entries > 0:
+            self._hints[key] = winner
+            self._hints.move_to_end(key)
+            while len(self._hints) > self.hint_entries:
+                self._hints.popitem(last=False)
+        
+        # a régi út: verify, és ha az nem sikerül, utána fetchuser
+        verify_latency = timings.get('verify', self.latency['verify'])
+        fetchuser_latency = timings.get('fetchuser', self.latency['fetchuser'])
+        if winner == 'verify':
+            baseline = verify_latency
+        elif verify_latency is not None and fetchuser_latency is not None:
+            baseline = verify_latency + fetchuser_latency
+        else:
+            baseline = None
+        if baseline is not None:
+            saved = baseline - elapsed
+            stats['saved_seconds'] += saved
+            metrics.observe('keyauth_lookup_saved_seconds', max(0.0, saved), mode='hedged' if hedged else 'sequential')
+        metrics.inc('keyauth_lookups_total', mode='hedged' if hedged else 'sequential', winner=winner or 'none')
+
+# Client-side rate limit (kérés/mp, burst) akció osztályonként, 0 = kikapcsolva
+RATE_LIMIT_CONFIG = {
+    'read': (float(os.environ.get("KEYAUTH_RATE_READ", "5")), int(os.environ.get("KEYAUTH_BURST_READ", "10"))),
+    'write': (float(os.environ.get("KEYAUTH_RATE_WRITE", "2")), int(os.environ.get("KEYAUTH_BURST_WRITE", "5"))),
+}
+
+RETRY_CONFIG = {
+    'read_attempts': int(os.environ.get("KEYAUTH_RETRY_READ", "3")),
+    'write_attempts': int(os.environ.get("KEYAUTH_RETRY_WRITE", "2")),  # csak 429 esetén
+    'base_delay': 0.5,
+    'max_delay': 8.0,
+}
+
+BREAKER_CONFIG = {
+    'failure_threshold': int(os.environ.get("KEYAUTH_BREAKER_THRESHOLD", "5")),
+    'reset_timeout': float(os.environ.get("KEYAUTH_BREAKER_RESET", "30")),
+}
+
+class TokenBucket:
+    """Async token bucket: `rate` tokens/second, up to `burst` stored"""
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+        self.throttled = 0
+    
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                self.throttled += 1
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class CircuitBreaker:
+    """closed -> open after N consecutive failures -> half_open probe after reset_timeout"""
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probe_in_flight = False
+        self.stats = {'opened': 0, 'short_circuited': 0}
+    
+    def allow_request(self) -> bool:
+        if self.state == 'open':
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                self.stats['short_circuited'] += 1
+                return False
+            self._set_state('half_open')
+        if self.state == 'half_open':
+            if self._probe_in_flight:
+                self.stats['short_circuited'] += 1
+                return False
+            self._probe_in_flight = True
+        return True
+    
+    def record_success(self):
+        self.failures = 0
+        self._probe_in_flight = False
+        if self.state != 'closed':
+            self._set_state('closed')
+    
+    def record_failure(self):
+        self.failures += 1
+        self._probe_in_flight = False
+        if self.state == 'half_open' or (self.state == 'closed' and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            self.stats['opened'] += 1
+            self._set_state('open')
+    
+    def abandon_probe(self):
+        """The half-open probe was cancelled before it got an answer: let the next request probe"""
+        self._probe_in_flight = False
+    
+    def retry_in(self) -> float:
+        if self.state != 'open':
+            return 0.0
+        return max(0.0, self.reset_timeout - (time.monotonic() - self.opened_at))
+    
+    def _set_state(self, state: str):
+        log.warning("circuit breaker state change", extra={'from_state': self.state, 'to_state': state})
+        self.state = state
+
+# Upstream scheduler: ennyi KeyAuth hívás futhat egyszerre (0 = kikapcsolva), ebből bulk legfeljebb bulk_slots
+SCHEDULER_CONFIG = {
+    'concurrency': int(os.environ.get("KEYAUTH_SCHED_CONCURRENCY", "6")),
+    'bulk_slots': int(os.environ.get("KEYAUTH_SCHED_BULK_SLOTS", "4")),
+}
+
+# Prioritás sorrendben: interaktív olvasás > egyedi írás > bulk / háttér
+PRIORITY_CLASSES = ('interactive', 'write', 'bulk')
+
+# Határidők: meddig érdemes még a KeyAuth válaszra várni
+DEADLINE_CONFIG = {
+    # ennyi idő után az admin már nem vár a válaszra (interaktív és egyedi írás, bulk-ra nem vonatkozik)
+    'patience': float(os.environ.get("KEYAUTH_DEADLINE_PATIENCE", "120")),
+    # interaction token élettartama (followup / szerkesztés eddig lehetséges)
+    'token_lifetime': 900.0,
+    'token_margin': 5.0,
+}
+
+class RequestContext:
+    """Who a KeyAuth call is made for, and until when its answer can still be delivered"""
+    __slots__ = ('priority', 'guild_id', 'user_id', 'started', 'deadline')
+    
+    def __init__(self, priority: Optional[str] = None, guild_id: Optional[int] = None, user_id: Optional[int] = None,
+                 deadline: Optional[float] = None, started: Optional[float] = None):
+        self.priority = priority
+        self.guild_id = guild_id or 0
+        self.user_id = user_id or 0
+        self.started = time.monotonic() if started is None else started
+        self.deadline = deadline  # time.monotonic() alapú, None = nincs kemény határidő
+    
+    def deadline_for(self, priority: str) -> Optional[float]:
+        """Hard deadline, tightened by the admin's patience unless the work is bulk"""
+        deadlines = [self.deadline] if self.deadline is not None else []
+        if priority != 'bulk' and DEADLINE_CONFIG['patience'] > 0:
+            deadlines.append(self.started + DEADLINE_CONFIG['patience'])
+        return min(deadlines) if deadlines else None
+
+# a hívó task (és az általa indított taskok) KeyAuth kéréseinek kontextusa
+request_context: contextvars.ContextVar = contextvars.ContextVar('keyauth_request_context', default=None)
+
+def bind_request_context(guild_id: Optional[int], user_id: Optional[int], priority: Optional[str] = None,
+                         deadline: Optional[float] = None):
+    """Tag KeyAuth calls made from the current task with the guild/user they are made for"""
+    current = request_context.get()
+    if priority is None and current:
+        priority = current.priority
+    return request_context.set(RequestContext(priority, guild_id, user_id, deadline))
+
+def interaction_deadline(interaction: discord.Interaction) -> float:
+    """Monotonic time until the interaction token can still deliver a followup"""
+    age = (discord.utils.utcnow() - interaction.created_at).total_seconds()
+    left = DEADLINE_CONFIG['token_lifetime'] - DEADLINE_CONFIG['token_margin'] - max(0.0, age)
+    return time.monotonic() + max(0.0, left)
+
+@contextmanager
+def request_priority(priority: str):
+    """Run a block at a fixed priority class, keeping the bound guild/user and deadline"""
+    current = request_context.get() or RequestContext()
+    token = request_context.set(RequestContext(priority, current.guild_id, current.user_id,
+                                               current.deadline, current.started))
+    try:
+        yield
+    finally:
+        request_context.reset(token)
+
+class RequestScheduler:
+    """Admission control for upstream calls: strict priority between classes,
+    round-robin between guilds and then between users of a guild inside a class"""
+    def __init__(self, concurrency: int, bulk_slots: int):
+        self.concurrency = concurrency
+        self.bulk_slots = max(1, min(bulk_slots, concurrency))
+        self.active = {priority: 0 for priority in PRIORITY_CLASSES}
+        # priority -> guild -> user -> várakozó future-ök
+        self._queues: Dict[str, OrderedDict] = {priority: OrderedDict() for priority in PRIORITY_CLASSES}
+        self.stats = {priority: {'dispatched': 0, 'queued': 0, 'wait_total': 0.0, 'wait_max': 0.0}
+                      for priority in PRIORITY_CLASSES}
+    
+    def depth(self, priority: str) -> int:
+        return sum(len(waiters) for users in self._queues[priority].values() for waiters in users.values())
+    
+    def _has_capacity(self, priority: str) -> bool:
+        if sum(self.active.values()) >= self.concurrency:
+            return False
+        return priority != 'bulk' or self.active['bulk'] < self.bulk_slots
+    
+    def _waiting_ahead(self, priority: str) -> bool:
+        rank = PRIORITY_CLASSES.index(priority)
+        return any(self._queues[p] for p in PRIORITY_CLASSES[:rank + 1])
+    
+    def _pop_next(self, priority: str) -> Optional[asyncio.Future]:
+        guilds = self._queues[priority]
+        while guilds:
+            guild_id, users = next(iter(guilds.items()))
+            user_id, waiters = next(iter(users.items()))
+            future = waiters.popleft()
+            # a kiszolgált user / guild a sor végére kerül
+            if waiters:
+                users.move_to_end(user_id)
+            else:
+                del users[user_id]
+            if users:
+                guilds.move_to_end(guild_id)
+            else:
+                del guilds[guild_id]
+            if not future.done():
+                return future
+        return None
+    
+    def _dispatch(self):
+        while True:
+            for priority in PRIORITY_CLASSES:
+                if self._queues[priority] and self._has_capacity(priority):
+                    future = self._pop_next(priority)
+                    if future is not None:
+                        self.active[priority] += 1
+                        future.set_result(None)
+                    break
+            else:
+                return
+    
+    def _remove(self, priority: str, guild_id: int, user_id: int, future: asyncio.Future):
+        users = self._queues[priority].get(guild_id)
+        waiters = users.get(user_id) if users else None
+        if waiters and future in waiters:
+            waiters.remove(future)
+            if not waiters:
+                del users[user_id]
+            if not users:
+                del self._queues[priority][guild_id]
+    
+    def _release(self, priority: str):
+        self.active[priority] -= 1
+        self._dispatch()
+    
+    @asynccontextmanager
+    async def slot(self, priority: str, guild_id: int = 0, user_id: int = 0, deadline: Optional[float] = None):
+        if self.concurrency <= 0:
+            yield
+            return
+        started = time.monotonic()
+        if self._has_capacity(priority) and not self._waiting_ahead(priority):
+            self.active[priority] += 1
+        else:
+            future = asyncio.get_running_loop().create_future()
+            users = self._queues[priority].setdefault(guild_id, OrderedDict())
+            users.setdefault(user_id, deque()).append(future)
+            self.stats[priority]['queued'] += 1
+            try:
+                # lejárt határidő: TimeoutError, a sorból kikerülünk
+                async with asyncio.timeout_at(deadline):
+                    await future
+            except (asyncio.CancelledError, TimeoutError):
+                # a határidő ugyanabban a körben is lejárhat, amikor a slotot megkaptuk
+                if future.done() and not future.cancelled():
+                    self._release(priority)  # megkaptuk a slotot, de már senki nem vár ránk
+                else:
+                    self._remove(priority, guild_id, user_id, future)
+                raise
+        waited = time.monotonic() - started
+        stats = self.stats[priority]
+        stats['dispatched'] += 1
+        stats['wait_total'] += waited
+        stats['wait_max'] = max(stats['wait_max'], waited)
+        metrics.observe('keyauth_schedule_wait_seconds', waited, priority=priority)
+        try:
+            yield
+        finally:
+            self._release(priority)
+
+# Ezek az akciók módosítanak, soha nem vonjuk össze őket
+MUTATING_ACTIONS = frozenset({'add', 'del', 'resetuser'})
+SYNC_ACTIONS = frozenset({'fetchallkeys', 'fetchallusers'})
+
+# Kísérletenkénti időkeret: connect közös, (sock_read, total) akció osztályonként, másodperc
+TIMEOUT_CONFIG = {
+    'connect': float(os.environ.get("KEYAUTH_TIMEOUT_CONNECT", "5")),
+    'read': (float(os.environ.get("KEYAUTH_TIMEOUT_READ", "10")), float(os.environ.get("KEYAUTH_TIMEOUT_READ_TOTAL", "15"))),
+    'write': (float(os.environ.get("KEYAUTH_TIMEOUT_WRITE", "25")), float(os.environ.get("KEYAUTH_TIMEOUT_WRITE_TOTAL", "30"))),
+    'sync': (float(os.environ.get("KEYAUTH_TIMEOUT_SYNC", "60")), float(os.environ.get("KEYAUTH_TIMEOUT_SYNC_TOTAL", "120"))),
+}
+
+def attempt_timeout(action: str, deadline: Optional[float]) -> Optional[aiohttp.ClientTimeout]:
+    """ClientTimeout for one attempt; None once the deadline has passed.
+    Reads are cut to the remaining time, a started write keeps its full budget so its outcome is known"""
+    kind = 'write' if action in MUTATING_ACTIONS else 'sync' if action in SYNC_ACTIONS else 'read'
+    sock_read, total = TIMEOUT_CONFIG[kind]
+    if deadline is not None:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        if kind != 'write':
+            total = min(total, remaining)
+    return aiohttp.ClientTimeout(total=total, connect=min(TIMEOUT_CONFIG['connect'], total), sock_read=sock_read)
+
+class _RetryAttempt(Exception):
+    """stream_records: this attempt failed before handing out anything, back off and retry"""
+
 class KeyAuthAPI:
-    def __init__(self, seller_key: str, api_url: str):
+    def __init__(self, seller_key: str, api_url: str, pool_config: Dict[str, Any] = None):
         self.seller_key = seller_key
         self.base_url = api_url.rstrip('/')
+        self.pool_config = pool_config or HTTP_POOL_CONFIG
         self.session = None
+        self.cache = ResponseCache(CACHE_CONFIG['max_entries'], CACHE_CONFIG['ttl'])
+        self.negative = NegativeCache(NEGATIVE_CACHE_CONFIG['max_entries'], NEGATIVE_CACHE_CONFIG['ttl'])
+        self.preflight_stats = {'bad_format': 0, 'known_missing': 0}
+        self.pool_stats = {
+            'requests': 0,
+            'connections_created': 0,
+            'connections_reused': 0,
+            'sessions_opened': 0,
+            'pings': 0,
+        }
+        self.last_used = 0.0
+        self._keepalive_task: Optional[asyncio.Task] = None
+        self._inflight: Dict[Tuple, Tuple[asyncio.Task, str]] = {}  # kulcs -> (közös hívás, prioritása)
+        self.flight_stats = {'upstream': 0, 'coalesced': 0, 'cancelled': 0}
+        self._flight_waiters: Dict[asyncio.Task, int] = {}
+        self.in_flight = 0
+        self.rate_limiters = {name: TokenBucket(rate, burst) for name, (rate, burst) in RATE_LIMIT_CONFIG.items()}
+        self.retry_stats = {'retries': 0}
+        self.deadline_stats = {'expired': 0, 'cancelled': 0}
+        self.breaker = CircuitBreaker(BREAKER_CONFIG['failure_threshold'], BREAKER_CONFIG['reset_timeout'])
+        self.scheduler = RequestScheduler(SCHEDULER_CONFIG['concurrency'], SCHEDULER_CONFIG['bulk_slots'])
+        self.lookup = EndpointSelector(LOOKUP_CONFIG['hint_entries'], LOOKUP_CONFIG['ewma_alpha'])
+        self.mirror: Optional["LicenseMirror"] = None
+    
+    def _build_trace_config(self) -> aiohttp.TraceConfig:
+        trace_config = aiohttp.TraceConfig()
+        
+        def record_phase(ctx, phase: str, started: float):
+            elapsed = time.perf_counter() - started
+            metrics.observe('keyauth_connect_duration_seconds', elapsed, phase=phase)
+            # warm_up a kérésenkénti trace ctx-ben kapja vissza a fázisidőket
+            if isinstance(ctx.trace_request_ctx, dict):
+                ctx.trace_request_ctx[phase] = elapsed
+        
+        async def on_dns_resolvehost_start(session, ctx, params):
+            ctx.dns_started = time.perf_counter()
+        
+        async def on_dns_resolvehost_end(session, ctx, params):
+            record_phase(ctx, 'dns', ctx.dns_started)
+        
+        async def on_connection_create_start(session, ctx, params):
+            ctx.connect_started = time.perf_counter()
+        
+        async def on_connection_create_end(session, ctx, params):
+            self.pool_stats['connections_created'] += 1
+            record_phase(ctx, 'connect', ctx.connect_started)
+        
+        async def on_connection_reuseconn(session, ctx, params):
+            self.pool_stats['connections_reused'] += 1
+        
+        trace_config.on_dns_resolvehost_start.append(on_dns_resolvehost_start)
+        trace_config.on_dns_resolvehost_end.append(on_dns_resolvehost_end)
+        trace_config.on_connection_create_start.append(on_connection_create_start)
+        trace_config.on_connection_create_end.append(on_connection_create_end)
+        trace_config.on_connection_reuseconn.append(on_connection_reuseconn)
+        return trace_config
+    
+    async def open(self):
+        """Open the pooled session (called from setup_hook)"""
+        if self.session and not self.session.closed:
+            return
+        connector = aiohttp.TCPConnector(
+            limit=self.pool_config['limit'],
+            limit_per_host=self.pool_config['limit_per_host'],
+            ttl_dns_cache=self.pool_config['ttl_dns_cache'],
+            use_dns_cache=True,
+            keepalive_timeout=self.pool_config['keepalive_timeout'],
+        )
+        self.session = aiohttp.ClientSession(
+            connector=connector,
+            headers={
+                'User-Agent': 'KeyAuth-Discord-Bot/1.0',
+                'Accept': 'application/json',
+            },
+            trace_configs=[self._build_trace_config()],
+        )
+        self.pool_stats['sessions_opened'] += 1
     
     async def ensure_session(self):
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        if not self.session or self.session.closed:
+            await self.open()
     
-    async def make_request(self, action: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    async def _ping(self, timing: Dict[str, float] = None):
+        """HEAD on the API URL: no seller action, only opens/refreshes a pooled connection"""
+        async with self.session.head(
+            self.base_url, timeout=aiohttp.ClientTimeout(total=WARMUP_CONFIG['timeout']),
+            trace_request_ctx=timing
+        ) as response:
+            await response.read()
+        self.pool_stats['pings'] += 1
+    
+    async def warm_up(self, connections: int) -> Dict[str, Any]:
+        """Resolve DNS and open `connections` TLS connections ahead of the first command"""
         await self.ensure_session()
+        started = time.perf_counter()
+        timings = [{} for _ in range(connections)]
+        results = await asyncio.gather(*(self._ping(timing) for timing in timings), return_exceptions=True)
+        errors = [redact(str(result)) or type(result).__name__ for result in results if isinstance(result, Exception)]
+        return {
+            'connections': connections - len(errors),
+            'dns_ms': round(max((t.get('dns', 0.0) for t in timings), default=0.0) * 1000, 1),
+            'connect_ms': round(max((t.get('connect', 0.0) for t in timings), default=0.0) * 1000, 1),
+            'total_ms': round((time.perf_counter() - started) * 1000, 1),
+            'errors': errors,
+        }
+    
+    async def run_keepalive(self, interval: float, connections: int):
+        """Ping only while idle; real traffic keeps the pool warm on its own"""
+        while True:
+            await asyncio.sleep(interval)
+            if time.monotonic() - self.last_used < interval or self.session is None or self.session.closed:
+                continue
+            results = await asyncio.gather(*(self._ping() for _ in range(connections)), return_exceptions=True)
+            failed = sum(1 for result in results if isinstance(result, Exception))
+            if failed:
+                log.warning("keepalive ping failed", extra={'failed': failed, 'connections': connections})
+    
+    def start_keepalive(self, interval: float, connections: int):
+        if self._keepalive_task is None and interval > 0:
+            self._keepalive_task = asyncio.create_task(self.run_keepalive(interval, connections))
+    
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """Connection pool counters + reuse ratio"""
+        stats = dict(self.pool_stats)
+        total = stats['connections_created'] + stats['connections_reused']
+        stats['reuse_ratio'] = stats['connections_reused'] / total if total else 0.0
+        return stats
+    
+    async def make_request(self, action: str, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Send a seller API request; identical concurrent reads share one upstream call"""
+        context = request_context.get() or RequestContext()
+        priority = context.priority or ('write' if action in MUTATING_ACTIONS else 'interactive')
+        deadline = context.deadline_for(priority)
+        if action in MUTATING_ACTIONS:
+            return await self._send_request(action, data, context, priority, deadline)
+        try:
+            # minden várakozó a saját határidejéig vár; a közös hívás határidő nélkül, az utolsóval együtt áll le
+            async with asyncio.timeout_at(deadline):
+                return await self._shared_read(action, data, context, priority)
+        except TimeoutError:
+            self.deadline_stats['cancelled'] += 1
+            return self._deadline_result(action)
+    
+    async def _shared_read(self, action: str, data: Dict[str, Any], context: RequestContext,
+                           priority: str) -> Dict[str, Any]:
+        """Join an identical in-flight read or start one. The shared call has no deadline (each waiter
+        applies its own in make_request, and it only stops with its last waiter); it is queued at the
+        starter's priority, so a more urgent caller starts its own call instead of joining a slower one"""
+        flight_key = (action, tuple(sorted((k, str(v)) for k, v in data.items() if v is not None)))
+        flight = self._inflight.get(flight_key)
+        if flight is not None and PRIORITY_CLASSES.index(flight[1]) <= PRIORITY_CLASSES.index(priority):
+            task = flight[0]
+            self.flight_stats['coalesced'] += 1
+        else:
+            self.flight_stats['upstream'] += 1
+            task = asyncio.ensure_future(self._send_request(action, data, context, priority, None))
+            self._inflight[flight_key] = (task, priority)
+            
+            def forget(done: asyncio.Task):
+                # egy sürgősebb hívás közben átvehette a kulcsot
+                if self._inflight.get(flight_key, (None,))[0] is done:
+                    del self._inflight[flight_key]
+            task.add_done_callback(forget)
         
+        # shield: ha egy várakozót megszakítanak, a közös kérés a többieknek tovább fut,
+        # az utolsó várakozóval együtt viszont az upstream hívás is leáll
+        self._flight_waiters[task] = self._flight_waiters.get(task, 0) + 1
+        try:
+            result = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            if self._flight_waiters.get(task) == 1 and not task.done():
+                task.cancel()
+                self.flight_stats['cancelled'] += 1
+            raise
+        finally:
+            waiters = self._flight_waiters.pop(task, 1) - 1
+            if waiters > 0:
+                self._flight_waiters[task] = waiters
+        return result.copy()
+    
+    def _deadline_result(self, action: str) -> Dict[str, Any]:
+        metrics.inc('keyauth_requests_total', action=action, outcome='deadline')
+        log.warning("request deadline exceeded", extra={'action': action, 'outcome': 'deadline'})
+        return {
+            "success": False,
+            "message": "KeyAuth did not answer in time, the request was abandoned"
+        }
+    
+    async def _send_request(self, action: str, data: Dict[str, Any], context: RequestContext, priority: str,
+                            deadline: Optional[float]) -> Dict[str, Any]:
+        metrics.inc('keyauth_requests_in_flight', 1, action=action)
+        self.in_flight += 1
+        self.last_used = time.monotonic()
+        try:
+            return await self._attempt_requests(action, data, context, priority, deadline)
+        except TimeoutError:
+            # a sorban várva vagy két próbálkozás között járt le
+            self.deadline_stats['expired'] += 1
+            return self._deadline_result(action)
+        finally:
+            self.in_flight -= 1
+            metrics.inc('keyauth_requests_in_flight', -1, action=action)
+    
+    async def drain(self, timeout: float) -> bool:
+        """Wait for in-flight upstream calls before shutdown; False if the timeout hit first"""
+        deadline = time.monotonic() + timeout
+        while self.in_flight and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        return self.in_flight == 0
+    
+    def _record_attempt(self, level: int, action: str, outcome: str, started: float, **fields):
+        """Log + metrics for one upstream attempt"""
+        latency = time.perf_counter() - started
+        metrics.observe('keyauth_request_duration_seconds', latency, action=action)
+        metrics.inc('keyauth_requests_total', action=action, outcome=outcome)
+        log.log(level, "keyauth request", extra={
+            'action': action, 'latency_ms': round(latency * 1000, 1), 'outcome': outcome, **fields
+        })
+    
+    def _request_url(self, action: str, data: Dict[str, Any]) -> str:
         # JS source alapján minden paraméter query stringben van
         params = {
             'sellerkey': self.seller_key,
@@ -51,130 +1584,1186 @@ class KeyAuthAPI:
         
         # Készítsük el a teljes URL-t
         query_string = '&'.join([f"{k}={urllib.parse.quote(str(v))}" for k, v in params.items()])
-        full_url = f"{self.base_url}?{query_string}"
+        return f"{self.base_url}?{query_string}"
+    
+    async def _attempt_requests(self, action: str, data: Dict[str, Any], context: RequestContext, priority: str,
+                                deadline: Optional[float]) -> Dict[str, Any]:
+        await self.ensure_session()
+        full_url = self._request_url(action, data)
+        
+        if not self.breaker.allow_request():
+            metrics.inc('keyauth_requests_total', action=action, outcome='circuit_open')
+            log.warning("circuit open, request skipped", extra={'action': action, 'outcome': 'circuit_open'})
+            return {
+                "success": False,
+                "message": f"KeyAuth API is unavailable, try again in {self.breaker.retry_in():.0f}s"
+            }
+        
+        probe = self.breaker.state == 'half_open'
+        try:
+            return await self._run_attempts(action, full_url, context, priority, deadline)
+        except (asyncio.CancelledError, TimeoutError):
+            if probe:
+                self.breaker.abandon_probe()
+            raise
+    
+    async def _run_attempts(self, action: str, full_url: str, context: RequestContext, priority: str,
+                            deadline: Optional[float]) -> Dict[str, Any]:
+        idempotent = action not in MUTATING_ACTIONS
+        limiter = self.rate_limiters['write' if action in MUTATING_ACTIONS else 'read']
+        max_attempts = max(1, RETRY_CONFIG['read_attempts'] if idempotent else RETRY_CONFIG['write_attempts'])
+        
+        for attempt in range(1, max_attempts + 1):
+            # a limiterre és a backoffra slot nélkül várunk, egy lassított tenant ne foglalja a többiek elől
+            await limiter.acquire()
+            async with self.scheduler.slot(priority, context.guild_id, context.user_id, deadline):
+                timeout = attempt_timeout(action, deadline)
+                if timeout is None:
+                    raise TimeoutError  # _send_request: nem küldjük el / nem próbáljuk újra
+                result, retry_after = await self._attempt(action, full_url, timeout, attempt,
+                                                          attempt < max_attempts, idempotent)
+            if result is not None:
+                return result
+            await self._backoff(action, attempt, retry_after)
+    
+    async def _attempt(self, action: str, full_url: str, timeout: aiohttp.ClientTimeout, attempt: int,
+                       can_retry: bool, idempotent: bool) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """One HTTP attempt: (result, None), or (None, Retry-After) when it should be retried"""
+        started = time.perf_counter()
+        try:
+            self.pool_stats['requests'] += 1
+            
+            async with self.session.get(full_url, timeout=timeout) as response:
+                response_text = await response.text()
+                response_text = response_text.strip()
+                log_response_body(action, response.status, response_text)
+                
+                # 429: a kérés nem futott le, írásnál is biztonságos újrapróbálni
+                # 5xx: csak idempotens olvasásnál próbáljuk újra
+                if response.status >= 500:
+                    self.breaker.record_failure()
+                else:
+                    self.breaker.record_success()
+                
+                if response.status == 429 or response.status >= 500:
+                    retryable = response.status == 429 or idempotent
+                    if retryable and can_retry and self.breaker.state != 'open':
+                        self._record_attempt(logging.WARNING, action, 'retry', started,
+                                             status=response.status, attempt=attempt)
+                        return None, response.headers.get('Retry-After')
+                
+                result = decode_response(action, response.status, response_text)
+                self._record_attempt(logging.INFO, action, result.outcome, started, status=response.status,
+                                     attempt=attempt, success=bool(result.get('success')))
+                return result, None
+                
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+            error_text = redact(str(e)) or type(e).__name__
+            self._record_attempt(logging.WARNING, action, 'network_error', started,
+                                 attempt=attempt, error=error_text)
+            self.breaker.record_failure()
+            if idempotent and can_retry and self.breaker.state != 'open':
+                return None, None
+            return {
+                "success": False,
+                "message": f"Network error: {error_text}"
+            }, None
+        except Exception as e:
+            metrics.inc('keyauth_requests_total', action=action, outcome='error')
+            log.exception("keyauth request failed", extra={'action': action, 'outcome': 'error'})
+            self.breaker.record_failure()
+            return {
+                "success": False,
+                "message": f"Unexpected error: {redact(str(e))}"
+            }, None
+    
+    async def _backoff(self, action: str, attempt: int, retry_after: Optional[str] = None):
+        """Exponential backoff with full jitter, honouring Retry-After when present"""
+        delay = random.uniform(0, min(RETRY_CONFIG['max_delay'], RETRY_CONFIG['base_delay'] * 2 ** (attempt - 1)))
+        if retry_after:
+            try:
+                delay = max(delay, min(float(retry_after), RETRY_CONFIG['max_delay']))
+            except ValueError:
+                pass
+        self.retry_stats['retries'] += 1
+        log.debug("retry scheduled", extra={'action': action, 'attempt': attempt, 'delay_s': round(delay, 3)})
+        await asyncio.sleep(delay)
+    
+    async def stream_records(self, action: str, array_field: str, data: Dict[str, Any] = None,
+                             page_size: int = 1000):
+        """Pages of a large list response (fetchallkeys / fetchallusers) parsed as the body arrives, so the
+        whole list is never held. Same breaker, limiter and scheduler as make_request; failures before the
+        first page are retried, later ones raise RuntimeError as pages were already handed out"""
+        context = request_context.get() or RequestContext()
+        priority = context.priority or 'interactive'
+        deadline = context.deadline_for(priority)
+        await self.ensure_session()
+        full_url = self._request_url(action, data or {})
+        limiter = self.rate_limiters['read']
+        max_attempts = max(1, RETRY_CONFIG['read_attempts'])
+        
+        for attempt in range(1, max_attempts + 1):
+            if not self.breaker.allow_request():
+                metrics.inc('keyauth_requests_total', action=action, outcome='circuit_open')
+                raise RuntimeError(f"{action} failed: KeyAuth API is unavailable, "
+                                   f"try again in {self.breaker.retry_in():.0f}s")
+            probe = self.breaker.state == 'half_open'
+            retry_after = None
+            yielded = 0
+            try:
+                await limiter.acquire()
+                async with self.scheduler.slot(priority, context.guild_id, context.user_id, deadline):
+                    timeout = attempt_timeout(action, deadline)
+                    if timeout is None:
+                        raise TimeoutError
+                    started = time.perf_counter()
+                    self.pool_stats['requests'] += 1
+                    self.last_used = time.monotonic()
+                    try:
+                        async with self.session.get(full_url, timeout=timeout) as response:
+                            if response.status == 429 or response.status >= 500:
+                                if response.status >= 500:
+                                    self.breaker.record_failure()
+                                if attempt < max_attempts and self.breaker.state != 'open':
+                                    self._record_attempt(logging.WARNING, action, 'retry', started,
+                                                         status=response.status, attempt=attempt)
+                                    retry_after = response.headers.get('Retry-After')
+                                    response.release()
+                                    raise _RetryAttempt()
+                            else:
+                                self.breaker.record_success()
+                            
+                            parser = JsonArrayStream(array_field)
+                            text = codecs.getincrementaldecoder('utf-8')(errors='replace')
+                            page = []
+                            async for chunk in response.content.iter_chunked(65536):
+                                page.extend(parser.feed(text.decode(chunk)))
+                                while len(page) >= page_size:
+                                    yielded += page_size
+                                    yield page[:page_size]
+                                    page = page[page_size:]
+                            page.extend(parser.feed(text.decode(b'', final=True), eof=True))
+                            
+                            if parser.plain is not None or not parser.complete or not parser.fields.get('success'):
+                                if parser.plain is not None:
+                                    message = decode_response(action, response.status, parser.plain.strip()).get('message')
+                                elif not parser.complete:
+                                    message = "truncated or malformed JSON response"
+                                else:
+                                    message = parser.fields.get('message', 'unknown error')
+                                self._record_attempt(logging.WARNING, action, 'stream_error', started,
+                                                     status=response.status, attempt=attempt, items=yielded)
+                                raise RuntimeError(f"{action} failed: {message}")
+                            if page:
+                                yielded += len(page)
+                                yield page
+                            self._record_attempt(logging.INFO, action, 'json_stream', started,
+                                                 status=response.status, attempt=attempt, items=yielded)
+                            return
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        error_text = redact(str(e)) or type(e).__name__
+                        self._record_attempt(logging.WARNING, action, 'network_error', started,
+                                             attempt=attempt, error=error_text, items=yielded)
+                        self.breaker.record_failure()
+                        if yielded or attempt >= max_attempts or self.breaker.state == 'open':
+                            raise RuntimeError(f"{action} failed: Network error: {error_text}") from e
+                        raise _RetryAttempt() from e
+            except _RetryAttempt:
+                pass
+            except TimeoutError:
+                # a slotra várva vagy két próbálkozás között járt le
+                if probe:
+                    self.breaker.abandon_probe()
+                self.deadline_stats['expired'] += 1
+                raise RuntimeError(f"{action} failed: KeyAuth did not answer in time") from None
+            except (asyncio.CancelledError, GeneratorExit):
+                if probe:
+                    self.breaker.abandon_probe()
+                raise
+            await self._backoff(action, attempt, retry_after)
+    
+    # SPECIFIKUS MŰVELETEK
+    
+    async def add_license(self, expiry: str, level: str, mask: str = KEY_FORMAT_CONFIG['mask'], amount: int = 1):
+        """Generate license key(s) - Corvus formátum alapértelmezett"""
+        params = {
+            'expiry': expiry,
+            'level': level,
+            'amount': str(amount)
+        }
+        if mask:
+            params['mask'] = mask
+            
+        result = await self.make_request('add', params)
+        if result.get('success'):
+            keys = getattr(result, 'license_keys', [])
+            # a KeyAuth által kiadott kulcsot a helyi generátor sem adhatja ki újra
+            issued_keys.update(keys)
+            for key in keys:
+                self.negative.discard(key)
+        if self.mirror and result.get('success'):
+            await self.mirror.apply_add(getattr(result, 'license_keys', []), level, expiry)
+        return result
+    
+    def preflight(self, key: str, fresh: bool = False) -> Optional[Dict[str, Any]]:
+        """Local answer for a key that cannot exist upstream (bad format, or recently missing/deleted)"""
+        if not key_format.matches(key):
+            self.preflight_stats['bad_format'] += 1
+            metrics.inc('keyauth_preflight_total', result='bad_format')
+            return {
+                "success": False,
+                "message": f"Invalid license key format: expected {key_format.describe()}"
+            }
+        reason = None if fresh else self.negative.get(key)
+        if reason is not None:
+            self.preflight_stats['known_missing'] += 1
+            metrics.inc('keyauth_preflight_total', result='known_missing')
+            return {"success": False, "message": reason}
+        return None
+    
+    def _remember_missing(self, action: str, key: str, result: Dict[str, Any]):
+        if is_key_not_found(action, result):
+            self.negative.put(key, str(result.get('message') or "Key not found."))
+    
+    async def cached_request(self, action: str, key: str, params: Dict[str, Any], fresh: bool = False):
+        """make_request with the response cache in front (only successful answers are cached)"""
+        if not fresh:
+            cached = self.cache.get(action, key)
+            if cached is not None:
+                return cached
+        result = await self.make_request(action, params)
+        if result.get('success'):
+            self.cache.put(action, key, result)
+        return result
+    
+    async def delete_license(self, key: str, user_too: bool = False):
+        """Delete license key"""
+        rejected = self.preflight(key)
+        if rejected is not None:
+            return rejected
+        params = {
+            'key': key,
+            'userToo': '1' if user_too else '0'
+        }
+        result = await self.make_request('del', params)
+        self.cache.invalidate(key)
+        self.lookup.forget(key)
+        if result.get('success'):
+            self.negative.put(key, "License key was deleted.")
+        self._remember_missing('del', key, result)
+        if self.mirror and result.get('success'):
+            await self.mirror.apply_delete(key)
+        return result
+    
+    async def reset_hwid_by_key(self, key: str):
+        """Reset HWID by license key (nem username!)"""
+        rejected = self.preflight(key)
+        if rejected is not None:
+            return rejected
+        params = {'user': key}
+        result = await self.make_request('resetuser', params)
+        self.cache.invalidate(key)
+        if self.mirror and result.get('success'):
+            await self.mirror.apply_hwid_reset(key)
+        return result
+    
+    async def verify_key(self, key: str, fresh: bool = False):
+        """Verify/check license key (fresh=True skips the cache)"""
+        rejected = self.preflight(key, fresh)
+        if rejected is not None:
+            return rejected
+        params = {'key': key}
+        result = await self.cached_request('verify', key, params, fresh)
+        self._remember_missing('verify', key, result)
+        return result
+    
+    def _lookup_request(self, action: str, key: str):
+        params = {'key': key} if action == 'verify' else {'user': key}
+        return self.cached_request(action, key, params, fresh=True)
+    
+    async def fetch_info_by_key(self, key: str, fresh: bool = False):
+        """Get info by license key (user info helyett): the endpoint that usually answers goes first,
+        or both at once with KEYAUTH_HEDGED_LOOKUP=1; a failure returns the fetchuser answer as before"""
+        rejected = self.preflight(key, fresh)
+        if rejected is not None:
+            return rejected
+        if not fresh:
+            # cache találat: nem ment ki kérés, a tanuló statisztika sem számolja
+            cached = self.cache.get_first(self.lookup.order(key, touch=False), key)
+            if cached is not None:
+                return cached
+        order = self.lookup.order(key)
+        
+        started = time.perf_counter()
+        results: Dict[str, Dict[str, Any]] = {}
+        timings: Dict[str, float] = {}
+        winner = None
+        hedged = LOOKUP_CONFIG['hedge']
+        if hedged:
+            tasks = {asyncio.ensure_future(self._lookup_request(action, key)): action for action in order}
+            pending = set(tasks)
+            try:
+                while pending and winner is None:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in sorted(done, key=lambda t: order.index(tasks[t])):
+                        action = tasks[task]
+                        results[action] = task.result()
+                        timings[action] = time.perf_counter() - started
+                        if winner is None and results[action].get('success'):
+                            winner = action
+            finally:
+                for task in pending:
+                    task.cancel()
+        else:
+            for action in order:
+                request_started = time.perf_counter()
+                results[action] = await self._lookup_request(action, key)
+                timings[action] = time.perf_counter() - request_started
+                if results[action].get('success'):
+                    winner = action
+                    break
         
-        headers = {
-            'User-Agent': 'KeyAuth-Discord-Bot/1.0',
-            'Accept': 'application/json',
+        outcomes = {action: bool(result.get('success')) for action, result in results.items()}
+        self.lookup.record(key, order, winner, outcomes, timings, time.perf_counter() - started, hedged)
+        if winner is not None:
+            return results[winner]
+        if 'verify' in results:
+            self._remember_missing('verify', key, results['verify'])
+        return results.get('fetchuser') or results[order[0]]
+    
+    async def lookup_local(self, key: str) -> Optional[Dict[str, Any]]:
+        """Answer from the SQLite mirror (None if the mirror is disabled)"""
+        if not self.mirror:
+            return None
+        return await self.mirror.lookup(key)
+    
+    async def close(self):
+        if self._keepalive_task:
+            self._keepalive_task.cancel()
+            self._keepalive_task = None
+        if self.mirror:
+            await self.mirror.close()
+            self.mirror = None
+        if self.session and not self.session.closed:
+            await self.session.close()
+        self.session = None
+
+# Local SQLite license mirror (LICENSE_MIRROR=1 kapcsolja be)
+MIRROR_CONFIG = {
+    'enabled': os.environ.get("LICENSE_MIRROR", "0").lower() in ('1', 'true', 'yes'),
+    'path': os.environ.get("LICENSE_MIRROR_PATH", "license_mirror.db"),
+    'sync_interval': float(os.environ.get("LICENSE_MIRROR_SYNC_INTERVAL", "300")),
+    # a fetchallkeys / fetchallusers válasz ennyi soronként kerül az adatbázisba
+    'page_size': int(os.environ.get("LICENSE_MIRROR_PAGE_SIZE", "2000")),
+}
+
+_MIRROR_SCHEMA = """
+CREATE TABLE IF NOT EXISTS licenses (
+    key TEXT PRIMARY KEY,
+    level TEXT,
+    expiry TEXT,
+    status TEXT,
+    used_by TEXT,
+    hwid TEXT,
+    banned INTEGER NOT NULL DEFAULT 0,
+    note TEXT,
+    generated_by TEXT,
+    generated_on TEXT,
+    row_hash TEXT,
+    synced_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_licenses_level ON licenses(level);
+CREATE INDEX IF NOT EXISTS idx_licenses_expiry ON licenses(expiry);
+CREATE INDEX IF NOT EXISTS idx_licenses_hwid ON licenses(hwid);
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    hwid TEXT,
+    banned INTEGER NOT NULL DEFAULT 0,
+    row_hash TEXT,
+    synced_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_users_hwid ON users(hwid);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+_LICENSE_COLUMNS = ('key', 'level', 'expiry', 'status', 'used_by', 'hwid', 'banned', 'note', 'generated_by', 'generated_on')
+
+def _truthy(value) -> bool:
+    return str(value).lower() in ('true', '1', 'yes')
+
+class LicenseMirror:
+    """SQLite (WAL) copy of the application's licenses and users, refreshed by a background sync"""
+    def __init__(self, path: str):
+        self.path = path
+        self._db: Optional[sqlite3.Connection] = None
+        # minden DB művelet ugyanazon a szálon fut, az event loop nem blokkol
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="license-mirror")
+        self._task: Optional[asyncio.Task] = None
+        self.last_sync: Optional[float] = None
+        self.stats = {'syncs': 0, 'sync_errors': 0, 'inserted': 0, 'updated': 0, 'deleted': 0, 'local_writes': 0}
+    
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    def _open_db(self):
+        db = sqlite3.connect(self.path, check_same_thread=False)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.executescript(_MIRROR_SCHEMA)
+        row = db.execute("SELECT value FROM meta WHERE name = 'last_sync'").fetchone()
+        self.last_sync = float(row['value']) if row else None
+        self._db = db
+    
+    async def open(self):
+        if self._db is None:
+            await self._run(self._open_db)
+    
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+        if self._db is not None:
+            await self._run(self._db.close)
+            self._db = None
+        self._executor.shutdown(wait=False)
+    
+    def snapshot_age(self) -> Optional[float]:
+        return None if self.last_sync is None else time.time() - self.last_sync
+    
+    # Szinkronizálás
+    
+    @staticmethod
+    def _expiry_days(raw: Dict[str, Any]) -> str:
+        """fetchallkeys 'expires' is in seconds; the mirror (like the rest of the bot) keeps days"""
+        if 'expires' not in raw:
+            return str(raw.get('expiry', ''))
+        try:
+            return f"{round(float(raw['expires']) / 86400, 4):g}"
+        except (TypeError, ValueError):
+            return str(raw['expires'] or '')
+    
+    @staticmethod
+    def _license_row(raw: Dict[str, Any], hwids: Dict[str, str]) -> Dict[str, Any]:
+        used_by = raw.get('usedby') or raw.get('used_by') or None
+        return {
+            'key': raw.get('key'),
+            'level': str(raw.get('level', '')),
+            'expiry': LicenseMirror._expiry_days(raw),
+            'status': raw.get('status'),
+            'used_by': used_by,
+            'hwid': hwids.get(used_by) if used_by else None,
+            'banned': 1 if raw.get('banned') not in (None, '', False, '0', 0) else 0,
+            'note': raw.get('note'),
+            'generated_by': raw.get('genby'),
+            'generated_on': str(raw.get('gendate') or ''),
         }
+    
+    @staticmethod
+    def _row_hash(row: Dict[str, Any]) -> str:
+        return hashlib.sha1(json.dumps(row, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+    
+    def _begin_sync(self):
+        # a szinkron során változatlanul látott kulcsok / userek (a változottak synced_at-je a szinkron ideje)
+        self._db.execute("CREATE TEMP TABLE IF NOT EXISTS sync_seen_keys (key TEXT PRIMARY KEY)")
+        self._db.execute("CREATE TEMP TABLE IF NOT EXISTS sync_seen_users (username TEXT PRIMARY KEY)")
+        self._db.execute("DELETE FROM sync_seen_keys")
+        self._db.execute("DELETE FROM sync_seen_users")
+    
+    def _select_in(self, sql: str, names: List[str]) -> Dict[str, Any]:
+        """{name: value} for `sql` with an IN (...) placeholder, chunked under SQLite's variable limit"""
+        found = {}
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            found.update(self._db.execute(sql.format(', '.join('?' * len(chunk))), chunk).fetchall())
+        return found
+    
+    def _apply_user_page(self, users: List[Dict[str, Any]], now: float):
+        db = self._db
+        users = [u for u in users if u.get('username')]
+        existing = self._select_in("SELECT username, row_hash FROM users WHERE username IN ({})",
+                                   [u['username'] for u in users])
+        changed, unchanged = [], []
+        for raw in users:
+            username = raw['username']
+            row = (username, raw.get('hwid') or None, 1 if _truthy(raw.get('banned')) else 0)
+            row_hash = self._row_hash(row)
+            if existing.get(username) == row_hash:
+                unchanged.append((username,))
+            else:
+                changed.append(row + (row_hash, now))
+        with db:
+            db.executemany("INSERT OR REPLACE INTO users (username, hwid, banned, row_hash, synced_at) "
+                           "VALUES (?, ?, ?, ?, ?)", changed)
+            db.executemany("INSERT OR IGNORE INTO sync_seen_users (username) VALUES (?)", unchanged)
+    
+    def _apply_license_page(self, licenses: List[Dict[str, Any]], now: float) -> Dict[str, int]:
+        """Upsert one page of fetchallkeys rows; HWIDs come from the users synced just before"""
+        db = self._db
+        owners = list({raw.get('usedby') or raw.get('used_by') for raw in licenses} - {None, ''})
+        hwids = self._select_in("SELECT username, hwid FROM users WHERE username IN ({})", owners)
+        rows = [row for row in (self._license_row(raw, hwids) for raw in licenses) if row['key']]
+        existing = self._select_in("SELECT key, row_hash FROM licenses WHERE key IN ({})", [row['key'] for row in rows])
+        counts = {'inserted': 0, 'updated': 0}
+        changed, unchanged = [], []
+        for row in rows:
+            row_hash = self._row_hash(row)
+            if existing.get(row['key']) == row_hash:
+                unchanged.append((row['key'],))
+                continue
+            counts['updated' if row['key'] in existing else 'inserted'] += 1
+            changed.append([row[c] for c in _LICENSE_COLUMNS] + [row_hash, now])
+        with db:
+            db.executemany(
+                f"INSERT OR REPLACE INTO licenses ({', '.join(_LICENSE_COLUMNS)}, row_hash, synced_at) "
+                f"VALUES ({', '.join('?' * len(_LICENSE_COLUMNS))}, ?, ?)", changed
+            )
+            db.executemany("INSERT OR IGNORE INTO sync_seen_keys (key) VALUES (?)", unchanged)
+        return counts
+    
+    def _finish_sync(self, now: float, users_complete: bool) -> int:
+        """Delete what the finished sync did not see; returns the deleted license count.
+        Rows written by this sync carry synced_at = now, local writes made meanwhile a later time"""
+        db = self._db
+        with db:
+            deleted = db.execute("DELETE FROM licenses WHERE synced_at < ? AND key NOT IN "
+                                 "(SELECT key FROM sync_seen_keys)", (now,)).rowcount
+            if users_complete:
+                db.execute("DELETE FROM users WHERE synced_at < ? AND username NOT IN "
+                           "(SELECT username FROM sync_seen_users)", (now,))
+            db.execute("INSERT OR REPLACE INTO meta (name, value) VALUES ('last_sync', ?)", (str(now),))
+        self.last_sync = now
+        return deleted
+    
+    async def sync(self, api: "KeyAuthAPI") -> Dict[str, int]:
+        """Stream all users, then all licenses from the seller API into the mirror, one page at a time"""
+        now = time.time()
+        counts = {'inserted': 0, 'updated': 0, 'deleted': 0}
+        await self._run(self._begin_sync)
+        with request_priority('bulk'):
+            users_complete = True
+            try:
+                async for page in api.stream_records('fetchallusers', 'users', page_size=MIRROR_CONFIG['page_size']):
+                    await self._run(self._apply_user_page, page, now)
+            except RuntimeError as e:
+                # HWID nélkül is szinkronizálunk, csak a userek nem törlődnek
+                users_complete = False
+                log.warning("license mirror user sync failed", extra={'error': redact(str(e))})
+            try:
+                async for page in api.stream_records('fetchallkeys', 'keys', {'format': 'JSON'},
+                                                     page_size=MIRROR_CONFIG['page_size']):
+                    for name, value in (await self._run(self._apply_license_page, page, now)).items():
+                        counts[name] += value
+            except RuntimeError:
+                self.stats['sync_errors'] += 1
+                raise
+        counts['deleted'] = await self._run(self._finish_sync, now, users_complete)
+        self.stats['syncs'] += 1
+        for name, value in counts.items():
+            self.stats[name] += value
+        return counts
+    
+    async def run_periodic(self, api: "KeyAuthAPI", interval: float):
+        while True:
+            started = time.perf_counter()
+            try:
+                counts = await self.sync(api)
+                log.info("license mirror synced", extra={
+                    **counts, 'duration_ms': round((time.perf_counter() - started) * 1000, 1)
+                })
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning("license mirror sync failed", extra={'error': redact(str(e))})
+            await asyncio.sleep(interval)
+    
+    def start(self, api: "KeyAuthAPI", interval: float):
+        if self._task is None:
+            self._task = asyncio.create_task(self.run_periodic(api, interval))
+    
+    # Olvasás
+    
+    def _get(self, key: str) -> Optional[Dict[str, Any]]:
+        row = self._db.execute(
+            f"SELECT {', '.join(_LICENSE_COLUMNS)}, synced_at FROM licenses WHERE key = ?", (key,)
+        ).fetchone()
+        return dict(row) if row else None
+    
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if self._db is None:
+            return None
+        return await self._run(self._get, key)
+    
+    def _license_page(self, after: str, limit: int, where: str, args: List[Any]) -> List[Dict[str, Any]]:
+        rows = self._db.execute(
+            f"SELECT {', '.join(_LICENSE_COLUMNS)} FROM licenses WHERE key > ?{where} ORDER BY key LIMIT ?",
+            (after, *args, limit)
+        ).fetchall()
+        return [dict(row) for row in rows]
+    
+    async def license_page(self, after: str, limit: int, where: str = "", args: List[Any] = ()) -> List[Dict[str, Any]]:
+        """Up to `limit` licenses with key > `after` (keyset paging, `where` = extra ' AND ...' clauses)"""
+        return await self._run(self._license_page, after, limit, where, list(args))
+    
+    async def count_licenses(self, where: str = "", args: List[Any] = ()) -> int:
+        return await self._run(
+            lambda: self._db.execute(f"SELECT COUNT(*) FROM licenses WHERE 1{where}", list(args)).fetchone()[0]
+        )
+    
+    # Helyi írások (a bot saját műveletei azonnal látszanak)
+    
+    def _upsert_local(self, keys: List[str], level: str, expiry: str):
+        now = time.time()
+        with self._db:
+            self._db.executemany(
+                "INSERT OR IGNORE INTO licenses (key, level, expiry, status, banned, row_hash, synced_at) "
+                "VALUES (?, ?, ?, 'Not Used', 0, NULL, ?)",
+                [(key, level, expiry, now) for key in keys]
+            )
+    
+    def _delete_local(self, key: str):
+        with self._db:
+            self._db.execute("DELETE FROM licenses WHERE key = ?", (key,))
+    
+    def _reset_hwid_local(self, key: str):
+        with self._db:
+            self._db.execute("UPDATE licenses SET hwid = NULL, row_hash = NULL WHERE key = ?", (key,))
+            self._db.execute("UPDATE users SET hwid = NULL, row_hash = NULL WHERE username = "
+                             "(SELECT used_by FROM licenses WHERE key = ?)", (key,))
+    
+    async def apply_add(self, keys: List[str], level: str, expiry: str):
+        if self._db is not None and keys:
+            await self._run(self._upsert_local, keys, level, expiry)
+            self.stats['local_writes'] += 1
+    
+    async def apply_delete(self, key: str):
+        if self._db is not None:
+            await self._run(self._delete_local, key)
+            self.stats['local_writes'] += 1
+    
+    async def apply_hwid_reset(self, key: str):
+        if self._db is not None:
+            await self._run(self._reset_hwid_local, key)
+            self.stats['local_writes'] += 1
+    
+    async def lookup(self, key: str) -> Dict[str, Any]:
+        """Mirror row shaped like a verify response (success + fields)"""
+        row = await self.get(key)
+        if row is None:
+            return {"success": False, "message": "Key not found in local mirror"}
+        row.pop('synced_at', None)
+        row['banned'] = bool(row['banned'])
+        return {"success": True, "message": "Local mirror", **row}
+
+def format_age(seconds: Optional[float]) -> str:
+    if seconds is None:
+        return "never synced"
+    seconds = int(seconds)
+    if seconds < 60:
+        return f"{seconds}s"
+    if seconds < 3600:
+        return f"{seconds // 60}m {seconds % 60}s"
+    return f"{seconds // 3600}h {seconds % 3600 // 60}m"
+
+# Background job config (JOBS_ENABLED=1 kapcsolja be)
+JOB_CONFIG = {
+    # kikapcsolva a bulk/batch műveletek a régi módon, a parancson belül futnak
+    'enabled': os.environ.get("JOBS_ENABLED", "0").lower() in ('1', 'true', 'yes'),
+    # alapból a mirror adatbázis mellé kerül (JOBS_DB_PATH felülírja)
+    'path': os.environ.get("JOBS_DB_PATH") or os.path.join(os.path.dirname(MIRROR_CONFIG['path']), "jobs.db"),
+    'workers': int(os.environ.get("JOB_WORKERS", "2")),
+    # új job hiányában ilyen időközönként nézünk rá a sorra (más folyamat is tehet bele)
+    'poll_interval': float(os.environ.get("JOB_POLL_INTERVAL", "5")),
+    # a befejezett jobok ennyi nap után törlődnek
+    'retention_days': float(os.environ.get("JOB_RETENTION_DAYS", "7")),
+}
+
+_JOB_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    requested_by INTEGER,
+    channel_id INTEGER,
+    message_id INTEGER,
+    ephemeral INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status);
+CREATE TABLE IF NOT EXISTS job_items (
+    job_id INTEGER NOT NULL REFERENCES jobs(id) ON DELETE CASCADE,
+    item TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    message TEXT,
+    result TEXT,
+    updated REAL,
+    PRIMARY KEY (job_id, item)
+);
+CREATE INDEX IF NOT EXISTS idx_job_items_status ON job_items(job_id, status);
+"""
+
+JOB_ACTIVE_STATUSES = ('queued', 'running')
+
+class JobQueue:
+    """SQLite (WAL) job queue; every item's outcome is stored, so a restart resumes where it stopped.
+    
+    kinds: name -> {'run': async (params, item) -> (success, message, result), 'concurrency': int,
+    'idempotent': bool}. Idempotent kinds skip keys already queued in another active job and re-run
+    items interrupted by a restart; the others mark interrupted items failed instead.
+    """
+    def __init__(self, path: str, kinds: Dict[str, Dict[str, Any]], progress_interval: float = 2.0):
+        self.path = path
+        self.kinds = kinds
+        self.progress_interval = progress_interval
+        self._db: Optional[sqlite3.Connection] = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="job-queue")
+        self._workers: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._cancelled = set()
+        self._stopping = False
+        # async (job) -> None; a Discord oldali értesítés a bot rétegben van
+        self.on_progress: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+        self.on_finish: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
+        self.stats = {'enqueued': 0, 'finished': 0, 'cancelled': 0, 'resumed': 0, 'skipped_items': 0}
+    
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+    
+    def _open_db(self, recover: bool):
+        db = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+        db.row_factory = sqlite3.Row
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA foreign_keys=ON")
+        db.executescript(_JOB_SCHEMA)
+        if recover:
+            replayable = [kind for kind, spec in self.kinds.items() if spec['idempotent']]
+            marks = ','.join('?' * len(replayable)) or "''"
+            with db:
+                self.stats['resumed'] = db.execute(
+                    "UPDATE jobs SET status = 'queued' WHERE status = 'running'"
+                ).rowcount
+                db.execute(
+                    f"UPDATE job_items SET status = 'pending' WHERE status = 'running' "
+                    f"AND job_id IN (SELECT id FROM jobs WHERE kind IN ({marks}))", replayable
+                )
+                db.execute(
+                    "UPDATE job_items SET status = 'failed', message = ?, updated = ? WHERE status = 'running'",
+                    ("Interrupted by a restart (not retried)", time.time())
+                )
+                db.execute(
+                    "DELETE FROM jobs WHERE status NOT IN ('queued', 'running') AND finished < ?",
+                    (time.time() - JOB_CONFIG['retention_days'] * 86400,)
+                )
+        self._db = db
+    
+    async def open(self, recover: bool = True):
+        """recover: requeue jobs left running by a previous process (only one process may do this)"""
+        if self._db is None:
+            await self._run(self._open_db, recover)
+            if self.stats['resumed']:
+                log.info("jobs resumed after restart", extra={'jobs': self.stats['resumed']})
+    
+    def start(self, workers: int):
+        self._stopping = False
+        for worker_no in range(max(1, workers)):
+            self._workers.append(asyncio.create_task(self._worker(worker_no)))
+    
+    async def stop(self, timeout: float):
+        """Stop taking new items, let running ones finish; unfinished jobs stay 'running' and resume on restart"""
+        self._stopping = True
+        self._wakeup.set()
+        if self._workers:
+            _, pending = await asyncio.wait(self._workers, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            self._workers = []
+    
+    async def close(self):
+        if self._workers:
+            await self.stop(0)
+        if self._db is not None:
+            await self._run(self._db.close)
+            self._db = None
+        self._executor.shutdown(wait=False)
+    
+    # Adatbázis műveletek (a job-queue szálon)
+    
+    def _job_dict(self, row: sqlite3.Row) -> Dict[str, Any]:
+        job = dict(row)
+        job['params'] = json.loads(job['params'])
+        counts = dict(self._db.execute(
+            "SELECT status, COUNT(*) FROM job_items WHERE job_id = ? GROUP BY status", (job['id'],)
+        ).fetchall())
+        job['ok'] = counts.get('ok', 0)
+        job['failed'] = counts.get('failed', 0)
+        job['total'] = sum(counts.values())
+        job['done'] = job['ok'] + job['failed']
+        return job
+    
+    def _enqueue(self, kind: str, params: Dict[str, Any], items: List[str], requested_by: int,
+                 channel_id: Optional[int], message_id: Optional[int], ephemeral: bool) -> Tuple[Optional[int], int]:
+        unique = list(dict.fromkeys(items))
+        with self._db:
+            if self.kinds[kind]['idempotent']:
+                active = {row[0] for row in self._db.execute(
+                    "SELECT i.item FROM job_items i JOIN jobs j ON j.id = i.job_id "
+                    "WHERE j.kind = ? AND j.status IN ('queued', 'running') AND i.status IN ('pending', 'running')",
+                    (kind,)
+                )}
+                unique = [item for item in unique if item not in active]
+            skipped = len(items) - len(unique)
+            if not unique:
+                return None, skipped
+            job_id = self._db.execute(
+                "INSERT INTO jobs (kind, status, params, requested_by, channel_id, message_id, ephemeral, created) "
+                "VALUES (?, 'queued', ?, ?, ?, ?, ?, ?)",
+                (kind, json.dumps(params), requested_by, channel_id, message_id, int(ephemeral), time.time())
+            ).lastrowid
+            self._db.executemany(
+                "INSERT INTO job_items (job_id, item) VALUES (?, ?)", [(job_id, item) for item in unique]
+            )
+        return job_id, skipped
+    
+    def _claim(self) -> Optional[Dict[str, Any]]:
+        with self._db:
+            row = self._db.execute("SELECT id FROM jobs WHERE status = 'queued' ORDER BY id LIMIT 1").fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE jobs SET status = 'running', started = COALESCE(started, ?) WHERE id = ?",
+                (time.time(), row['id'])
+            )
+        return self._get(row['id'])
+    
+    def _get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        row = self._db.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job_dict(row) if row else None
+    
+    def _list(self, limit: int) -> List[Dict[str, Any]]:
+        rows = self._db.execute("SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)).fetchall()
+        return [self._job_dict(row) for row in rows]
+    
+    def _pending_items(self, job_id: int) -> List[str]:
+        return [row[0] for row in self._db.execute(
+            "SELECT item FROM job_items WHERE job_id = ? AND status = 'pending' ORDER BY rowid", (job_id,)
+        )]
+    
+    def _set_item(self, job_id: int, item: str, status: str, message: Optional[str], result: Optional[str]):
+        with self._db:
+            self._db.execute(
+                "UPDATE job_items SET status = ?, message = ?, result = ?, updated = ? WHERE job_id = ? AND item = ?",
+                (status, message, result, time.time(), job_id, item)
+            )
+    
+    def _results(self, job_id: int) -> List[sqlite3.Row]:
+        return self._db.execute(
+            "SELECT item, status, message, result FROM job_items WHERE job_id = ? ORDER BY rowid", (job_id,)
+        ).fetchall()
+    
+    def _set_status(self, job_id: int, status: str, from_statuses: Tuple[str, ...], error: str = None) -> bool:
+        marks = ','.join('?' * len(from_statuses))
+        with self._db:
+            return self._db.execute(
+                f"UPDATE jobs SET status = ?, error = COALESCE(?, error), finished = ? WHERE id = ? AND status IN ({marks})",
+                (status, error, time.time(), job_id, *from_statuses)
+            ).rowcount > 0
+    
+    def _status(self, job_id: int) -> Optional[str]:
+        row = self._db.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row[0] if row else None
+    
+    # Publikus API
+    
+    async def enqueue(self, kind: str, params: Dict[str, Any], items: List[str], requested_by: int,
+                      channel_id: int = None, message_id: int = None, ephemeral: bool = False) -> Tuple[Optional[int], int]:
+        """Returns (job id or None if nothing was left to do, items skipped as duplicates)"""
+        job_id, skipped = await self._run(
+            self._enqueue, kind, params, items, requested_by, channel_id, message_id, ephemeral
+        )
+        self.stats['skipped_items'] += skipped
+        if job_id is not None:
+            self.stats['enqueued'] += 1
+            self._wakeup.set()
+            log.info("job enqueued", extra={'job': job_id, 'kind': kind, 'items': len(items) - skipped, 'skipped': skipped})
+        return job_id, skipped
+    
+    async def get(self, job_id: int) -> Optional[Dict[str, Any]]:
+        return await self._run(self._get, job_id)
+    
+    async def list_jobs(self, limit: int = 10) -> List[Dict[str, Any]]:
+        return await self._run(self._list, limit)
+    
+    async def results(self, job_id: int) -> List[sqlite3.Row]:
+        return await self._run(self._results, job_id)
+    
+    async def cancel(self, job_id: int) -> bool:
+        """Queued jobs never start; running ones stop before their next item"""
+        previous = await self._run(self._status, job_id)
+        cancelled = await self._run(self._set_status, job_id, 'cancelled', JOB_ACTIVE_STATUSES)
+        if cancelled:
+            self._cancelled.add(job_id)
+            self.stats['cancelled'] += 1
+            log.info("job cancelled", extra={'job': job_id, 'was': previous})
+            if previous == 'queued':
+                # futó jobnál a worker értesít, amikor megáll
+                await self._notify(self.on_finish, job_id)
+        return cancelled
+    
+    # Worker
+    
+    async def _worker(self, worker_no: int):
+        while not self._stopping:
+            self._wakeup.clear()
+            job = await self._run(self._claim)
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=JOB_CONFIG['poll_interval'])
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            try:
+                await self._execute(job)
+            except Exception as e:
+                log.error("job failed", extra={'job': job['id'], 'kind': job['kind'], 'error': redact(str(e))})
+                await self._run(self._set_status, job['id'], 'failed', ('running',), redact(str(e)))
+                await self._notify(self.on_finish, job['id'])
+    
+    async def _notify(self, callback, job_id: int):
+        if callback is None:
+            return
+        try:
+            await callback(await self.get(job_id))
+        except Exception as e:
+            log.warning("job notification failed", extra={'job': job_id, 'error': str(e)})
+    
+    async def _execute(self, job: Dict[str, Any]):
+        job_id = job['id']
+        spec = self.kinds[job['kind']]
+        params = job['params']
+        items = await self._run(self._pending_items, job_id)
+        semaphore = asyncio.Semaphore(max(1, spec['concurrency']))
+        last_report = 0.0
+        log.info("job started", extra={'job': job_id, 'kind': job['kind'], 'pending': len(items), 'total': job['total']})
+        
+        def halted() -> bool:
+            return self._stopping or job_id in self._cancelled
+        
+        async def report():
+            nonlocal last_report
+            now = time.monotonic()
+            if now - last_report < self.progress_interval:
+                return
+            last_report = now
+            # más folyamatból érkezett lemondás is itt derül ki
+            if await self._run(self._status, job_id) == 'cancelled':
+                self._cancelled.add(job_id)
+            await self._notify(self.on_progress, job_id)
         
-        try:
-            print(f"\n[API REQUEST] Action: {action}")
-            print(f"[API REQUEST] Data: {data}")
-            print(f"[API REQUEST] Full URL: {full_url[:100]}...")
-            
-            async with self.session.get(full_url, headers=headers, timeout=30) as response:
-                response_text = await response.text()
-                response_text = response_text.strip()
-                
-                print(f"[API RESPONSE] Status: {response.status}")
-                print(f"[API RESPONSE] Raw: '{response_text}'")
-                
-                # Próbáljuk JSON-ként értelmezni
+        async def run_item(item: str):
+            async with semaphore:
+                if halted():
+                    return
+                await self._run(self._set_item, job_id, item, 'running', None, None)
                 try:
-                    result = json.loads(response_text)
-                    print(f"[API] JSON parsed successfully")
-                    return result
-                        
-                except json.JSONDecodeError:
-                    # Ha nem JSON, akkor szöveges válasz
-                    print(f"[API] Response is plain text")
-                    
-                    if not response_text or response_text.isspace():
-                        return {"success": False, "message": "Empty response from API"}
-                    
-                    # Kulcs generálás - ha kulcs formátumú a válasz
-                    if action == 'add' and re.match(r'^[A-Za-z0-9\-]{10,}$', response_text):
-                        return {"success": True, "key": response_text, "message": "License key generated"}
-                    
-                    # Sikeres műveletek
-                    success_keywords = ['success', 'successful', 'deleted', 'reset', 'banned', 'unbanned', 'verified']
-                    if any(keyword in response_text.lower() for keyword in success_keywords):
-                        return {"success": True, "message": response_text}
-                    
-                    # Hiba esetek
-                    error_keywords = ['error', 'invalid', 'failed', 'not found', 'unhandled']
-                    if any(keyword in response_text.lower() for keyword in error_keywords):
-                        return {"success": False, "message": response_text}
-                    
-                    # Alapértelmezett
-                    if response.status == 200:
-                        return {"success": True, "message": response_text}
-                    else:
-                        return {"success": False, "message": f"HTTP {response.status}: {response_text}"}
-                        
-        except aiohttp.ClientError as e:
-            print(f"[API ERROR] Network error: {e}")
-            return {
-                "success": False,
-                "message": f"Network error: {str(e)}"
-            }
-        except Exception as e:
-            print(f"[API ERROR] Unexpected error: {e}")
-            return {
-                "success": False,
-                "message": f"Unexpected error: {str(e)}"
-            }
+                    success, message, result = await spec['run'](params, item)
+                except Exception as e:
+                    success, message, result = False, f"Error: {e}", None
+                await self._run(self._set_item, job_id, item, 'ok' if success else 'failed', message, result)
+            await report()
+        
+        await self._notify(self.on_progress, job_id)
+        await asyncio.gather(*(run_item(item) for item in items))
+        
+        if self._stopping and job_id not in self._cancelled:
+            return  # 'running' marad, újraindítás után folytatódik
+        self._cancelled.discard(job_id)
+        if await self._run(self._set_status, job_id, 'done', ('running',)):
+            self.stats['finished'] += 1
+        log.info("job finished", extra={'job': job_id, 'kind': job['kind']})
+        await self._notify(self.on_finish, job_id)
+
+# Local key generator config
+KEYGEN_CONFIG = {
+    # már kiadott kulcsok listája (soronként egy, vagy CSV első oszlop) az ütközés-ellenőrzéshez
+    'issued_file': os.environ.get("KEYGEN_ISSUED_FILE", ""),
+    'index': os.environ.get("KEYGEN_ISSUED_INDEX", "set"),  # set / bloom
+    'bloom_capacity': int(os.environ.get("KEYGEN_BLOOM_CAPACITY", "1000000")),
+    'bloom_error_rate': float(os.environ.get("KEYGEN_BLOOM_ERROR_RATE", "0.001")),
+}
+
+_KEY_ALPHABET = string.ascii_uppercase + string.digits
+# 252 = 7 * 36: az e feletti bájtokat eldobjuk, így a b % 36 leképezés torzítatlan
+_KEY_BYTE_LIMIT = 256 - 256 % len(_KEY_ALPHABET)
+_KEY_BYTE_TABLE = bytes(ord(_KEY_ALPHABET[b % len(_KEY_ALPHABET)]) for b in range(256))
+_KEY_REJECTED_BYTES = bytes(range(_KEY_BYTE_LIMIT, 256))
+_KEY_BODY_LEN = 11  # XXXX + XXXX + XXX
+
+class BloomFilter:
+    """Fixed-size Bloom filter (double hashing over one blake2b digest)"""
+    def __init__(self, capacity: int, error_rate: float):
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
     
-    # SPECIFIKUS MŰVELETEK
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
     
-    async def add_license(self, expiry: str, level: str, mask: str = "Corvus-****-****-***", amount: int = 1):
-        """Generate license key(s) - Corvus formátum alapértelmezett"""
-        params = {
-            'expiry': expiry,
-            'level': level,
-            'amount': str(amount)
-        }
-        if mask:
-            params['mask'] = mask
-            
-        return await self.make_request('add', params)
+    def add(self, item: str):
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
     
-    async def delete_license(self, key: str, user_too: bool = False):
-        """Delete license key"""
-        params = {
-            'key': key,
-            'userToo': '1' if user_too else '0'
-        }
-        return await self.make_request('del', params)
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
     
-    async def reset_hwid_by_key(self, key: str):
-        """Reset HWID by license key (nem username!)"""
-        params = {'user': key}
-        return await self.make_request('resetuser', params)
+    def add_new(self, item: str) -> bool:
+        """Insert and report whether the item was (probably) new, hashing only once"""
+        bits = self.bits
+        new = False
+        for pos in self._positions(item):
+            mask = 1 << (pos & 7)
+            if not bits[pos >> 3] & mask:
+                bits[pos >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
     
-    async def verify_key(self, key: str):
-        """Verify/check license key"""
-        params = {'key': key}
-        return await self.make_request('verify', params)
+    def __len__(self) -> int:
+        return self.count
+
+class IssuedKeyIndex:
+    """Already-issued keys, as an exact set or a memory-bounded Bloom filter"""
+    def __init__(self, mode: str = "set", capacity: int = 1000000, error_rate: float = 0.001):
+        self.mode = 'bloom' if mode == 'bloom' else 'set'
+        self._store = BloomFilter(capacity, error_rate) if self.mode == 'bloom' else set()
+        self.collisions = 0
     
-    async def fetch_info_by_key(self, key: str):
-        """Get info by license key (user info helyett)"""
-        verify_result = await self.verify_key(key)
-        if verify_result.get('success'):
-            return verify_result
-        
-        params = {'user': key}
-        return await self.make_request('fetchuser', params)
+    def add(self, key: str):
+        self._store.add(key)
     
-    async def close(self):
-        if self.session:
-            await self.session.close()
+    def update(self, keys):
+        for key in keys:
+            self._store.add(key)
+    
+    def __contains__(self, key: str) -> bool:
+        return key in self._store
+    
+    def __len__(self) -> int:
+        return len(self._store)
+    
+    def add_new(self, key: str) -> bool:
+        """Add the key; False (and a counted collision) if it was already issued"""
+        if self.mode == 'bloom':
+            new = self._store.add_new(key)
+        else:
+            new = key not in self._store
+            if new:
+                self._store.add(key)
+        if not new:
+            self.collisions += 1
+        return new
+    
+    def load_file(self, path: str) -> int:
+        """Load keys from a .txt (one per line) or .csv (first column) file, returns the count"""
+        loaded = 0
+        with open(path, newline='', encoding='utf-8') as f:
+            rows = csv.reader(f) if path.lower().endswith('.csv') else ([line] for line in f)
+            for row in rows:
+                key = row[0].strip() if row else ''
+                if key and key.lower() != 'key':
+                    self._store.add(key)
+                    loaded += 1
+        return loaded
+
+issued_keys = IssuedKeyIndex(KEYGEN_CONFIG['index'], KEYGEN_CONFIG['bloom_capacity'], KEYGEN_CONFIG['bloom_error_rate'])
+
+def generate_corvus_keys(amount: int, issued: Optional[IssuedKeyIndex] = None, prefix: str = "Corvus") -> List[str]:
+    """Generate `amount` unique Corvus-XXXX-XXXX-XXX keys from one CSPRNG buffer per pass"""
+    keys: List[str] = []
+    if issued is None:
+        issued = IssuedKeyIndex()
+    while len(keys) < amount:
+        need = amount - len(keys)
+        # ~1.6% bájt esik ki az elutasításnál, egy kis ráhagyással kérünk
+        raw = secrets.token_bytes(need * _KEY_BODY_LEN * 105 // 100 + 16)
+        body = raw.translate(_KEY_BYTE_TABLE, _KEY_REJECTED_BYTES).decode('ascii')
+        usable = min(need, len(body) // _KEY_BODY_LEN) * _KEY_BODY_LEN
+        for i in range(0, usable, _KEY_BODY_LEN):
+            key = f"{prefix}-{body[i:i + 4]}-{body[i + 4:i + 8]}-{body[i + 8:i + 11]}"
+            if issued.add_new(key):
+                keys.append(key)
+    return keys
 
 # Helper function to generate Corvus format key
 def generate_corvus_key():
     """Generate a Corvus-XXXX-XXXX-XXX format key"""
-    parts = [
-        'Corvus',
-        ''.join(random.choices(string.ascii_uppercase + string.digits, k=4)),
-        ''.join(random.choices(string.ascii_uppercase + string.digits, k=4)),
-        ''.join(random.choices(string.ascii_uppercase + string.digits, k=3))
-    ]
-    return '-'.join(parts)
+    return generate_corvus_keys(1, issued_keys)[0]
 
 # Initialize KeyAuth API
 keyauth = KeyAuthAPI(KEYAUTH_CONFIG['seller_key'], KEYAUTH_CONFIG['api_url'])
 
+def collect_keyauth_metrics():
+    for name, value in keyauth.get_pool_stats().items():
+        metrics.set('keyauth_pool_stat', value, stat=name)
+    for name, value in keyauth.cache.get_stats().items():
+        metrics.set('keyauth_cache_stat', value, stat=name)
+    for name, value in keyauth.flight_stats.items():
+        metrics.set('keyauth_singleflight_total', value, kind=name)
+    metrics.set('keyauth_circuit_state', {'closed': 0, 'half_open': 1, 'open': 2}[keyauth.breaker.state])
+    metrics.set('keyauth_retries_total', keyauth.retry_stats['retries'])
+    for name, value in keyauth.negative.get_stats().items():
+        metrics.set('keyauth_negative_cache_stat', value, stat=name)
+    for priority in PRIORITY_CLASSES:
+        metrics.set('keyauth_schedule_queue_depth', keyauth.scheduler.depth(priority), priority=priority)
+        metrics.set('keyauth_schedule_active', keyauth.scheduler.active[priority], priority=priority)
+
+metrics.describe('keyauth_pool_stat', 'gauge', 'KeyAuth connection pool counters')
+metrics.describe('keyauth_cache_stat', 'gauge', 'KeyAuth response cache counters')
+metrics.describe('keyauth_singleflight_total', 'counter', 'Upstream vs coalesced read requests')
+metrics.describe('keyauth_circuit_state', 'gauge', 'Circuit breaker state (0 = closed, 1 = half-open, 2 = open)')
+metrics.describe('keyauth_retries_total', 'counter', 'KeyAuth request retries')
+metrics.describe('keyauth_negative_cache_stat', 'gauge', 'Negative cache of missing/deleted license keys')
+metrics.describe('keyauth_preflight_total', 'counter', 'Key requests answered locally before any network call')
+metrics.describe('keyauth_schedule_queue_depth', 'gauge', 'KeyAuth calls waiting for an upstream slot')
+metrics.describe('keyauth_schedule_active', 'gauge', 'KeyAuth calls holding an upstream slot')
+metrics.add_collector(collect_keyauth_metrics)
+
+class CorvusCommandTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        # ugyanabban a taskban fut, mint a parancs, így a KeyAuth hívások guild/user szerint ütemeződnek
+        bind_request_context(interaction.guild_id, interaction.user.id, deadline=interaction_deadline(interaction))
+        return True
+
+# message_content nélkül a '!' parancsok csak megemlítéssel (@bot info ...) működnek
+bot = CorvusBot(command_prefix=commands.when_mentioned_or('!'), http_trace=build_discord_http_trace(),
+                tree_cls=CorvusCommandTree, **gateway_options, **build_shard_options())
+
+@bot.before_invoke
+async def start_command_timer(ctx):
+    ctx.started_at = time.perf_counter()
+    bind_request_context(getattr(ctx.guild, 'id', None), ctx.author.id)
+
+@bot.after_invoke
+async def record_command_timer(ctx):
+    started = getattr(ctx, 'started_at', None)
+    if started is not None:
+        metrics.observe('discord_handler_duration_seconds', time.perf_counter() - started,
+                        kind='command', handler=ctx.command.qualified_name)
+
 # Helper functions
 def create_embed(title: str, description: str, color=discord.Color.blue(), fields: list = None):
     embed = discord.Embed(
@@ -205,6 +2794,1129 @@ def create_success_embed(title: str, success_msg: str):
         discord.Color.green()
     )
 
+# Message edit scheduler config
+EDIT_CONFIG = {
+    # ugyanazt az üzenetet legfeljebb ilyen gyakran szerkesztjük (progress), másodperc
+    'min_interval': float(os.environ.get("EDIT_MIN_INTERVAL", "1.0")),
+    # csatornánként (Discord: kb. 5 szerkesztés / 5 mp)
+    'channel_rate': float(os.environ.get("EDIT_CHANNEL_RATE", "1.0")),
+    'channel_burst': int(os.environ.get("EDIT_CHANNEL_BURST", "5")),
+}
+
+class EditScheduler:
+    """Latest-wins message edits: one pending payload per message, flushed at a bounded per-message and per-channel rate"""
+    def __init__(self, min_interval: float, channel_rate: float, channel_burst: int):
+        self.min_interval = min_interval
+        self.channel_rate = channel_rate
+        self.channel_burst = channel_burst
+        self._pending: Dict[int, Dict[str, Any]] = {}
+        self._messages: Dict[int, Any] = {}
+        self._flushers: Dict[int, asyncio.Task] = {}
+        self._locks: Dict[int, asyncio.Lock] = {}
+        self._lock_users: Dict[int, int] = {}
+        self._last_edit: OrderedDict = OrderedDict()
+        self._finalized: OrderedDict = OrderedDict()
+        self._buckets: OrderedDict = OrderedDict()  # channel -> TokenBucket, legrégebben használt elöl
+        self._bucket_users: Dict[int, int] = {}
+        self.stats = {'submitted': 0, 'flushed': 0, 'dropped': 0, 'throttled': 0, 'rate_limited': 0, 'errors': 0}
+    
+    @staticmethod
+    def _remember(store: OrderedDict, key: int, value, limit: int = 1024):
+        store[key] = value
+        store.move_to_end(key)
+        while len(store) > limit:
+            store.popitem(last=False)
+    
+    @asynccontextmanager
+    async def _locked(self, key: int):
+        """Per-message lock, dropped once nobody holds or waits for it"""
+        lock = self._locks.get(key)
+        if lock is None:
+            lock = self._locks[key] = asyncio.Lock()
+        self._lock_users[key] = self._lock_users.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._lock_users[key] -= 1
+            if not self._lock_users[key]:
+                del self._lock_users[key]
+                self._locks.pop(key, None)
+    
+    def _evict_idle_buckets(self):
+        """Drop channel buckets nobody waits on that have refilled to burst: a new one starts the same way"""
+        now = time.monotonic()
+        while self._buckets:
+            channel_id, bucket = next(iter(self._buckets.items()))
+            if self._bucket_users.get(channel_id):
+                return
+            if bucket.rate > 0 and bucket.tokens + (now - bucket.updated) * bucket.rate < bucket.burst:
+                return
+            del self._buckets[channel_id]
+    
+    def _bucket(self, channel_id: int) -> TokenBucket:
+        self._evict_idle_buckets()
+        bucket = self._buckets.get(channel_id)
+        if bucket is None:
+            bucket = self._buckets[channel_id] = TokenBucket(self.channel_rate, self.channel_burst)
+        self._buckets.move_to_end(channel_id)
+        return bucket
+    
+    async def _wait_turn(self, key: int, message, spacing: bool):
+        """Hold the edit back until it fits the budget; every hold is a 429 we did not trigger"""
+        held = False
+        if spacing:
+            wait = self._last_edit.get(key, 0.0) + self.min_interval - time.monotonic()
+            if wait > 0:
+                held = True
+                await asyncio.sleep(wait)
+        channel_id = getattr(getattr(message, 'channel', None), 'id', 0)
+        bucket = self._bucket(channel_id)
+        throttled = bucket.throttled
+        self._bucket_users[channel_id] = self._bucket_users.get(channel_id, 0) + 1
+        try:
+            await bucket.acquire()
+        finally:
+            self._bucket_users[channel_id] -= 1
+            if not self._bucket_users[channel_id]:
+                del self._bucket_users[channel_id]
+        if held or bucket.throttled != throttled:
+            self.stats['throttled'] += 1
+    
+    async def _edit(self, key: int, message, payload: Dict[str, Any]):
+        try:
+            result = await message.edit(**payload)
+            self.stats['flushed'] += 1
+            return result
+        except discord.HTTPException as e:
+            self.stats['errors'] += 1
+            if e.status == 429:
+                self.stats['rate_limited'] += 1
+            raise
+        finally:
+            self._remember(self._last_edit, key, time.monotonic())
+    
+    def submit(self, message, **payload):
+        """Queue a progress edit; an older payload still waiting for the same message is dropped"""
+        key = message.id
+        self.stats['submitted'] += 1
+        if key in self._finalized or key in self._pending:
+            # a késve érkező progress nem írhatja felül a végeredményt
+            self.stats['dropped'] += 1
+            if key in self._finalized:
+                return
+        self._pending[key] = payload
+        self._messages[key] = message
+        if key not in self._flushers:
+            self._flushers[key] = asyncio.create_task(self._flush(key))
+    
+    async def _flush(self, key: int):
+        try:
+            while key in self._pending:
+                async with self._locked(key):
+                    message = self._messages[key]
+                    await self._wait_turn(key, message, spacing=True)
+                    payload = self._pending.pop(key, None)
+                    if payload is None:
+                        continue  # közben final() átvette
+                    try:
+                        await self._edit(key, message, payload)
+                    except discord.HTTPException:
+                        pass  # csak progress, a következő frissítés úgyis jön
+        finally:
+            self._flushers.pop(key, None)
+            if key not in self._pending:
+                self._messages.pop(key, None)
+    
+    async def final(self, message, **payload):
+        """Last edit of a flow: drops pending progress, waits for an in-flight flush, then edits (errors propagate)"""
+        key = message.id
+        self.stats['submitted'] += 1
+        self._remember(self._finalized, key, True)
+        if self._pending.pop(key, None) is not None:
+            self.stats['dropped'] += 1
+        async with self._locked(key):
+            await self._wait_turn(key, message, spacing=False)
+            return await self._edit(key, message, payload)
+
+edit_scheduler = EditScheduler(EDIT_CONFIG['min_interval'], EDIT_CONFIG['channel_rate'], EDIT_CONFIG['channel_burst'])
+
+def collect_edit_metrics():
+    for name, value in edit_scheduler.stats.items():
+        metrics.set('discord_message_edits_total', value, stat=name)
+
+metrics.describe('discord_message_edits_total', 'counter', 'Scheduled message edits (flushed, dropped as superseded, throttled to avoid 429)')
+metrics.add_collector(collect_edit_metrics)
+
+# Paginated result views
+class JumpToPageModal(discord.ui.Modal, title="🔢 Jump to Page"):
+    page = discord.ui.TextInput(label="Page number", required=True, max_length=6)
+    
+    def __init__(self, paginator: "PaginatorView"):
+        super().__init__()
+        self.paginator = paginator
+        self.page.placeholder = f"1 - {paginator.page_count}"
+    
+    async def on_submit(self, interaction: discord.Interaction):
+        try:
+            page = int(self.page.value.strip()) - 1
+        except ValueError:
+            await interaction.response.send_message(
+                embed=create_error_embed("Invalid Input", "Please enter a valid page number!"), ephemeral=True
+            )
+            return
+        await self.paginator.show_page(interaction, page)
+
+class PaginatorView(discord.ui.View):
+    """Pages over a compact backing list; an embed is rendered only for the page being shown"""
+    def __init__(
+        self,
+        items: list,
+        render_page: Callable[[list, int, int], discord.Embed],
+        per_page: int = 10,
+        export: Callable[[], discord.File] = None,
+        timeout: float = 600,
+        page_starts: List[int] = None
+    ):
+        super().__init__(timeout=timeout)
+        self.items = items
+        self.render_page = render_page
+        self.per_page = max(1, per_page)
+        # oldalak kezdő indexei; alapból fix per_page, szöveges listáknál karakterkeret szerint
+        self.page_starts = page_starts or list(range(0, max(1, len(items)), self.per_page))
+        self.export = export
+        self.page = 0
+        self.message = None
+        if export is None:
+            self.remove_item(self.export_button)
+        if self.page_count <= 1:
+            for button in (self.prev_button, self.page_button, self.next_button, self.jump_button):
+                self.remove_item(button)
+        self._sync_buttons()
+    
+    @property
+    def page_count(self) -> int:
+        return len(self.page_starts)
+    
+    def render(self) -> discord.Embed:
+        start = self.page_starts[self.page]
+        end = self.page_starts[self.page + 1] if self.page + 1 < self.page_count else len(self.items)
+        embed = self.render_page(self.items[start:end], self.page, self.page_count)
+        if self.page_count > 1:
+            embed.set_footer(text=f"Page {self.page + 1}/{self.page_count} • {embed.footer.text}")
+        return embed
+    
+    def _sync_buttons(self):
+        self.prev_button.disabled = self.page == 0
+        self.next_button.disabled = self.page >= self.page_count - 1
+        self.page_button.label = f"{self.page + 1}/{self.page_count}"
+    
+    async def show_page(self, interaction: discord.Interaction, page: int):
+        self.page = min(max(0, page), self.page_count - 1)
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=self.render(), view=self)
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message(
+                embed=create_error_embed(
+                    "Permission Denied",
+                    "❌ You need **Administrator** permission to use the KeyAuth System!"
+                ),
+                ephemeral=True
+            )
+            return False
+        return True
+    
+    async def on_timeout(self):
+        for child in self.children:
+            child.disabled = True
+        if self.message:
+            try:
+                await self.message.edit(view=self)
+            except discord.HTTPException:
+                pass
+    
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary, row=0)
+    async def prev_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.page - 1)
+    
+    @discord.ui.button(label="1/1", style=discord.ButtonStyle.secondary, disabled=True, row=0)
+    async def page_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        pass
+    
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary, row=0)
+    async def next_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self.show_page(interaction, self.page + 1)
+    
+    @discord.ui.button(label="Jump", style=discord.ButtonStyle.secondary, emoji="🔢", row=0)
+    async def jump_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(JumpToPageModal(self))
+    
+    @discord.ui.button(label="Export all", style=discord.ButtonStyle.primary, emoji="📎", row=0)
+    async def export_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_message(file=self.export(), ephemeral=True)
+
+# Discord embed mező értékének felső korlátja
+FIELD_VALUE_LIMIT = 1024
+
+def field_page_starts(lines: list, format_line: Callable[[Any], str], per_page: int,
+                      budget: int = FIELD_VALUE_LIMIT) -> List[int]:
+    """Page start indexes: at most `per_page` lines and `budget` characters (newlines included) per page"""
+    starts = [0]
+    used = count = 0
+    for index, line in enumerate(lines):
+        size = min(len(format_line(line)), budget)
+        if count and (count >= per_page or used + 1 + size > budget):
+            starts.append(index)
+            used = count = 0
+        used += size + (1 if count else 0)
+        count += 1
+    return starts
+
+def paginated_lines_view(
+    make_embed: Callable[[], discord.Embed],
+    field_name: str,
+    lines: list,
+    per_page: int = 15,
+    trailing_fields: list = None,
+    export: Callable[[], discord.File] = None,
+    format_line: Callable[[Any], str] = str
+) -> PaginatorView:
+    """Items (keys, per-key results) formatted into one embed field per page, up to `per_page` lines
+    and never more than the field limit, so no line is cut off or dropped"""
+    def render_page(page_lines: list, page: int, pages: int) -> discord.Embed:
+        embed = make_embed()
+        name = field_name if pages <= 1 else f"{field_name} ({page + 1}/{pages})"
+        value = "\n".join(format_line(line)[:FIELD_VALUE_LIMIT] for line in page_lines)
+        embed.add_field(name=name, value=value or "-", inline=False)
+        for name, value, inline in trailing_fields or []:
+            embed.add_field(name=name, value=value, inline=inline)
+        return embed
+    return PaginatorView(lines, render_page, per_page=per_page, export=export,
+                         page_starts=field_page_starts(lines, format_line, per_page))
+
+def paginated_fields_view(
+    make_embed: Callable[[], discord.Embed],
+    fields: List[Tuple[str, str]],
+    per_page: int = 12,
+    export_name: str = None
+) -> PaginatorView:
+    """Inline (name, value) fields, full values up to Discord's 1024 limit instead of a fixed cut"""
+    def render_page(page_fields: list, page: int, pages: int) -> discord.Embed:
+        embed = make_embed()
+        for name, value in page_fields:
+            embed.add_field(name=name, value=value[:1024] or "-", inline=True)
+        return embed
+    
+    export = None
+    if export_name:
+        def export() -> discord.File:
+            text = "\n".join(f"{name}: {value}" for name, value in fields)
+            return discord.File(io.BytesIO(text.encode('utf-8')), filename=f"{export_name}.txt")
+    return PaginatorView(fields, render_page, per_page=per_page, export=export)
+
+def text_file(lines: List[str], filename: str) -> discord.File:
+    return discord.File(io.BytesIO("\n".join(lines).encode('utf-8')), filename=filename)
+
+def generated_keys_view(user_mention: str, keys: List[str], level: str, expiry: str, mask: str,
+                        note: str = "", extra_fields: list = None, export: bool = True) -> PaginatorView:
+    """Public 'keys generated' embed with the key list paginated (and exportable)"""
+    generated_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    
+    def make_embed() -> discord.Embed:
+        return create_success_embed(
+            "✅ Corvus Keys Generated!",
+            f"**{user_mention} successfully generated {len(keys)} Corvus license key(s)!**\n\n"
+            f"📊 **Details:**\n"
+            f"• Level: **{level}**\n"
+            f"• Expiry: **{expiry} days**\n"
+            f"• Format: `{mask}`\n"
+            f"• Generated by: {user_mention}\n"
+            f"• Time: {generated_at}{note}"
+        )
+    
+    return paginated_lines_view(
+        make_embed,
+        f"Generated Key{'s' if len(keys) > 1 else ''}:",
+        keys,
+        per_page=20,
+        trailing_fields=(extra_fields or []) + [
+            ("Important", "These keys are now active in the system. Keep them secure!", False)
+        ],
+        export=(lambda: text_file(keys, "corvus_keys.txt")) if export else None,
+        format_line=lambda key: f"`{key}`"
+    )
+
+# Bulk generation config
+BULK_CONFIG = {
+    'max_amount': int(os.environ.get("KEYGEN_BULK_MAX", "5000")),
+    'chunk_size': int(os.environ.get("KEYGEN_BULK_CHUNK", "10")),
+    'concurrency': int(os.environ.get("KEYGEN_BULK_CONCURRENCY", "3")),
+    'progress_interval': float(os.environ.get("KEYGEN_BULK_PROGRESS_INTERVAL", "2")),
+    'batch_max_keys': int(os.environ.get("KEYGEN_BATCH_MAX_KEYS", "2000")),
+    'batch_concurrency': int(os.environ.get("KEYGEN_BATCH_CONCURRENCY", "4")),
+}
+# Eddig a mennyiségig a kulcsok az embedben jelennek meg, felette bulk mód + csatolmány
+MAX_INLINE_KEYS = 10
+
+def extract_license_keys(response: Dict[str, Any], amount: int) -> List[str]:
+    """Keys already extracted by the decoder (or found in a plain dict), falling back to local generation"""
+    keys = list(getattr(response, 'license_keys', None) or find_license_keys(response))
+    
+    # If no keys in response, generate them
+    if not keys:
+        keys = generate_corvus_keys(amount, issued_keys)
+    return keys
+
+class BulkKeyWriter:
+    """Builds the .txt/.csv attachment incrementally as chunks complete"""
+    def __init__(self, fmt: str, level: str, expiry: str):
+        self.fmt = 'csv' if fmt == 'csv' else 'txt'
+        self.level = level
+        self.expiry = expiry
+        self.buffer = io.StringIO()
+        self.keys: List[str] = []
+        self._csv = None
+        if self.fmt == 'csv':
+            self._csv = csv.writer(self.buffer)
+            self._csv.writerow(['key', 'level', 'expiry_days', 'chunk'])
+    
+    def write(self, keys: List[str], chunk_no: int):
+        for key in keys:
+            if self._csv:
+                self._csv.writerow([key, self.level, self.expiry, chunk_no])
+            else:
+                self.buffer.write(f"{key}\n")
+        self.keys.extend(keys)
+    
+    @property
+    def count(self) -> int:
+        return len(self.keys)
+    
+    def to_file(self, filename: str) -> discord.File:
+        data = io.BytesIO(self.buffer.getvalue().encode('utf-8'))
+        return discord.File(data, filename=f"{filename}.{self.fmt}")
+
+def plan_chunks(amount: int) -> List[int]:
+    """Split `amount` into add_license chunk sizes"""
+    chunk_size = max(1, BULK_CONFIG['chunk_size'])
+    chunks = [chunk_size] * (amount // chunk_size)
+    if amount % chunk_size:
+        chunks.append(amount % chunk_size)
+    return chunks
+
+async def bulk_generate_keys(
+    expiry: str,
+    level: str,
+    mask: str,
+    amount: int,
+    fmt: str = "txt",
+    on_progress: Callable[[int, int], Awaitable[None]] = None
+) -> Tuple[BulkKeyWriter, List[str]]:
+    """Generate `amount` keys as chunked add_license calls under a concurrency limit"""
+    chunks = plan_chunks(amount)
+    writer = BulkKeyWriter(fmt, level, expiry)
+    errors = []
+    semaphore = asyncio.Semaphore(max(1, BULK_CONFIG['concurrency']))
+    completed = 0
+    
+    async def run_chunk(chunk_no: int, chunk_amount: int):
+        nonlocal completed
+        async with semaphore:
+            response = await keyauth.add_license(expiry=expiry, level=level, mask=mask, amount=chunk_amount)
+        if response.get('success'):
+            writer.write(extract_license_keys(response, chunk_amount), chunk_no)
+        else:
+            errors.append(f"Chunk {chunk_no}: {response.get('message', 'Unknown error')}")
+        completed += 1
+        if on_progress:
+            await on_progress(completed, len(chunks))
+    
+    with request_priority('bulk'):
+        await asyncio.gather(*(run_chunk(i + 1, n) for i, n in enumerate(chunks)))
+    return writer, errors
+
+def bulk_progress_editor(message, header: str, unit: str = "Chunks"):
+    """Progress callback for the loading message; edit_scheduler coalesces the updates"""
+    async def on_progress(done: int, total: int):
+        edit_scheduler.submit(message, content=f"{header}\n{unit} completed: **{done}/{total}**")
+    return on_progress
+
+async def run_bulk_generation(message, user_mention: str, expiry: str, level: str, mask: str, amount: int, fmt: str = "txt"):
+    """Run bulk mode and replace the loading message with a summary + key attachment"""
+    started = time.monotonic()
+    writer, errors = await bulk_generate_keys(
+        expiry, level, mask, amount, fmt,
+        on_progress=bulk_progress_editor(
+            message, f"**{user_mention} is generating {amount} Corvus license key(s)...** ⏳"
+        )
+    )
+    await show_generated_keys(message, user_mention, expiry, level, mask, writer, errors, time.monotonic() - started)
+
+async def show_generated_keys(message, user_mention: str, expiry: str, level: str, mask: str,
+                              writer: BulkKeyWriter, errors: List[str], elapsed: float, extra_fields: list = None):
+    """Replace the loading message with the paginated keys + full attachment"""
+    if writer.count == 0:
+        error_msg = errors[0] if errors else 'Unknown error occurred'
+        embed = create_error_embed("❌ Generation Failed", error_msg)
+        for name, value, inline in extra_fields or []:
+            embed.add_field(name=name, value=value, inline=inline)
+        await edit_scheduler.final(message, content=None, embed=embed)
+        return
+    
+    extra_fields = list(extra_fields or [])
+    if errors:
+        error_text = "\n".join(errors[:5])
+        if len(errors) > 5:
+            error_text += f"\n... and {len(errors) - 5} more"
+        extra_fields.append((f"⚠️ Failed chunks ({len(errors)})", error_text[:1024], False))
+    
+    # a teljes lista csatolmányként megy, a nézet csak lapoz
+    view = generated_keys_view(
+        user_mention, writer.keys, level, expiry, mask,
+        note=f" ({elapsed:.1f}s)", extra_fields=extra_fields, export=False
+    )
+    filename = f"corvus_keys_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    await edit_scheduler.final(message, content=None, embed=view.render(), view=view, attachments=[writer.to_file(filename)])
+    view.message = message
+
+async def run_generation(message, user: discord.abc.User, expiry: str, level: str, amount: int,
+                         fmt: str = "txt", mask: str = KEY_FORMAT_CONFIG['mask']):
+    """Generate keys and replace the public loading message with the result (bulk mode above MAX_INLINE_KEYS)"""
+    user_mention = user.mention
+    if amount > MAX_INLINE_KEYS:
+        if bot.jobs:
+            params = {'expiry': expiry, 'level': level, 'mask': mask, 'amount': amount, 'fmt': fmt,
+                      'chunks': plan_chunks(amount)}
+            await start_job(message, user, 'generate', params, [str(n) for n in range(1, len(params['chunks']) + 1)])
+        else:
+            await run_bulk_generation(message, user_mention, expiry, level, mask, amount, fmt)
+        return
+    
+    response = await keyauth.add_license(expiry=expiry, level=level, mask=mask, amount=amount)
+    if not response.get('success'):
+        error_msg = response.get('message', 'Unknown error occurred')
+        await edit_scheduler.final(message, content=None, embed=create_error_embed("❌ Generation Failed", error_msg))
+        return
+    
+    keys = extract_license_keys(response, amount)
+    if not keys:
+        await edit_scheduler.final(message, content=None, embed=create_success_embed(
+            "✅ Generation Complete",
+            f"**{user_mention}'s key generation request was processed!**\n"
+            f"Check your KeyAuth dashboard for details."
+        ))
+        return
+    
+    # PUBLIC embed with ALL details including keys
+    view = generated_keys_view(user_mention, keys, level, expiry, mask)
+    await edit_scheduler.final(message, content=None, embed=view.render(), view=view)
+    view.message = message
+
+# Batch delete / HWID reset
+_KEY_SPLIT_RE = re.compile(r'[\s,;]+')
+
+def parse_key_list(text: str) -> List[str]:
+    """Keys separated by whitespace, commas or semicolons; duplicates dropped, order kept"""
+    keys = []
+    seen = set()
+    for token in _KEY_SPLIT_RE.split(text):
+        token = token.strip().strip('`"\'')
+        if token and token.lower() != 'key' and token not in seen:
+            seen.add(token)
+            keys.append(token)
+    return keys
+
+async def read_key_attachments(attachments) -> str:
+    """Text of uploaded .txt/.csv key lists (first CSV column or whole lines)"""
+    chunks = []
+    for attachment in attachments:
+        if not attachment.filename.lower().endswith(('.txt', '.csv')) or attachment.size > 1024 * 1024:
+            continue
+        data = (await attachment.read()).decode('utf-8', errors='ignore')
+        if attachment.filename.lower().endswith('.csv'):
+            data = "\n".join(row[0] for row in csv.reader(io.StringIO(data)) if row)
+        chunks.append(data)
+    return "\n".join(chunks)
+
+async def run_batch(
+    keys: List[str],
+    operation: Callable[[str], Awaitable[Dict[str, Any]]],
+    on_progress: Callable[[int, int], Awaitable[None]] = None
+) -> List[Tuple[str, bool, str]]:
+    """Fan out `operation(key)` under BULK_CONFIG['batch_concurrency']; results keep input order"""
+    semaphore = asyncio.Semaphore(max(1, BULK_CONFIG['batch_concurrency']))
+    results: List[Optional[Tuple[str, bool, str]]] = [None] * len(keys)
+    completed = 0
+    
+    async def run_one(index: int, key: str):
+        nonlocal completed
+        async with semaphore:
+            try:
+                response = await operation(key)
+                results[index] = (key, bool(response.get('success')), str(response.get('message', '')))
+            except Exception as e:
+                results[index] = (key, False, f"Error: {e}")
+        completed += 1
+        if on_progress:
+            await on_progress(completed, len(keys))
+    
+    with request_priority('bulk'):
+        await asyncio.gather(*(run_one(i, key) for i, key in enumerate(keys)))
+    return results
+
+def batch_results_file(results: List[Tuple[str, bool, str]], filename: str) -> discord.File:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['key', 'success', 'message'])
+    for key, success, message in results:
+        writer.writerow([key, 'yes' if success else 'no', message])
+    return discord.File(io.BytesIO(buffer.getvalue().encode('utf-8')), filename=f"{filename}.csv")
+
+async def run_batch_operation(message, user_mention: str, title: str, verb: str, keys: List[str],
+                              operation: Callable[[str], Awaitable[Dict[str, Any]]], extra_fields: list = None):
+    """Run a batch and replace the loading message with an aggregated summary + per-key CSV"""
+    started = time.monotonic()
+    results = await run_batch(keys, operation, on_progress=bulk_progress_editor(
+        message, f"**{user_mention} is {verb} {len(keys)} license key(s)...** ⏳", unit="Keys"
+    ))
+    await show_batch_results(message, user_mention, title, results, time.monotonic() - started, extra_fields)
+
+def batch_result_line(result: Tuple[str, bool, str]) -> str:
+    key, success, msg = result
+    return f"{'✅' if success else '❌'} `{key[:30]}` - {msg[:60]}"
+
+async def show_batch_results(message, user_mention: str, title: str, results: List[Tuple[str, bool, str]],
+                             elapsed: float, extra_fields: list = None):
+    """Replace the loading message with the aggregated summary, per-key pages and CSV"""
+    succeeded = sum(1 for _, success, _ in results if success)
+    failed = [(key, msg) for key, success, msg in results if not success]
+    
+    builder = create_success_embed if succeeded else create_error_embed
+    
+    def make_embed() -> discord.Embed:
+        embed = builder(
+            title,
+            f"**{succeeded}/{len(results)}** key(s) processed successfully in {elapsed:.1f}s.\n"
+            f"Requested by: {user_mention}"
+        )
+        for name, value, inline in extra_fields or []:
+            embed.add_field(name=name, value=value, inline=inline)
+        return embed
+    
+    # hibák előre, hogy az első oldalon látszódjanak
+    ordered = sorted(results, key=lambda result: result[1])
+    view = paginated_lines_view(
+        make_embed,
+        f"Results ({len(failed)} failed)" if failed else "Results",
+        ordered,
+        format_line=batch_result_line
+    )
+    
+    filename = f"corvus_batch_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+    await edit_scheduler.final(message, content=None, embed=view.render(), view=view,
+                       attachments=[batch_results_file(results, filename)])
+    view.message = message
+
+def validate_batch_keys(keys: List[str]) -> Optional[str]:
+    if not keys:
+        return "No license keys found. Paste keys separated by spaces/new lines or upload a .txt/.csv file."
+    if len(keys) > BULK_CONFIG['batch_max_keys']:
+        return f"Too many keys ({len(keys)}), the limit is {BULK_CONFIG['batch_max_keys']} per batch."
+    return None
+
+# License export config
+EXPORT_CONFIG = {
+    'page_size': int(os.environ.get("EXPORT_PAGE_SIZE", "2000")),
+    'dir': os.environ.get("EXPORT_DIR") or None,  # üres = rendszer temp könyvtár
+    'compresslevel': int(os.environ.get("EXPORT_GZIP_LEVEL", "6")),
+}
+
+EXPORT_FORMATS = ('csv', 'jsonl')
+EXPORT_SOURCES = ('auto', 'mirror', 'api')
+
+# egyszerre egy export fut, a 100k+ soros lekérés ne duplázódjon
+export_lock = asyncio.Lock()
+
+class ExportFilter:
+    """License filter for exports; rendered as SQL for the mirror and re-checked per row"""
+    def __init__(self, level: Optional[str] = None, min_days: Optional[float] = None, max_days: Optional[float] = None,
+                 used: Optional[bool] = None, banned: Optional[bool] = None):
+        self.level = level
+        self.min_days = min_days
+        self.max_days = max_days
+        self.used = used
+        self.banned = banned
+    
+    @staticmethod
+    def _days(value) -> Optional[float]:
+        try:
+            return float(value)
+        except (TypeError, ValueError):
+            return None
+    
+    @staticmethod
+    def is_used(row: Dict[str, Any]) -> bool:
+        return bool(row.get('used_by')) or str(row.get('status') or '').lower() == 'used'
+    
+    def matches(self, row: Dict[str, Any]) -> bool:
+        if self.level is not None and str(row.get('level')) != self.level:
+            return False
+        if self.min_days is not None or self.max_days is not None:
+            days = self._days(row.get('expiry'))
+            if days is None:
+                return False
+            if (self.min_days is not None and days < self.min_days) or (self.max_days is not None and days > self.max_days):
+                return False
+        if self.used is not None and self.is_used(row) != self.used:
+            return False
+        if self.banned is not None and bool(row.get('banned')) != self.banned:
+            return False
+        return True
+    
+    def sql(self) -> Tuple[str, List[Any]]:
+        """' AND ...' clauses over the mirror's licenses table"""
+        clauses, args = [], []
+        if self.level is not None:
+            clauses.append("level = ?")
+            args.append(self.level)
+        if self.min_days is not None:
+            clauses.append("CAST(expiry AS REAL) >= ?")
+            args.append(self.min_days)
+        if self.max_days is not None:
+            clauses.append("CAST(expiry AS REAL) <= ?")
+            args.append(self.max_days)
+        if self.used is not None:
+            used_sql = "(COALESCE(used_by, '') != '' OR LOWER(COALESCE(status, '')) = 'used')"
+            clauses.append(used_sql if self.used else f"NOT {used_sql}")
+        if self.banned is not None:
+            clauses.append("banned = ?")
+            args.append(1 if self.banned else 0)
+        return ''.join(f" AND {clause}" for clause in clauses), args
+    
+    def describe(self) -> str:
+        parts = []
+        if self.level is not None:
+            parts.append(f"level {self.level}")
+        if self.min_days is not None or self.max_days is not None:
+            low = f"{self.min_days:g}" if self.min_days is not None else "0"
+            high = f"{self.max_days:g}" if self.max_days is not None else "∞"
+            parts.append(f"expiry {low}-{high} days")
+        if self.used is not None:
+            parts.append("used" if self.used else "unused")
+        if self.banned is not None:
+            parts.append("banned" if self.banned else "not banned")
+        return ", ".join(parts) or "all licenses"
+
+def parse_export_args(tokens: List[str]) -> Tuple[str, ExportFilter, str]:
+    """!export arguments: csv/jsonl, level=N, expiry=MIN-MAX, used/unused, banned/unbanned, source=auto/mirror/api"""
+    fmt, source, export_filter = 'csv', 'auto', ExportFilter()
+    for token in tokens:
+        name, _, value = token.lower().partition('=')
+        if token.lower() in EXPORT_FORMATS:
+            fmt = token.lower()
+        elif name in ('used', 'unused') and not value:
+            export_filter.used = name == 'used'
+        elif name in ('banned', 'unbanned') and not value:
+            export_filter.banned = name == 'banned'
+        elif name == 'level' and value:
+            export_filter.level = token.partition('=')[2]
+        elif name == 'expiry' and value:
+            low, dash, high = value.partition('-')
+            try:
+                export_filter.min_days = float(low) if low else None
+                export_filter.max_days = (float(high) if high else None) if dash else export_filter.min_days
+            except ValueError:
+                raise ValueError(f"Invalid expiry range `{value}`, use e.g. `expiry=7-30`")
+        elif name == 'source' and value in EXPORT_SOURCES:
+            source = value
+        else:
+            raise ValueError(f"Unknown export option `{token}`")
+    return fmt, export_filter, source
+
+class LicenseExportWriter:
+    """Streams rows into a gzip-compressed CSV / JSONL temp file; call from a worker thread"""
+    def __init__(self, fmt: str, directory: Optional[str] = None, compresslevel: int = 6):
+        self.fmt = fmt
+        self.rows = 0
+        fd, self.path = tempfile.mkstemp(prefix="corvus_export_", suffix=f".{fmt}.gz", dir=directory)
+        self._raw = os.fdopen(fd, 'wb')
+        self._text = io.TextIOWrapper(gzip.GzipFile(fileobj=self._raw, mode='wb', compresslevel=compresslevel),
+                                      encoding='utf-8', newline='')
+        self._csv = csv.writer(self._text) if fmt == 'csv' else None
+        if self._csv:
+            self._csv.writerow(_LICENSE_COLUMNS)
+    
+    def write_rows(self, rows: List[Dict[str, Any]]):
+        if self._csv:
+            self._csv.writerows([row.get(column) for column in _LICENSE_COLUMNS] for row in rows)
+        else:
+            for row in rows:
+                record = {column: row.get(column) for column in _LICENSE_COLUMNS}
+                record['banned'] = bool(record['banned'])
+                self._text.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self.rows += len(rows)
+    
+    def close(self) -> int:
+        """Finish the gzip stream, returns the compressed size"""
+        if not self._text.closed:
+            self._text.close()
+            self._raw.close()
+        return os.path.getsize(self.path)
+    
+    def discard(self):
+        self.close()
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+async def api_license_pages(api: KeyAuthAPI, page_size: int):
+    """fetchallusers (only the HWIDs are kept) then fetchallkeys, both parsed as they stream in, so the
+    license list is never held whole; the total is not known up front (None)"""
+    with request_priority('bulk'):
+        hwids = {}
+        try:
+            async for users in api.stream_records('fetchallusers', 'users', page_size=page_size):
+                hwids.update((u['username'], u.get('hwid')) for u in users if u.get('username'))
+        except RuntimeError as e:
+            log.warning("export user lookup failed, HWIDs left empty", extra={'error': redact(str(e))})
+        yield None
+        async for page in api.stream_records('fetchallkeys', 'keys', {'format': 'JSON'}, page_size=page_size):
+            yield [LicenseMirror._license_row(raw, hwids) for raw in page]
+
+async def mirror_license_pages(mirror: LicenseMirror, export_filter: ExportFilter, page_size: int):
+    """Keyset-paged read of the mirror with the filter pushed into SQL"""
+    where, args = export_filter.sql()
+    yield await mirror.count_licenses(where, args)
+    after = ''
+    while True:
+        rows = await mirror.license_page(after, page_size, where, args)
+        if not rows:
+            return
+        yield rows
+        after = rows[-1]['key']
+
+async def run_license_export(message, user_mention: str, fmt: str, export_filter: ExportFilter, source: str,
+                             size_limit: int):
+    """Stream the filtered license list into a .gz attachment, reporting progress on `message`"""
+    started = time.monotonic()
+    if source == 'auto':
+        source = 'mirror' if keyauth.mirror and keyauth.mirror.snapshot_age() is not None else 'api'
+    if source == 'mirror' and not keyauth.mirror:
+        await edit_scheduler.final(message, content=None, embed=create_error_embed(
+            "Mirror Disabled", "The local license mirror is not enabled (LICENSE_MIRROR=1), use `source=api`."
+        ))
+        return
+    if source == 'mirror':
+        pages = mirror_license_pages(keyauth.mirror, export_filter, EXPORT_CONFIG['page_size'])
+        source_text = f"Local mirror (age {format_age(keyauth.mirror.snapshot_age())})"
+    else:
+        pages = api_license_pages(keyauth, EXPORT_CONFIG['page_size'])
+        source_text = "Live seller API"
+    
+    writer = await asyncio.to_thread(LicenseExportWriter, fmt, EXPORT_CONFIG['dir'], EXPORT_CONFIG['compresslevel'])
+    try:
+        total = await pages.__anext__()
+        scanned = 0
+        async for page in pages:
+            scanned += len(page)
+            rows = [row for row in page if export_filter.matches(row)]
+            if rows:
+                await asyncio.to_thread(writer.write_rows, rows)
+            edit_scheduler.submit(message, content=(
+                f"**{user_mention} is exporting licenses ({export_filter.describe()})...** ⏳\n"
+                f"Scanned **{scanned}{'' if total is None else f'/{total}'}**, exported **{writer.rows}**"
+            ))
+        size = await asyncio.to_thread(writer.close)
+        
+        if size > size_limit:
+            await edit_scheduler.final(message, content=None, embed=create_error_embed(
+                "Export Too Large",
+                f"The compressed export is {size / 2 ** 20:.1f} MiB, the upload limit here is "
+                f"{size_limit / 2 ** 20:.0f} MiB. Narrow it down with filters (level, expiry, used, banned)."
+            ))
+            return
+        embed = create_success_embed(
+            "📦 License Export",
+            f"**Exported by:** {user_mention}\n"
+            f"**Filter:** {export_filter.describe()}"
+        )
+        for name, value in (
+            ("Rows", f"{writer.rows} / {scanned} scanned"),
+            ("Source", source_text),
+            ("File", f"{fmt.upper()} + gzip, {size / 2 ** 20:.2f} MiB"),
+            ("Time", f"{time.monotonic() - started:.1f}s"),
+        ):
+            embed.add_field(name=name, value=value, inline=True)
+        file = discord.File(writer.path, filename=f"corvus_licenses_{datetime.now():%Y%m%d_%H%M%S}.{fmt}.gz")
+        try:
+            await edit_scheduler.final(message, content=None, embed=embed, attachments=[file])
+        finally:
+            file.close()
+    except Exception as e:
+        log.exception("license export failed", extra={'source': source, 'format': fmt})
+        await edit_scheduler.final(message, content=None, embed=create_error_embed("Export Failed", str(e)))
+    finally:
+        await pages.aclose()
+        await asyncio.to_thread(writer.discard)
+
+# Background jobs (Discord side)
+def bulk_job(run):
+    """Job item handlers call KeyAuth at bulk priority, on behalf of the guild/user that queued the job"""
+    @functools.wraps(run)
+    async def wrapper(params: Dict[str, Any], item: str):
+        bind_request_context(params.get('guild_id'), params.get('user_id'), 'bulk')
+        return await run(params, item)
+    return wrapper
+
+@bulk_job
+async def job_generate_chunk(params: Dict[str, Any], item: str) -> Tuple[bool, str, Optional[str]]:
+    chunk_amount = params['chunks'][int(item) - 1]
+    response = await keyauth.add_license(
+        expiry=params['expiry'], level=params['level'], mask=params['mask'], amount=chunk_amount
+    )
+    if not response.get('success'):
+        return False, str(response.get('message', 'Unknown error')), None
+    keys = extract_license_keys(response, chunk_amount)
+    return True, f"{len(keys)} key(s)", "\n".join(keys)
+
+@bulk_job
+async def job_delete(params: Dict[str, Any], key: str) -> Tuple[bool, str, Optional[str]]:
+    response = await keyauth.delete_license(key, params.get('delete_user', False))
+    return bool(response.get('success')), str(response.get('message', '')), None
+
+@bulk_job
+async def job_resethwid(params: Dict[str, Any], key: str) -> Tuple[bool, str, Optional[str]]:
+    response = await keyauth.reset_hwid_by_key(key)
+    return bool(response.get('success')), str(response.get('message', '')), None
+
+# törlés / HWID reset kétszer futtatva is ugyanazt adja; generálás nem (dupla kulcs lenne)
+JOB_KINDS = {
+    'generate': {'run': job_generate_chunk, 'concurrency': BULK_CONFIG['concurrency'], 'idempotent': False},
+    'delete': {'run': job_delete, 'concurrency': BULK_CONFIG['batch_concurrency'], 'idempotent': True},
+    'resethwid': {'run': job_resethwid, 'concurrency': BULK_CONFIG['batch_concurrency'], 'idempotent': True},
+}
+
+JOB_LABELS = {
+    'generate': {'verb': "generating", 'unit': "Chunks", 'title': "🔑 Key Generation"},
+    'delete': {'verb': "deleting", 'unit': "Keys", 'title': "🗑️ Batch Delete Finished"},
+    'resethwid': {'verb': "resetting HWID for", 'unit': "Keys", 'title': "🔄 Batch HWID Reset Finished"},
+}
+
+JOB_STATUS_ICONS = {'queued': "📥", 'running': "⏳", 'done': "✅", 'failed': "❌", 'cancelled': "⛔"}
+
+# job id -> az eredeti üzenet objektuma (ephemeral üzenet csak ezen keresztül szerkeszthető)
+job_messages: Dict[int, Any] = {}
+# a "queued" bejelentés és a worker első szerkesztése ne előzze meg egymást
+job_announce_lock = asyncio.Lock()
+
+def job_extra_fields(job: Dict[str, Any]) -> list:
+    fields = []
+    if job['kind'] == 'delete':
+        delete_user = job['params'].get('delete_user')
+        fields.append(("Delete from user", "✅ Yes" if delete_user else "❌ No", True))
+    if job['status'] == 'cancelled':
+        fields.append(("⛔ Cancelled", f"Stopped after {job['done']}/{job['total']} item(s).", False))
+    elif job['status'] == 'failed':
+        fields.append(("❌ Job failed", (job['error'] or "Unknown error")[:1024], False))
+    return fields
+
+def job_progress_text(job: Dict[str, Any]) -> str:
+    labels = JOB_LABELS[job['kind']]
+    if job['kind'] == 'generate':
+        what = f"{job['params']['amount']} Corvus license key(s)"
+    else:
+        what = f"{job['total']} license key(s)"
+    return (f"**Job #{job['id']}: <@{job['requested_by']}> is {labels['verb']} {what}...** ⏳\n"
+            f"{labels['unit']} completed: **{job['done']}/{job['total']}**")
+
+def job_message(job: Dict[str, Any]):
+    """Live handle if this process enqueued the job, else a partial message by id (public messages only)"""
+    message = job_messages.get(job['id'])
+    if message is None and job['channel_id'] and not job['ephemeral']:
+        message = bot.get_partial_messageable(job['channel_id']).get_partial_message(job['message_id'])
+    return message
+
+async def on_job_progress(job: Dict[str, Any]):
+    message = job_message(job)
+    if message is None or job['status'] != 'running':
+        return
+    async with job_announce_lock:
+        edit_scheduler.submit(message, content=job_progress_text(job))
+
+async def show_job_result(message, job: Dict[str, Any]):
+    mention = f"<@{job['requested_by']}>"
+    elapsed = (job['finished'] or time.time()) - (job['started'] or job['created'])
+    rows = await bot.jobs.results(job['id'])
+    if job['kind'] == 'generate':
+        params = job['params']
+        writer = BulkKeyWriter(params['fmt'], params['level'], params['expiry'])
+        errors = []
+        for row in rows:
+            if row['status'] == 'ok':
+                writer.write(row['result'].split('\n') if row['result'] else [], int(row['item']))
+            elif row['status'] == 'failed':
+                errors.append(f"Chunk {row['item']}: {row['message']}")
+        await show_generated_keys(message, mention, params['expiry'], params['level'], params['mask'],
+                                  writer, errors, elapsed, extra_fields=job_extra_fields(job))
+        return
+    
+    results = [
+        (row['item'], row['status'] == 'ok',
+         row['message'] or ("Not processed (job cancelled)" if row['status'] == 'pending' else ""))
+        for row in rows
+    ]
+    await show_batch_results(message, mention, f"{JOB_LABELS[job['kind']]['title']} (job #{job['id']})",
+                             results, elapsed, job_extra_fields(job))
+
+async def on_job_finish(job: Dict[str, Any]):
+    async with job_announce_lock:
+        message = job_messages.pop(job['id'], None) or job_message(job)
+        if message is not None:
+            try:
+                await show_job_result(message, job)
+                return
+            except discord.HTTPException:
+                pass
+        # lejárt interakció / törölt üzenet / újraindítás utáni ephemeral: DM-ben küldjük
+        user = await bot.fetch_user(job['requested_by'])
+        await show_job_result(await user.send(f"📦 Result of job #{job['id']}"), job)
+
+async def start_job(message, user: discord.abc.User, kind: str, params: Dict[str, Any], items: List[str],
+                    ephemeral: bool = False) -> Optional[int]:
+    """Enqueue and return right away; progress and the result are posted into `message`"""
+    params = {**params, 'guild_id': getattr(message.guild, 'id', None), 'user_id': user.id}
+    async with job_announce_lock:
+        job_id, skipped = await bot.jobs.enqueue(
+            kind, params, items, user.id, message.channel.id, message.id, ephemeral
+        )
+        if job_id is None:
+            await edit_scheduler.final(message, content=None, embed=create_error_embed(
+                "Nothing To Do", f"All {skipped} key(s) are already queued in another running job."
+            ))
+            return None
+        job_messages[job_id] = message
+        note = f"\n{skipped} key(s) already queued in another job were skipped." if skipped else ""
+        edit_scheduler.submit(message, content=(
+            f"📥 **Job #{job_id} queued** by {user.mention} ({len(items) - skipped} item(s)).{note}\n"
+            f"Use `!job {job_id}` to inspect or `!canceljob {job_id}` to cancel."
+        ))
+    return job_id
+
+async def start_batch(message, user: discord.abc.User, kind: str, keys: List[str],
+                      delete_user: bool = False, ephemeral: bool = False):
+    """Batch delete / HWID reset: as a background job with JOBS_ENABLED=1, otherwise inline"""
+    if bot.jobs:
+        await start_job(message, user, kind, {'delete_user': delete_user}, keys, ephemeral)
+        return
+    labels = JOB_LABELS[kind]
+    if kind == 'delete':
+        await run_batch_operation(
+            message, user.mention, labels['title'], labels['verb'], keys,
+            lambda key: keyauth.delete_license(key, delete_user),
+            extra_fields=[("Delete from user", "✅ Yes" if delete_user else "❌ No", True)]
+        )
+    else:
+        await run_batch_operation(message, user.mention, labels['title'], labels['verb'], keys, keyauth.reset_hwid_by_key)
+
+def job_summary_line(job: Dict[str, Any]) -> str:
+    return (f"{JOB_STATUS_ICONS.get(job['status'], '•')} **#{job['id']}** {job['kind']} - {job['status']} "
+            f"({job['done']}/{job['total']}, {job['failed']} failed) by <@{job['requested_by']}>, "
+            f"{format_age(time.time() - job['created'])} ago")
+
+def jobs_list_embed(jobs: List[Dict[str, Any]]) -> discord.Embed:
+    text = "\n".join(job_summary_line(job) for job in jobs) or "No jobs yet."
+    return create_embed("🧾 Background Jobs", text[:4000], discord.Color.blue())
+
+async def job_detail_embed(job: Dict[str, Any]) -> discord.Embed:
+    icon = JOB_STATUS_ICONS.get(job['status'], '•')
+    embed = create_embed(
+        f"{icon} Job #{job['id']} ({job['kind']})",
+        job_summary_line(job),
+        discord.Color.blue(),
+        fields=[
+            ("Status", job['status'], True),
+            ("Progress", f"{job['done']}/{job['total']} ({job['ok']} ok, {job['failed']} failed)", True),
+            ("Requested by", f"<@{job['requested_by']}>", True),
+            ("Created", datetime.fromtimestamp(job['created']).strftime('%Y-%m-%d %H:%M:%S'), True),
+            ("Started", datetime.fromtimestamp(job['started']).strftime('%Y-%m-%d %H:%M:%S') if job['started'] else "-", True),
+            ("Finished", datetime.fromtimestamp(job['finished']).strftime('%Y-%m-%d %H:%M:%S') if job['finished'] else "-", True),
+        ]
+    )
+    if job['error']:
+        embed.add_field(name="Error", value=job['error'][:1024], inline=False)
+    failures = [row for row in await bot.jobs.results(job['id']) if row['status'] == 'failed']
+    if failures:
+        text = "\n".join(f"`{row['item'][:30]}` - {(row['message'] or '')[:60]}" for row in failures[:5])
+        if len(failures) > 5:
+            text += f"\n... and {len(failures) - 5} more"
+        embed.add_field(name=f"⚠️ Failed items ({len(failures)})", value=text[:1024], inline=False)
+    return embed
+
+# Shared result embeds (modals, ! commands, slash commands)
+def license_deleted_embed(key: str, response: Dict[str, Any], delete_user: bool, by: str) -> discord.Embed:
+    if not response.get('success'):
+        embed = create_error_embed("Delete Failed", response.get('message', 'Failed to delete license key'))
+        embed.add_field(name="Key", value=f"`{key}`", inline=False)
+        return embed
+    embed = create_success_embed(
+        "✅ License Key Deleted!",
+        response.get('message', 'License key deleted successfully')
+    )
+    embed.add_field(name="Key", value=f"`{key}`", inline=False)
+    embed.add_field(name="Delete from user", value="✅ Yes" if delete_user else "❌ No", inline=True)
+    embed.add_field(name="Deleted by", value=by, inline=True)
+    return embed
+
+def hwid_reset_embed(key: str, response: Dict[str, Any], by: str) -> discord.Embed:
+    if not response.get('success'):
+        embed = create_error_embed("HWID Reset Failed", response.get('message', 'Failed to reset HWID'))
+        embed.add_field(name="License Key", value=f"`{key}`", inline=False)
+        return embed
+    embed = create_success_embed(
+        "✅ HWID Reset Successful!",
+        response.get('message', 'HWID has been reset successfully')
+    )
+    embed.add_field(name="License Key", value=f"`{key}`", inline=False)
+    embed.add_field(name="Reset by", value=by, inline=True)
+    return embed
+
+def key_info_view(key: str, response: Dict[str, Any], by: str, use_mirror: bool = False) -> PaginatorView:
+    """Paginated license info (verify / mirror lookup response)"""
+    source = f"Local mirror (snapshot age: {format_age(keyauth.mirror.snapshot_age())})" if use_mirror else None
+    
+    def make_embed() -> discord.Embed:
+        embed = create_success_embed(
+            "📊 License Key Information",
+            f"Information for key: `{key}`\nChecked by: {by}"
+        )
+        if source:
+            embed.add_field(name="Source", value=source, inline=False)
+        return embed
+    
+    fields = []
+    for field_name, value in response.items():
+        if field_name not in ['success', 'message'] and value not in [None, ""]:
+            display_name = field_name.capitalize().replace('_', ' ')
+            
+            if field_name == 'status':
+                value = "✅ Active" if str(value).lower() in ['active', 'true', '1'] else "❌ Inactive"
+            elif field_name == 'used':
+                value = f"{value} time(s)"
+            elif field_name == 'expiry':
+                if value == '0' or value == 0:
+                    value = "Never (Lifetime)"
+                else:
+                    value = f"{value} day(s)"
+            elif field_name == 'level':
+                value = f"Level {value}"
+            
+            fields.append((display_name, str(value)))
+    
+    return paginated_fields_view(make_embed, fields, export_name=f"key_info_{key[:30]}")
+
 # Permission check decorator for views
 def admin_only_view():
     async def predicate(interaction: discord.Interaction) -> bool:
@@ -219,7 +3931,13 @@ def admin_only_view():
     return discord.app_commands.check(predicate)
 
 # Modals for input
-class GenerateKeyModal(discord.ui.Modal, title="🔑 Generate Corvus License Key"):
+class KeyAuthModal(discord.ui.Modal):
+    """Base for the menu modals: binds the submitting guild/user for the KeyAuth scheduler"""
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        bind_request_context(interaction.guild_id, interaction.user.id, deadline=interaction_deadline(interaction))
+        return True
+
+class GenerateKeyModal(KeyAuthModal, title="🔑 Generate Corvus License Key"):
     expiry = discord.ui.TextInput(
         label="Expiry (days)",
         placeholder="30 = 30 days, 0 = lifetime",
@@ -238,12 +3956,13 @@ class GenerateKeyModal(discord.ui.Modal, title="🔑 Generate Corvus License Key
     
     amount = discord.ui.TextInput(
         label="Amount",
-        placeholder="How many keys to generate? (1-10)",
+        placeholder=f"How many keys to generate? (1-{BULK_CONFIG['max_amount']}, >10 = file)",
         required=True,
         default="1",
-        max_length=2
+        max_length=5
     )
     
+    @timed_handler("modal")
     async def on_submit(self, interaction: discord.Interaction):
         # Check admin permission
         if not interaction.user.guild_permissions.administrator:
@@ -263,9 +3982,9 @@ class GenerateKeyModal(discord.ui.Modal, title="🔑 Generate Corvus License Key
             level = self.level.value.strip()
             amount = int(self.amount.value.strip())
             
-            if amount < 1 or amount > 10:
+            if amount < 1 or amount > BULK_CONFIG['max_amount']:
                 await interaction.followup.send(
-                    embed=create_error_embed("Error", "Amount must be between 1 and 10!"),
+                    embed=create_error_embed("Error", f"Amount must be between 1 and {BULK_CONFIG['max_amount']}!"),
                     ephemeral=True
                 )
                 return
@@ -276,73 +3995,7 @@ class GenerateKeyModal(discord.ui.Modal, title="🔑 Generate Corvus License Key
                 ephemeral=False
             )
             
-            mask = "Corvus-****-****-***"
-            response = await keyauth.add_license(
-                expiry=expiry,
-                level=level,
-                mask=mask,
-                amount=amount
-            )
-            
-            if response.get('success'):
-                # Extract keys
-                keys = []
-                if 'key' in response:
-                    keys.append(response['key'])
-                elif 'keys' in response and isinstance(response['keys'], list):
-                    keys = response['keys']
-                elif 'message' in response:
-                    found_keys = re.findall(r'[A-Za-z0-9\-]{10,}', response['message'])
-                    if found_keys:
-                        keys = found_keys
-                
-                # If no keys in response, generate them
-                if not keys:
-                    for i in range(amount):
-                        keys.append(generate_corvus_key())
-                
-                if keys:
-                    # PUBLIC embed with ALL details including keys
-                    public_embed = create_success_embed(
-                        "✅ Corvus Keys Generated!",
-                        f"**{interaction.user.mention} successfully generated {len(keys)} Corvus license key(s)!**\n\n"
-                        f"📊 **Details:**\n"
-                        f"• Level: **{level}**\n"
-                        f"• Expiry: **{expiry} days**\n"
-                        f"• Format: `{mask}`\n"
-                        f"• Generated by: {interaction.user.mention}\n"
-                        f"• Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                    )
-                    
-                    # Add keys to the public embed
-                    keys_text = "\n".join([f"`{key}`" for key in keys])
-                    public_embed.add_field(
-                        name=f"Generated Key{'s' if len(keys) > 1 else ''}:",
-                        value=keys_text,
-                        inline=False
-                    )
-                    
-                    public_embed.add_field(
-                        name="Important",
-                        value="These keys are now active in the system. Keep them secure!",
-                        inline=False
-                    )
-                    
-                    # Update the public message
-                    await public_loading.edit(content=None, embed=public_embed)
-                    
-                else:
-                    public_embed = create_success_embed(
-                        "✅ Generation Complete",
-                        f"**{interaction.user.mention}'s key generation request was processed!**\n"
-                        f"Check your KeyAuth dashboard for details."
-                    )
-                    await public_loading.edit(content=None, embed=public_embed)
-                    
-            else:
-                error_msg = response.get('message', 'Unknown error occurred')
-                public_embed = create_error_embed("❌ Generation Failed", error_msg)
-                await public_loading.edit(content=None, embed=public_embed)
+            await run_generation(public_loading, interaction.user, expiry, level, amount)
                 
         except ValueError:
             await interaction.followup.send(
@@ -356,7 +4009,7 @@ class GenerateKeyModal(discord.ui.Modal, title="🔑 Generate Corvus License Key
             )
 
 # Other Modals
-class DeleteLicenseModal(discord.ui.Modal, title="🗑️ Delete License Key"):
+class DeleteLicenseModal(KeyAuthModal, title="🗑️ Delete License Key"):
     license_key = discord.ui.TextInput(
         label="License Key",
         placeholder="Enter the Corvus license key to delete",
@@ -372,6 +4025,7 @@ class DeleteLicenseModal(discord.ui.Modal, title="🗑️ Delete License Key"):
         max_length=3
     )
     
+    @timed_handler("modal")
     async def on_submit(self, interaction: discord.Interaction):
         # Check admin permission
         if not interaction.user.guild_permissions.administrator:
@@ -398,23 +4052,10 @@ class DeleteLicenseModal(discord.ui.Modal, title="🗑️ Delete License Key"):
             await interaction.followup.send(embed=loading_embed, ephemeral=True)
             
             response = await keyauth.delete_license(key, delete_user)
-            
-            if response.get('success'):
-                embed = create_success_embed(
-                    "✅ License Key Deleted!",
-                    response.get('message', 'License key deleted successfully')
-                )
-                embed.add_field(name="Key", value=f"`{key}`", inline=False)
-                embed.add_field(name="Delete from user", value="✅ Yes" if delete_user else "❌ No", inline=True)
-                embed.add_field(name="Deleted by", value=interaction.user.mention, inline=True)
-                
-                await interaction.followup.send(embed=embed, ephemeral=True)
-            else:
-                error_msg = response.get('message', 'Failed to delete license key')
-                embed = create_error_embed("Delete Failed", error_msg)
-                embed.add_field(name="Key", value=f"`{key}`", inline=False)
-                
-                await interaction.followup.send(embed=embed, ephemeral=True)
+            await interaction.followup.send(
+                embed=license_deleted_embed(key, response, delete_user, interaction.user.mention),
+                ephemeral=True
+            )
                 
         except Exception as e:
             await interaction.followup.send(
@@ -422,7 +4063,7 @@ class DeleteLicenseModal(discord.ui.Modal, title="🗑️ Delete License Key"):
                 ephemeral=True
             )
 
-class HWIDResetModal(discord.ui.Modal, title="🔄 Reset HWID (by License Key)"):
+class HWIDResetModal(KeyAuthModal, title="🔄 Reset HWID (by License Key)"):
     license_key = discord.ui.TextInput(
         label="License Key",
         placeholder="Enter Corvus license key to reset HWID",
@@ -430,6 +4071,7 @@ class HWIDResetModal(discord.ui.Modal, title="🔄 Reset HWID (by License Key)")
         max_length=100
     )
     
+    @timed_handler("modal")
     async def on_submit(self, interaction: discord.Interaction):
         # Check admin permission
         if not interaction.user.guild_permissions.administrator:
@@ -455,22 +4097,10 @@ class HWIDResetModal(discord.ui.Modal, title="🔄 Reset HWID (by License Key)")
             await interaction.followup.send(embed=loading_embed, ephemeral=True)
             
             response = await keyauth.reset_hwid_by_key(key)
-            
-            if response.get('success'):
-                embed = create_success_embed(
-                    "✅ HWID Reset Successful!",
-                    response.get('message', 'HWID has been reset successfully')
-                )
-                embed.add_field(name="License Key", value=f"`{key}`", inline=False)
-                embed.add_field(name="Reset by", value=interaction.user.mention, inline=True)
-                
-                await interaction.followup.send(embed=embed, ephemeral=True)
-            else:
-                error_msg = response.get('message', 'Failed to reset HWID')
-                embed = create_error_embed("HWID Reset Failed", error_msg)
-                embed.add_field(name="License Key", value=f"`{key}`", inline=False)
-                
-                await interaction.followup.send(embed=embed, ephemeral=True)
+            await interaction.followup.send(
+                embed=hwid_reset_embed(key, response, interaction.user.mention),
+                ephemeral=True
+            )
                 
         except Exception as e:
             await interaction.followup.send(
@@ -478,7 +4108,7 @@ class HWIDResetModal(discord.ui.Modal, title="🔄 Reset HWID (by License Key)")
                 ephemeral=True
             )
 
-class KeyInfoModal(discord.ui.Modal, title="📊 License Key Information"):
+class KeyInfoModal(KeyAuthModal, title="📊 License Key Information"):
     license_key = discord.ui.TextInput(
         label="License Key",
         placeholder="Enter Corvus license key to check",
@@ -486,6 +4116,15 @@ class KeyInfoModal(discord.ui.Modal, title="📊 License Key Information"):
         max_length=100
     )
     
+    from_mirror = discord.ui.TextInput(
+        label="Answer from local mirror? (yes/no)",
+        placeholder="Type 'yes' for an instant answer from the synced local copy",
+        required=False,
+        default="no",
+        max_length=3
+    )
+    
+    @timed_handler("modal")
     async def on_submit(self, interaction: discord.Interaction):
         # Check admin permission
         if not interaction.user.guild_permissions.administrator:
@@ -510,33 +4149,15 @@ class KeyInfoModal(discord.ui.Modal, title="📊 License Key Information"):
             )
             await interaction.followup.send(embed=loading_embed, ephemeral=True)
             
-            response = await keyauth.verify_key(key)
+            use_mirror = self.from_mirror.value.strip().lower() == 'yes'
+            response = await keyauth.lookup_local(key) if use_mirror else None
+            if response is None:
+                use_mirror = False
+                response = await keyauth.verify_key(key)
             
             if response.get('success'):
-                embed = create_success_embed(
-                    "📊 License Key Information",
-                    f"Information for key: `{key}`\nChecked by: {interaction.user.mention}"
-                )
-                
-                for field_name, value in response.items():
-                    if field_name not in ['success', 'message'] and value not in [None, ""]:
-                        display_name = field_name.capitalize().replace('_', ' ')
-                        
-                        if field_name == 'status':
-                            value = "✅ Active" if str(value).lower() in ['active', 'true', '1'] else "❌ Inactive"
-                        elif field_name == 'used':
-                            value = f"{value} time(s)"
-                        elif field_name == 'expiry':
-                            if value == '0' or value == 0:
-                                value = "Never (Lifetime)"
-                            else:
-                                value = f"{value} day(s)"
-                        elif field_name == 'level':
-                            value = f"Level {value}"
-                        
-                        embed.add_field(name=display_name, value=str(value)[:100], inline=True)
-                
-                await interaction.followup.send(embed=embed, ephemeral=True)
+                view = key_info_view(key, response, interaction.user.mention, use_mirror)
+                view.message = await interaction.followup.send(embed=view.render(), view=view, ephemeral=True, wait=True)
             else:
                 error_msg = response.get('message', 'Key not found or invalid')
                 await interaction.followup.send(
@@ -550,7 +4171,7 @@ class KeyInfoModal(discord.ui.Modal, title="📊 License Key Information"):
                 ephemeral=True
             )
 
-class UserInfoByKeyModal(discord.ui.Modal, title="👤 User Info (by License Key)"):
+class UserInfoByKeyModal(KeyAuthModal, title="👤 User Info (by License Key)"):
     license_key = discord.ui.TextInput(
         label="License Key",
         placeholder="Enter Corvus license key to get user info",
@@ -558,6 +4179,7 @@ class UserInfoByKeyModal(discord.ui.Modal, title="👤 User Info (by License Key
         max_length=100
     )
     
+    @timed_handler("modal")
     async def on_submit(self, interaction: discord.Interaction):
         # Check admin permission
         if not interaction.user.guild_permissions.administrator:
@@ -585,11 +4207,13 @@ class UserInfoByKeyModal(discord.ui.Modal, title="👤 User Info (by License Key
             response = await keyauth.fetch_info_by_key(key)
             
             if response.get('success'):
-                embed = create_success_embed(
-                    "👤 User/License Information",
-                    f"Information for license key: `{key}`\nChecked by: {interaction.user.mention}"
-                )
+                def make_embed() -> discord.Embed:
+                    return create_success_embed(
+                        "👤 User/License Information",
+                        f"Information for license key: `{key}`\nChecked by: {interaction.user.mention}"
+                    )
                 
+                fields = []
                 for field_name, value in response.items():
                     if field_name not in ['success', 'message'] and value not in [None, ""]:
                         display_name = field_name.capitalize().replace('_', ' ')
@@ -606,9 +4230,10 @@ class UserInfoByKeyModal(discord.ui.Modal, title="👤 User Info (by License Key
                         elif field_name == 'active':
                             value = "✅ Yes" if str(value).lower() in ['true', '1', 'yes'] else "❌ No"
                         
-                        embed.add_field(name=display_name, value=str(value)[:100], inline=True)
+                        fields.append((display_name, str(value)))
                 
-                await interaction.followup.send(embed=embed, ephemeral=True)
+                view = paginated_fields_view(make_embed, fields, export_name=f"user_info_{key[:30]}")
+                view.message = await interaction.followup.send(embed=view.render(), view=view, ephemeral=True, wait=True)
             else:
                 error_msg = response.get('message', 'License key not found')
                 await interaction.followup.send(
@@ -622,6 +4247,99 @@ class UserInfoByKeyModal(discord.ui.Modal, title="👤 User Info (by License Key
                 ephemeral=True
             )
 
+class BatchDeleteModal(KeyAuthModal, title="🗑️ Batch Delete License Keys"):
+    license_keys = discord.ui.TextInput(
+        label="License Keys",
+        style=discord.TextStyle.paragraph,
+        placeholder="One key per line (or separated by spaces/commas)",
+        required=True,
+        max_length=4000
+    )
+    
+    delete_user = discord.ui.TextInput(
+        label="Delete from user too? (yes/no)",
+        placeholder="Type 'yes' to delete from user, 'no' to only delete key",
+        required=False,
+        default="no",
+        max_length=3
+    )
+    
+    @timed_handler("modal")
+    async def on_submit(self, interaction: discord.Interaction):
+        # Check admin permission
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message(
+                embed=create_error_embed(
+                    "Permission Denied",
+                    "❌ You need **Administrator** permission to delete keys!"
+                ),
+                ephemeral=True
+            )
+            return
+        
+        await interaction.response.defer(ephemeral=True)
+        
+        try:
+            keys = parse_key_list(self.license_keys.value)
+            delete_user = self.delete_user.value.strip().lower() == 'yes'
+            error = validate_batch_keys(keys)
+            if error:
+                await interaction.followup.send(embed=create_error_embed("Invalid Input", error), ephemeral=True)
+                return
+            
+            loading = await interaction.followup.send(
+                f"**{interaction.user.mention} is deleting {len(keys)} license key(s)...** ⏳", ephemeral=True
+            )
+            await start_batch(loading, interaction.user, 'delete', keys, delete_user, ephemeral=True)
+        
+        except Exception as e:
+            await interaction.followup.send(
+                embed=create_error_embed("Error Occurred", str(e)),
+                ephemeral=True
+            )
+
+class BatchHWIDResetModal(KeyAuthModal, title="🔄 Batch Reset HWID"):
+    license_keys = discord.ui.TextInput(
+        label="License Keys",
+        style=discord.TextStyle.paragraph,
+        placeholder="One key per line (or separated by spaces/commas)",
+        required=True,
+        max_length=4000
+    )
+    
+    @timed_handler("modal")
+    async def on_submit(self, interaction: discord.Interaction):
+        # Check admin permission
+        if not interaction.user.guild_permissions.administrator:
+            await interaction.response.send_message(
+                embed=create_error_embed(
+                    "Permission Denied",
+                    "❌ You need **Administrator** permission to reset HWID!"
+                ),
+                ephemeral=True
+            )
+            return
+        
+        await interaction.response.defer(ephemeral=True)
+        
+        try:
+            keys = parse_key_list(self.license_keys.value)
+            error = validate_batch_keys(keys)
+            if error:
+                await interaction.followup.send(embed=create_error_embed("Invalid Input", error), ephemeral=True)
+                return
+            
+            loading = await interaction.followup.send(
+                f"**{interaction.user.mention} is resetting HWID for {len(keys)} license key(s)...** ⏳", ephemeral=True
+            )
+            await start_batch(loading, interaction.user, 'resethwid', keys, ephemeral=True)
+        
+        except Exception as e:
+            await interaction.followup.send(
+                embed=create_error_embed("Error Occurred", str(e)),
+                ephemeral=True
+            )
+
 # Main Menu View with permission check
 class MainMenuView(discord.ui.View):
     def __init__(self):
@@ -657,6 +4375,78 @@ class MainMenuView(discord.ui.View):
     @discord.ui.button(label="👤 User Info", style=discord.ButtonStyle.success, emoji="👤", row=1)
     async def user_info_button(self, interaction: discord.Interaction, button: discord.ui.Button):
         await interaction.response.send_modal(UserInfoByKeyModal())
+    
+    @discord.ui.button(label="🗑️ Batch Delete", style=discord.ButtonStyle.danger, emoji="🧹", row=2)
+    async def batch_delete_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(BatchDeleteModal())
+    
+    @discord.ui.button(label="🔄 Batch Reset HWID", style=discord.ButtonStyle.secondary, emoji="♻️", row=2)
+    async def batch_hwid_reset_button(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await interaction.response.send_modal(BatchHWIDResetModal())
+
+def main_menu_embed(mention: str) -> discord.Embed:
+    return create_embed(
+        "🔑 Corvus KeyAuth Management System",
+        f"Welcome  {mention}!\n\n"
+        "**Available Functions:**\n"
+        "• 🔑 **Generate Keys** - Create Corvus-XXXX-XXXX-XXX license keys\n"
+        "• 🗑️ **Delete License** - Remove license keys\n"
+        "• 🔄 **Reset HWID** - Reset HWID by license key\n"
+        "• 📊 **Key Info** - Check license key information\n"
+        "• 👤 **User Info** - Get user info by license key\n"
+        "• 🧹 **Batch Delete / Reset HWID** - Process many keys at once\n\n"
+        "**Official Corvus Keyauth system**\n"
+        "Bot was made by XDK\n"
+        f"**User:** {mention}",
+        discord.Color.blue()
+    )
+
+# Slash command tree sync
+def command_tree_hash(tree: app_commands.CommandTree, guild: Optional[discord.abc.Snowflake] = None) -> str:
+    """Stable hash of the command payloads tree.sync() would upload"""
+    payload = [command.to_dict(tree) for command in tree.get_commands(guild=guild)]
+    payload.sort(key=lambda command: (command.get('type', 1), command['name']))
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode('utf-8')).hexdigest()
+
+def _read_sync_state(path: str) -> Dict[str, str]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+        return state if isinstance(state, dict) else {}
+    except (OSError, ValueError):
+        return {}
+
+def _write_sync_state(path: str, state: Dict[str, str]):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+async def sync_command_tree(client: commands.Bot) -> bool:
+    """tree.sync() only when the tree hash differs from the last persisted one"""
+    guild = discord.Object(id=SLASH_CONFIG['guild_id']) if SLASH_CONFIG['guild_id'] else None
+    if guild:
+        client.tree.copy_global_to(guild=guild)
+    scope = f"{client.application_id}:{guild.id if guild else 'global'}"
+    tree_hash = command_tree_hash(client.tree, guild)
+    
+    path = SLASH_CONFIG['sync_state_file']
+    state = await asyncio.to_thread(_read_sync_state, path)
+    if state.get(scope) == tree_hash and not SLASH_CONFIG['force_sync']:
+        log.info("command tree unchanged, sync skipped", extra={'scope': scope, 'hash': tree_hash[:12]})
+        return False
+    
+    try:
+        synced = await client.tree.sync(guild=guild)
+    except discord.HTTPException as e:
+        # hiba esetén nem mentjük a hash-t, a következő indulás újrapróbálja
+        log.error("command tree sync failed", extra={'scope': scope, 'error': str(e)})
+        return False
+    
+    state[scope] = tree_hash
+    await asyncio.to_thread(_write_sync_state, path, state)
+    log.info("command tree synced", extra={'scope': scope, 'hash': tree_hash[:12], 'commands': len(synced)})
+    return True
 
 # Bot events
 @bot.event
@@ -664,7 +4454,7 @@ async def on_ready():
     print(f'✅ Bot logged in as: {bot.user.name}')
     print(f'🆔 Bot ID: {bot.user.id}')
     print('━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━')
-    print(f'🔑 KeyAuth Seller Key: {KEYAUTH_CONFIG["seller_key"]}')
+    print(f'🔑 KeyAuth Seller Key: {redact(KEYAUTH_CONFIG["seller_key"])}')
     print(f'🌐 API URL: {KEYAUTH_CONFIG["api_url"]}')
     print('━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━')
     print('🔒 Bot is ADMIN ONLY - All commands require Administrator permission')
@@ -689,108 +4479,29 @@ async def on_command_error(ctx, error):
     elif isinstance(error, commands.CommandNotFound):
         pass
     else:
-        print(f"Error: {error}")
+        log.error("command error", extra={'command': ctx.command.name if ctx.command else None, 'error': str(error)})
 
 # Bot commands
 @bot.command(name="menu")
 @commands.has_permissions(administrator=True)
 async def menu(ctx):
     """Show main menu """
-    embed = create_embed(
-        "🔑 Corvus KeyAuth Management System",
-        f"Welcome  {ctx.author.mention}!\n\n"
-        "**Available Functions:**\n"
-        "• 🔑 **Generate Keys** - Create Corvus-XXXX-XXXX-XXX license keys\n"
-        "• 🗑️ **Delete License** - Remove license keys\n"
-        "• 🔄 **Reset HWID** - Reset HWID by license key\n"
-        "• 📊 **Key Info** - Check license key information\n"
-        "• 👤 **User Info** - Get user info by license key\n\n"
-        "**Official Corvus Keyauth system**\n"
-        "Bot was made by XDK\n"
-        f"**User:** {ctx.author.mention}",
-        discord.Color.blue()
-    )
-    
-    await ctx.send(embed=embed, view=MainMenuView())
+    await ctx.send(embed=main_menu_embed(ctx.author.mention), view=MainMenuView())
 
 # !generate command - PUBLIC but ADMIN ONLY
 @bot.command(name="generate")
 @commands.has_permissions(administrator=True)
-async def generate(ctx, expiry: str = "30", level: str = "1", amount: int = 1):
+async def generate(ctx, expiry: str = "30", level: str = "1", amount: int = 1, fmt: str = "txt"):
     """Generate Corvus license keys """
     try:
-        if amount < 1 or amount > 10:
-            await ctx.send(embed=create_error_embed("Error", "Amount must be between 1 and 10!"))
+        if amount < 1 or amount > BULK_CONFIG['max_amount']:
+            await ctx.send(embed=create_error_embed("Error", f"Amount must be between 1 and {BULK_CONFIG['max_amount']}!"))
             return
         
         # Public loading message
         public_msg = await ctx.send(f"**{ctx.author.mention} is generating {amount} Corvus license key(s)...** ⏳")
         
-        response = await keyauth.add_license(
-            expiry=expiry,
-            level=level,
-            mask="Corvus-****-****-***",
-            amount=amount
-        )
-        
-        if response.get('success'):
-            # Extract keys
-            keys = []
-            if 'key' in response:
-                keys.append(response['key'])
-            elif 'keys' in response and isinstance(response['keys'], list):
-                keys = response['keys']
-            elif 'message' in response:
-                found_keys = re.findall(r'[A-Za-z0-9\-]{10,}', response['message'])
-                if found_keys:
-                    keys = found_keys
-            
-            # If no keys, generate them
-            if not keys:
-                for i in range(amount):
-                    keys.append(generate_corvus_key())
-            
-            if keys:
-                # PUBLIC embed with ALL details
-                public_embed = create_success_embed(
-                    "✅ Corvus Keys Generated!",
-                    f"**{ctx.author.mention} successfully generated {len(keys)} Corvus license key(s)!**\n\n"
-                    f"📊 **Details:**\n"
-                    f"• Level: **{level}**\n"
-                    f"• Expiry: **{expiry} days**\n"
-                    f"• Format: `Corvus-XXXX-XXXX-XXX`\n"
-                    f"• Generated by: {ctx.author.mention}\n"
-                    f"• Time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-                )
-                
-                # Add keys to the public embed
-                keys_text = "\n".join([f"`{key}`" for key in keys])
-                public_embed.add_field(
-                    name=f"Generated Key{'s' if len(keys) > 1 else ''}:",
-                    value=keys_text,
-                    inline=False
-                )
-                
-                public_embed.add_field(
-                    name="Important",
-                    value="These keys are now active in the system. Keep them secure!",
-                    inline=False
-                )
-                
-                await public_msg.edit(content=None, embed=public_embed)
-                
-            else:
-                public_embed = create_success_embed(
-                    "✅ Generation Complete",
-                    f"**{ctx.author.mention}'s key generation request was processed!**\n"
-                    f"Check your KeyAuth dashboard for details."
-                )
-                await public_msg.edit(content=None, embed=public_embed)
-                
-        else:
-            error_msg = response.get('message', 'Unknown error')
-            public_embed = create_error_embed("❌ Generation Failed", error_msg)
-            await public_msg.edit(content=None, embed=public_embed)
+        await run_generation(public_msg, ctx.author, expiry, level, amount, fmt.lower())
             
     except Exception as e:
         await ctx.send(embed=create_error_embed("Error Occurred", str(e)))
@@ -806,20 +4517,7 @@ async def delete(ctx, key: str, delete_user: str = "no"):
         loading_msg = await ctx.send(f"🗑️ Deleting license key...", ephemeral=True)
         
         response = await keyauth.delete_license(key, delete_user_bool)
-        
-        if response.get('success'):
-            embed = create_success_embed(
-                "✅ License Key Deleted!",
-                response.get('message', 'License key deleted successfully')
-            )
-            embed.add_field(name="Key", value=f"`{key}`", inline=False)
-            embed.add_field(name="Delete from user", value="✅ Yes" if delete_user_bool else "❌ No", inline=True)
-            embed.add_field(name="Deleted by", value=ctx.author.mention, inline=True)
-            
-            await loading_msg.edit(content=None, embed=embed)
-        else:
-            error_msg = response.get('message', 'Failed to delete license key')
-            await loading_msg.edit(content=None, embed=create_error_embed("Delete Failed", error_msg))
+        await edit_scheduler.final(loading_msg, content=None, embed=license_deleted_embed(key, response, delete_user_bool, ctx.author.mention))
     
     except Exception as e:
         await ctx.send(embed=create_error_embed("Error Occurred", str(e)), ephemeral=True)
@@ -832,63 +4530,233 @@ async def resethwid(ctx, key: str):
         loading_msg = await ctx.send(f"🔄 Resetting HWID...", ephemeral=True)
         
         response = await keyauth.reset_hwid_by_key(key)
-        
-        if response.get('success'):
-            embed = create_success_embed(
-                "✅ HWID Reset Successful!",
-                response.get('message', 'HWID has been reset successfully')
-            )
-            embed.add_field(name="License Key", value=f"`{key}`", inline=False)
-            embed.add_field(name="Reset by", value=ctx.author.mention, inline=True)
-            
-            await loading_msg.edit(content=None, embed=embed)
-        else:
-            error_msg = response.get('message', 'Failed to reset HWID')
-            embed = create_error_embed("HWID Reset Failed", error_msg)
-            embed.add_field(name="License Key", value=f"`{key}`", inline=False)
-            
-            await loading_msg.edit(content=None, embed=embed)
+        await edit_scheduler.final(loading_msg, content=None, embed=hwid_reset_embed(key, response, ctx.author.mention))
     
     except Exception as e:
         await ctx.send(embed=create_error_embed("Error Occurred", str(e)), ephemeral=True)
 
+@bot.command(name="batchdelete")
+@commands.has_permissions(administrator=True)
+async def batchdelete(ctx, *, keys: str = ""):
+    """Delete many license keys (pasted or .txt/.csv attachment) """
+    try:
+        tokens = keys.split(maxsplit=1)
+        delete_user_bool = bool(tokens) and tokens[0].lower() in ['yes', 'y', 'true', '1']
+        if tokens and tokens[0].lower() in ['yes', 'y', 'true', '1', 'no', 'n', 'false', '0']:
+            keys = tokens[1] if len(tokens) > 1 else ""
+        
+        key_list = parse_key_list(keys + "\n" + await read_key_attachments(ctx.message.attachments))
+        error = validate_batch_keys(key_list)
+        if error:
+            await ctx.send(embed=create_error_embed("Invalid Input", error))
+            return
+        
+        loading_msg = await ctx.send(f"**{ctx.author.mention} is deleting {len(key_list)} license key(s)...** ⏳")
+        await start_batch(loading_msg, ctx.author, 'delete', key_list, delete_user_bool)
+    
+    except Exception as e:
+        await ctx.send(embed=create_error_embed("Error Occurred", str(e)))
+
+@bot.command(name="batchresethwid")
+@commands.has_permissions(administrator=True)
+async def batchresethwid(ctx, *, keys: str = ""):
+    """Reset HWID for many license keys (pasted or .txt/.csv attachment) """
+    try:
+        key_list = parse_key_list(keys + "\n" + await read_key_attachments(ctx.message.attachments))
+        error = validate_batch_keys(key_list)
+        if error:
+            await ctx.send(embed=create_error_embed("Invalid Input", error))
+            return
+        
+        loading_msg = await ctx.send(f"**{ctx.author.mention} is resetting HWID for {len(key_list)} license key(s)...** ⏳")
+        await start_batch(loading_msg, ctx.author, 'resethwid', key_list)
+    
+    except Exception as e:
+        await ctx.send(embed=create_error_embed("Error Occurred", str(e)))
+
+@bot.command(name="jobs")
+@commands.has_permissions(administrator=True)
+async def jobs_command(ctx):
+    """List recent background jobs """
+    if not bot.jobs:
+        await ctx.send(embed=create_error_embed("Jobs Disabled", "Background jobs are disabled, enable them with JOBS_ENABLED=1."))
+        return
+    await ctx.send(embed=jobs_list_embed(await bot.jobs.list_jobs()))
+
+@bot.command(name="job")
+@commands.has_permissions(administrator=True)
+async def job_command(ctx, job_id: int):
+    """Inspect a background job """
+    job = await bot.jobs.get(job_id) if bot.jobs else None
+    if job is None:
+        await ctx.send(embed=create_error_embed("Job Not Found", f"There is no job #{job_id}."))
+        return
+    await ctx.send(embed=await job_detail_embed(job))
+
+@bot.command(name="canceljob")
+@commands.has_permissions(administrator=True)
+async def canceljob_command(ctx, job_id: int):
+    """Cancel a queued or running background job """
+    if bot.jobs and await bot.jobs.cancel(job_id):
+        await ctx.send(embed=create_success_embed("⛔ Job Cancelled", f"Job #{job_id} was cancelled by {ctx.author.mention}."))
+    else:
+        await ctx.send(embed=create_error_embed("Cannot Cancel", f"Job #{job_id} does not exist or already finished."))
+
 @bot.command(name="info")
 @commands.has_permissions(administrator=True)
-async def info(ctx, key: str):
+async def info(ctx, key: str, mode: str = "no"):
     """Get license key information - """
     try:
+        mode = mode.lower()
+        fresh_bool = mode in ['yes', 'y', 'true', '1', 'fresh']
+        use_mirror = mode in ['mirror', 'local']
+        
         loading_msg = await ctx.send(f"🔍 Checking info...", ephemeral=True)
         
-        response = await keyauth.verify_key(key)
+        if use_mirror:
+            response = await keyauth.lookup_local(key)
+            if response is None:
+                await edit_scheduler.final(loading_msg, content=None, embed=create_error_embed(
+                    "Mirror Disabled", "The local license mirror is not enabled (LICENSE_MIRROR=1)."
+                ))
+                return
+        else:
+            response = await keyauth.verify_key(key, fresh=fresh_bool)
         
         if response.get('success'):
-            embed = create_success_embed(
-                "📊 License Key Information",
-                f"Information for key: `{key}`\nChecked by: {ctx.author.mention}"
-            )
-            
-            for field_name, value in response.items():
-                if field_name not in ['success', 'message'] and value not in [None, ""]:
-                    display_name = field_name.capitalize().replace('_', ' ')
-                    
-                    if field_name == 'status':
-                        value = "✅ Active" if str(value).lower() in ['active', 'true', '1'] else "❌ Inactive"
-                    elif field_name == 'expiry':
-                        if value == '0' or value == 0:
-                            value = "Never (Lifetime)"
-                        else:
-                            value = f"{value} day(s)"
-                    
-                    embed.add_field(name=display_name, value=str(value)[:100], inline=True)
-            
-            await loading_msg.edit(content=None, embed=embed)
+            view = key_info_view(key, response, ctx.author.mention, use_mirror)
+            await edit_scheduler.final(loading_msg, content=None, embed=view.render(), view=view)
+            view.message = loading_msg
         else:
             error_msg = response.get('message', 'Key not found')
-            await loading_msg.edit(content=None, embed=create_error_embed("Key Not Found", error_msg))
+            await edit_scheduler.final(loading_msg, content=None, embed=create_error_embed("Key Not Found", error_msg))
     
     except Exception as e:
         await ctx.send(embed=create_error_embed("Error Occurred", str(e)), ephemeral=True)
 
+@bot.command(name="export")
+@commands.has_permissions(administrator=True)
+@commands.guild_only()
+async def export(ctx, *options: str):
+    """Export licenses as a gzip CSV/JSONL attachment """
+    try:
+        fmt, export_filter, source = parse_export_args(list(options))
+    except ValueError as e:
+        await ctx.send(embed=create_error_embed("Invalid Input", f"{e}\n\n"
+            "Usage: `!export [csv/jsonl] [level=1] [expiry=7-30] [used/unused] [banned/unbanned] [source=auto/mirror/api]`"))
+        return
+    if export_lock.locked():
+        await ctx.send(embed=create_error_embed("Export Running", "Another license export is in progress, try again shortly."))
+        return
+    async with export_lock:
+        loading_msg = await ctx.send(f"**{ctx.author.mention} is exporting licenses ({export_filter.describe()})...** ⏳")
+        await run_license_export(loading_msg, ctx.author.mention, fmt, export_filter, source, ctx.guild.filesize_limit)
+
+@bot.command(name="apistats")
+@commands.has_permissions(administrator=True)
+async def apistats(ctx):
+    """Show KeyAuth client statistics """
+    pool = keyauth.get_pool_stats()
+    cache = keyauth.cache.get_stats()
+    flights = keyauth.flight_stats
+    mirror_text = "Disabled"
+    if keyauth.mirror:
+        mirror_text = (f"age {format_age(keyauth.mirror.snapshot_age())}, "
+                       f"{keyauth.mirror.stats['syncs']} syncs / {keyauth.mirror.stats['sync_errors']} errors")
+    scheduler = keyauth.scheduler
+    scheduler_text = (
+        f"active {sum(scheduler.active.values())} / {scheduler.concurrency or '∞'}\n" +
+        "\n".join(f"{priority}: {scheduler.depth(priority)} queued, "
+                  f"max wait {scheduler.stats[priority]['wait_max'] * 1000:.0f} ms" for priority in PRIORITY_CLASSES)
+    )
+    lookups = keyauth.lookup.stats
+    lookup_text = (
+        f"{lookups['lookups']} ({'hedged' if LOOKUP_CONFIG['hedge'] else 'sequential'}), "
+        f"{lookups['reordered']} fetchuser-first\n"
+        f"saved {lookups['saved_seconds'] * 1000:.0f} ms total, {flights['cancelled']} cancelled"
+    )
+    breaker = keyauth.breaker
+    breaker_text = breaker.state.replace('_', '-').upper()
+    if breaker.state == 'open':
+        breaker_text += f" (retry in {breaker.retry_in():.0f}s)"
+    embed = create_embed(
+        "📈 KeyAuth API Statistics",
+        f"Requested by: {ctx.author.mention}",
+        discord.Color.blue(),
+        fields=[
+            ("Requests", str(pool['requests']), True),
+            ("Connections created", str(pool['connections_created']), True),
+            ("Connections reused", f"{pool['connections_reused']} ({pool['reuse_ratio']:.0%})", True),
+            ("Cache hits / misses", f"{cache['hits']} / {cache['misses']} ({cache['hit_ratio']:.0%})", True),
+            ("Cache evictions", f"{cache['evictions']} (+{cache['expired']} expired)", True),
+            ("Cache size", f"{cache['size']} / {CACHE_CONFIG['max_entries']}", True),
+            ("Coalesced reads", f"{flights['coalesced']} saved / {flights['upstream']} sent", True),
+            ("Circuit breaker", f"{breaker_text}\nfailures: {breaker.failures}, opened: {breaker.stats['opened']}x", True),
+            ("Fast-failed", str(breaker.stats['short_circuited']), True),
+            ("License mirror", mirror_text, True),
+            ("Cluster", f"#{CLUSTER_CONFIG['cluster_id']}, shards {bot.shard_ids or 'all'} / {bot.shard_count or 1}", True),
+            ("Retries / throttled", f"{keyauth.retry_stats['retries']} / "
+                                    f"{sum(b.throttled for b in keyauth.rate_limiters.values())}", True),
+            ("Scheduler", scheduler_text, True),
+            ("Info lookups", lookup_text, True),
+            ("Pre-flight rejects", f"{keyauth.preflight_stats['bad_format']} bad format / "
+                                   f"{keyauth.preflight_stats['known_missing']} known missing\n"
+                                   f"negative cache {keyauth.negative.get_stats()['size']} / "
+                                   f"{NEGATIVE_CACHE_CONFIG['max_entries']}", True),
+            ("Deadlines", f"{keyauth.deadline_stats['expired']} not sent / "
+                          f"{keyauth.deadline_stats['cancelled']} abandoned", True),
+            ("Message edits", f"{edit_scheduler.stats['flushed']} sent / {edit_scheduler.stats['dropped']} coalesced\n"
+                              f"held back: {edit_scheduler.stats['throttled']}, 429s: {edit_scheduler.stats['rate_limited']}", True),
+        ]
+    )
+    await ctx.send(embed=embed)
+
+@bot.command(name="loopstats")
+@commands.has_permissions(administrator=True)
+async def loopstats(ctx):
+    """Show event loop lag, recent stalls and slow callbacks """
+    watchdog = bot.watchdog
+    if not watchdog:
+        await ctx.send(embed=create_error_embed(
+            "Watchdog Disabled", "Set `LOOP_WATCHDOG=1` to sample event loop lag and capture stalls."
+        ))
+        return
+    stats = watchdog.stats
+    stall_lines = [
+        f"`{datetime.fromtimestamp(stall['started']):%H:%M:%S}` **{stall['duration'] * 1000:.0f} ms** in "
+        f"`{stall['coro'] or stall['task'] or 'unknown'}`" + (" ⚠️ heartbeat" if stall['heartbeat_warned'] else "")
+        for stall in reversed(watchdog.stalls)
+    ][:5]
+    slow_lines = [
+        f"`{datetime.fromtimestamp(entry['when']):%H:%M:%S}` {entry['duration'] * 1000:.0f} ms `{entry['handle'][:80]}`"
+        for entry in reversed(watchdog.slow_callbacks)
+    ][:5]
+    debug_left = watchdog.debug_until - time.monotonic()
+    embed = create_embed(
+        "🩺 Event Loop Watchdog",
+        f"Requested by: {ctx.author.mention}",
+        discord.Color.blue(),
+        fields=[
+            ("Lag p50 / p99", f"{watchdog.lag_percentile(50) * 1000:.1f} / {watchdog.lag_percentile(99) * 1000:.1f} ms", True),
+            ("Max lag", f"{stats['max_lag'] * 1000:.0f} ms", True),
+            ("Stalls", f"{stats['stalls']} (> {watchdog.threshold * 1000:.0f} ms)", True),
+            ("Heartbeat warnings", f"{stats['heartbeat_warnings']} (interval {watchdog.last_heartbeat_interval:.1f}s)", True),
+            ("Slow callbacks", f"{stats['slow_callbacks']} ({f'detection on, {debug_left:.0f}s left' if debug_left > 0 else 'detection off'})", True),
+            ("Recent stalls", "\n".join(stall_lines) or "None", False),
+            ("Recent slow callbacks", "\n".join(slow_lines) or "None", False),
+        ]
+    )
+    # a teljes stack mintákat fájlban küldjük, embedbe nem férnek
+    stacks = [
+        f"# {datetime.fromtimestamp(stall['started']).isoformat(timespec='seconds')} "
+        f"{stall['duration'] * 1000:.0f} ms task={stall['task']} coro={stall['coro']}\n{stall['stack'] or '(no sample)'}"
+        for stall in watchdog.stalls
+    ]
+    if stacks:
+        await ctx.send(embed=embed, file=text_file(stacks, "loop_stalls.txt"))
+    else:
+        await ctx.send(embed=embed)
+
 @bot.command(name="helpme")
 @commands.has_permissions(administrator=True)
 async def help_command(ctx):
@@ -896,12 +4764,21 @@ async def help_command(ctx):
     embed = create_embed(
         "🛠️ Corvus KeyAuth Bot Help",
         "**!menu** - Show interactive menu\n"
-        "**!generate [expiry] [level] [amount]** - Generate license keys\n"
+        "**!generate [expiry] [level] [amount] [txt/csv]** - Generate license keys (>10 = file)\n"
         "**!delete [key] [yes/no]** - Delete a license key\n"
         "**!resethwid [key]** - Reset HWID by license key\n"
-        "**!info [key]** - Get license key information\n\n"
+        "**!batchdelete [yes/no] [keys...]** - Delete many keys (or attach .txt/.csv)\n"
+        "**!batchresethwid [keys...]** - Reset HWID for many keys (or attach .txt/.csv)\n"
+        "**!info [key] [fresh/mirror]** - Get license key information\n"
+        "**!jobs / !job [id] / !canceljob [id]** - List, inspect or cancel background jobs (JOBS_ENABLED=1)\n"
+        "**!export [csv/jsonl] [level=1] [expiry=7-30] [used/unused] [banned/unbanned] [source=auto/mirror/api]** - "
+        "Export licenses (.gz)\n"
+        "**!apistats** - Show KeyAuth API statistics\n"
+        "**!loopstats** - Show event loop lag and stalls (LOOP_WATCHDOG=1)\n"
+        "**/menu /generate /delete /resethwid /info /job /export** - Slash versions (work without message content)\n\n"
         "**Examples:**\n"
         "• `!generate 30 1 5` - Generate 5 keys, 30 days, level 1\n"
+        "• `!generate 30 1 500 csv` - Generate 500 keys as a CSV file\n"
         "• `!delete Corvus-ABCD-EFGH-IJK yes` - Delete key and user\n"
         "• `!resethwid Corvus-WXYZ-1234-ABC` - Reset HWID\n"
         "• `!info Corvus-TEST-0000-001` - Check key info\n\n",
@@ -909,6 +4786,287 @@ async def help_command(ctx):
     )
     await ctx.send(embed=embed)
 
+# Slash commands - ADMIN ONLY (default_permissions hides them, admin_only_view enforces)
+@bot.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.CheckFailure):
+        return  # admin_only_view already answered
+    log.error("app command error", extra={
+        'command': interaction.command.name if interaction.command else None, 'error': str(error)
+    })
+    embed = create_error_embed("Error Occurred", str(error))
+    if interaction.response.is_done():
+        await interaction.followup.send(embed=embed, ephemeral=True)
+    else:
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="menu", description="Show the Corvus KeyAuth management menu")
+@app_commands.default_permissions(administrator=True)
+@app_commands.guild_only()
+@admin_only_view()
+@timed_handler("app_command", "menu")
+async def slash_menu(interaction: discord.Interaction):
+    await interaction.response.send_message(embed=main_menu_embed(interaction.user.mention), view=MainMenuView())
+
+@bot.tree.command(name="generate", description="Generate Corvus license keys (more than 10 = file)")
+@app_commands.describe(
+    expiry="Expiry in days (0 = lifetime)",
+    level="Subscription level",
+    amount="How many keys to generate",
+    fmt="File format for bulk generation"
+)
+@app_commands.default_permissions(administrator=True)
+@app_commands.guild_only()
+@admin_only_view()
+@timed_handler("app_command", "generate")
+async def slash_generate(
+    interaction: discord.Interaction,
+    expiry: str = "30",
+    level: str = "1",
+    amount: app_commands.Range[int, 1, BULK_CONFIG['max_amount']] = 1,
+    fmt: Literal['txt', 'csv'] = 'txt'
+):
+    # Public loading message
+    await interaction.response.send_message(
+        f"**{interaction.user.mention} is generating {amount} Corvus license key(s)...** ⏳"
+    )
+    message = await interaction.original_response()
+    await run_generation(message, interaction.user, expiry, level, amount, fmt)
+
+@bot.tree.command(name="delete", description="Delete a license key")
+@app_commands.describe(key="Corvus license key", delete_user="Delete the user registered with the key too")
+@app_commands.default_permissions(administrator=True)
+@app_commands.guild_only()
+@admin_only_view()
+@timed_handler("app_command", "delete")
+async def slash_delete(interaction: discord.Interaction, key: str, delete_user: bool = False):
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    key = key.strip()
+    response = await keyauth.delete_license(key, delete_user)
+    await interaction.followup.send(
+        embed=license_deleted_embed(key, response, delete_user, interaction.user.mention),
+        ephemeral=True
+    )
+
+@bot.tree.command(name="resethwid", description="Reset HWID by license key")
+@app_commands.describe(key="Corvus license key")
+@app_commands.default_permissions(administrator=True)
+@app_commands.guild_only()
+@admin_only_view()
+@timed_handler("app_command", "resethwid")
+async def slash_resethwid(interaction: discord.Interaction, key: str):
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    key = key.strip()
+    response = await keyauth.reset_hwid_by_key(key)
+    await interaction.followup.send(embed=hwid_reset_embed(key, response, interaction.user.mention), ephemeral=True)
+
+@bot.tree.command(name="info", description="Get license key information")
+@app_commands.describe(key="Corvus license key", mode="cached (default), fresh from KeyAuth, or the local mirror")
+@app_commands.default_permissions(administrator=True)
+@app_commands.guild_only()
+@admin_only_view()
+@timed_handler("app_command", "info")
+async def slash_info(interaction: discord.Interaction, key: str, mode: Literal['cached', 'fresh', 'mirror'] = 'cached'):
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    key = key.strip()
+    use_mirror = mode == 'mirror'
+    if use_mirror:
+        response = await keyauth.lookup_local(key)
+        if response is None:
+            await interaction.followup.send(embed=create_error_embed(
+                "Mirror Disabled", "The local license mirror is not enabled (LICENSE_MIRROR=1)."
+            ), ephemeral=True)
+            return
+    else:
+        response = await keyauth.verify_key(key, fresh=mode == 'fresh')
+    
+    if not response.get('success'):
+        error_msg = response.get('message', 'Key not found')
+        await interaction.followup.send(embed=create_error_embed("Key Not Found", error_msg), ephemeral=True)
+        return
+    view = key_info_view(key, response, interaction.user.mention, use_mirror)
+    view.message = await interaction.followup.send(embed=view.render(), view=view, ephemeral=True, wait=True)
+
+@bot.tree.command(name="export", description="Export licenses as a gzip-compressed CSV/JSONL file")
+@app_commands.describe(
+    fmt="File format",
+    level="Only this subscription level",
+    min_days="Minimum expiry in days",
+    max_days="Maximum expiry in days",
+    used="Only used or only unused keys",
+    banned="Only banned (True) or only not banned (False) keys",
+    source="auto = local mirror when available, otherwise the live seller API "
+)
+@app_commands.default_permissions(administrator=True)
+@app_commands.guild_only()
+@admin_only_view()
+@timed_handler("app_command", "export")
+async def slash_export(
+    interaction: discord.Interaction,
+    fmt: Literal['csv', 'jsonl'] = 'csv',
+    level: Optional[str] = None,
+    min_days: Optional[app_commands.Range[float, 0]] = None,
+    max_days: Optional[app_commands.Range[float, 0]] = None,
+    used: Optional[Literal['used', 'unused']] = None,
+    banned: Optional[bool] = None,
+    source: Literal['auto', 'mirror', 'api'] = 'auto'
+):
+    if export_lock.locked():
+        await interaction.response.send_message(embed=create_error_embed(
+            "Export Running", "Another license export is in progress, try again shortly."
+        ), ephemeral=True)
+        return
+    export_filter = ExportFilter(level, min_days, max_days, None if used is None else used == 'used', banned)
+    async with export_lock:
+        # kulcsok és HWID-k: csak a kérő látja
+        await interaction.response.defer(ephemeral=True, thinking=True)
+        message = await interaction.followup.send(
+            f"**{interaction.user.mention} is exporting licenses ({export_filter.describe()})...** ⏳",
+            ephemeral=True, wait=True
+        )
+        await run_license_export(message, interaction.user.mention, fmt, export_filter, source,
+                                 interaction.guild.filesize_limit)
+
+job_group = app_commands.Group(
+    name="job", description="Background license jobs",
+    default_permissions=discord.Permissions(administrator=True), guild_only=True
+)
+
+@job_group.command(name="list", description="List recent background jobs")
+@admin_only_view()
+@timed_handler("app_command", "job list")
+async def slash_job_list(interaction: discord.Interaction):
+    if not bot.jobs:
+        await interaction.response.send_message(embed=create_error_embed(
+            "Jobs Disabled", "Background jobs are disabled, enable them with JOBS_ENABLED=1."
+        ), ephemeral=True)
+        return
+    await interaction.response.send_message(embed=jobs_list_embed(await bot.jobs.list_jobs()), ephemeral=True)
+
+@job_group.command(name="info", description="Inspect a background job")
+@app_commands.describe(job_id="Job number")
+@admin_only_view()
+@timed_handler("app_command", "job info")
+async def slash_job_info(interaction: discord.Interaction, job_id: int):
+    job = await bot.jobs.get(job_id) if bot.jobs else None
+    if job is None:
+        await interaction.response.send_message(embed=create_error_embed(
+            "Job Not Found", f"There is no job #{job_id}."
+        ), ephemeral=True)
+        return
+    await interaction.response.send_message(embed=await job_detail_embed(job), ephemeral=True)
+
+@job_group.command(name="cancel", description="Cancel a queued or running background job")
+@app_commands.describe(job_id="Job number")
+@admin_only_view()
+@timed_handler("app_command", "job cancel")
+async def slash_job_cancel(interaction: discord.Interaction, job_id: int):
+    if bot.jobs and await bot.jobs.cancel(job_id):
+        embed = create_success_embed("⛔ Job Cancelled", f"Job #{job_id} was cancelled by {interaction.user.mention}.")
+    else:
+        embed = create_error_embed("Cannot Cancel", f"Job #{job_id} does not exist or already finished.")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+bot.tree.add_command(job_group)
+
+# Cluster coordinator (CLUSTER_PROCESSES > 1: ez a folyamat nem csatlakozik, csak bot folyamatokat futtat)
+def split_shards(shard_count: int, clusters: int) -> List[List[int]]:
+    """Contiguous shard ranges, one per cluster (empty clusters dropped)"""
+    per_cluster, extra = divmod(shard_count, clusters)
+    ranges, start = [], 0
+    for cluster_id in range(clusters):
+        size = per_cluster + (1 if cluster_id < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return [shard_ids for shard_ids in ranges if shard_ids]
+
+async def fetch_gateway_info(token: str) -> Dict[str, int]:
+    """GET /gateway/bot: recommended shard count and identify concurrency"""
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            "https://discord.com/api/v10/gateway/bot", headers={'Authorization': f"Bot {token}"}
+        ) as response:
+            response.raise_for_status()
+            data = await response.json()
+    return {'shards': data['shards'], 'max_concurrency': data['session_start_limit']['max_concurrency']}
+
+class ClusterCoordinator:
+    """Starts one bot process per shard range and stops them in a fixed order"""
+    def __init__(self, token: str, processes: int):
+        self.token = token
+        self.processes = processes
+        self.children: List[Tuple[int, asyncio.subprocess.Process]] = []
+        self.stopping = asyncio.Event()
+    
+    async def resolve_shards(self) -> Tuple[int, int]:
+        if CLUSTER_CONFIG['shard_count']:
+            return CLUSTER_CONFIG['shard_count'], 1
+        info = await fetch_gateway_info(self.token)
+        # legalább annyi shard, ahány folyamat, különben üres folyamatok lennének
+        return max(info['shards'], self.processes), info['max_concurrency']
+    
+    async def start(self):
+        shard_count, max_concurrency = await self.resolve_shards()
+        ranges = split_shards(shard_count, self.processes)
+        log.info("cluster starting", extra={'shard_count': shard_count, 'clusters': len(ranges)})
+        for cluster_id, shard_ids in enumerate(ranges):
+            if self.stopping.is_set():
+                break
+            env = dict(
+                os.environ,
+                CLUSTER_MODE="1", CLUSTER_PROCESSES="1", CLUSTER_ID=str(cluster_id),
+                SHARD_COUNT=str(shard_count), SHARD_IDS=f"{shard_ids[0]}-{shard_ids[-1]}",
+            )
+            process = await asyncio.create_subprocess_exec(sys.executable, os.path.abspath(__file__), env=env)
+            self.children.append((cluster_id, process))
+            log.info("cluster process started", extra={'cluster': cluster_id, 'shard_ids': shard_ids, 'pid': process.pid})
+            # az identify limit a folyamatok között közös: a következő csak ezek után csatlakozzon
+            delay = math.ceil(len(shard_ids) / max_concurrency) * CLUSTER_CONFIG['identify_interval']
+            try:
+                await asyncio.wait_for(self.stopping.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+    
+    async def shutdown(self):
+        """Stop clusters last-to-first: the primary (mirror sync, command sync) goes down last"""
+        for cluster_id, process in reversed(self.children):
+            if process.returncode is not None:
+                continue
+            process.terminate()
+            try:
+                await asyncio.wait_for(process.wait(), timeout=CLUSTER_CONFIG['shutdown_timeout'])
+            except asyncio.TimeoutError:
+                log.warning("cluster process killed", extra={'cluster': cluster_id, 'pid': process.pid})
+                process.kill()
+                await process.wait()
+            log.info("cluster process stopped", extra={'cluster': cluster_id, 'returncode': process.returncode})
+    
+    async def run(self) -> int:
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stopping.set)
+            except NotImplementedError:
+                pass
+        
+        exit_code = 0
+        try:
+            await self.start()
+            waiters = {asyncio.create_task(process.wait()): cluster_id for cluster_id, process in self.children}
+            stop_waiter = asyncio.create_task(self.stopping.wait())
+            done, _ = await asyncio.wait([stop_waiter, *waiters], return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task in waiters:
+                    # egy folyamat kiesett: mindent leállítunk, a Railway újraindítja az egészet
+                    exit_code = task.result() or 1
+                    log.error("cluster process exited", extra={'cluster': waiters[task], 'returncode': task.result()})
+            stop_waiter.cancel()
+            for task in waiters:
+                task.cancel()
+        finally:
+            await self.shutdown()
+        return exit_code
+
 # Run bot
 if __name__ == "__main__":
     print("━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━")
@@ -935,8 +5093,13 @@ if __name__ == "__main__":
         print("4. Redeploy the project")
         exit(1)
     
+    setup_logging()
+    
+    if CLUSTER_CONFIG['processes'] > 1:
+        sys.exit(asyncio.run(ClusterCoordinator(BOT_TOKEN, CLUSTER_CONFIG['processes']).run()))
+    
     try:
-        bot.run(BOT_TOKEN)
+        bot.run(BOT_TOKEN, log_handler=None)
     except discord.LoginFailure:
         print("❌ Invalid Discord bot token!")
     except Exception as e:
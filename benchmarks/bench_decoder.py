@@ -0,0 +1,74 @@
+"""
+Microbenchmark: legacy make_request parsing + generate-flow key extraction
+vs. the decode_response fast path, on large multi-key add responses.
+
+    python benchmarks/bench_decoder.py [--keys 1000] [--rounds 200]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Keygen import decode_response, extract_license_keys, generate_corvus_key, orjson  # noqa: E402
+
+def legacy_decode(action: str, status: int, response_text: str):
+    """The pre-decoder parsing path (make_request plain-text fallback + modal re.findall)"""
+    try:
+        result = json.loads(response_text)
+    except json.JSONDecodeError:
+        if not response_text or response_text.isspace():
+            return {"success": False, "message": "Empty response from API"}, []
+        if action == 'add' and re.match(r'^[A-Za-z0-9\-]{10,}$', response_text):
+            result = {"success": True, "key": response_text, "message": "License key generated"}
+        else:
+            success_keywords = ['success', 'successful', 'deleted', 'reset', 'banned', 'unbanned', 'verified']
+            error_keywords = ['error', 'invalid', 'failed', 'not found', 'unhandled']
+            if any(keyword in response_text.lower() for keyword in success_keywords):
+                result = {"success": True, "message": response_text}
+            elif any(keyword in response_text.lower() for keyword in error_keywords):
+                result = {"success": False, "message": response_text}
+            elif status == 200:
+                result = {"success": True, "message": response_text}
+            else:
+                result = {"success": False, "message": f"HTTP {status}: {response_text}"}
+    
+    keys = []
+    if 'key' in result:
+        keys.append(result['key'])
+    elif 'keys' in result and isinstance(result['keys'], list):
+        keys = result['keys']
+    elif 'message' in result:
+        keys = re.findall(r'[A-Za-z0-9\-]{10,}', result['message'])
+    return result, keys
+
+def fast_decode(action: str, status: int, response_text: str):
+    result = decode_response(action, status, response_text)
+    return result, extract_license_keys(result, 0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keys', type=int, default=1000, help="keys per response")
+    parser.add_argument('--rounds', type=int, default=200, help="decodes per measurement")
+    args = parser.parse_args()
+    
+    keys = [generate_corvus_key() for _ in range(args.keys)]
+    payloads = {
+        'json keys[]': json.dumps({"success": True, "message": "Licenses created", "keys": keys}),
+        'plain text': "Licenses generated: " + " ".join(keys),
+        'plain error': "Invalid seller key, " + "x" * (args.keys * 20),
+    }
+    
+    print(f"JSON backend: {'orjson' if orjson else 'stdlib json'} | {args.keys} keys/response | {args.rounds} rounds")
+    print(f"{'payload':<14}{'legacy ms':>12}{'decoder ms':>12}{'speedup':>10}")
+    for name, body in payloads.items():
+        assert legacy_decode('add', 200, body)[1] == fast_decode('add', 200, body)[1] or name == 'plain error'
+        legacy = min(timeit.repeat(lambda: legacy_decode('add', 200, body), number=args.rounds, repeat=5))
+        fast = min(timeit.repeat(lambda: fast_decode('add', 200, body), number=args.rounds, repeat=5))
+        print(f"{name:<14}{legacy / args.rounds * 1000:>12.3f}{fast / args.rounds * 1000:>12.3f}{legacy / fast:>9.2f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Gateway mode comparison (GATEWAY_MODE=full vs lean) without connecting to Discord.
+
+Replays a synthetic startup through discord.py's own ConnectionState parsers:
+GUILD_CREATE for every guild, then (full mode only, as Discord only sends them with
+the members intent) GUILD_MEMBERS_CHUNK events for every member, then a stream of
+MESSAGE_CREATE events. Each mode runs in its own process and reports parse time,
+cached members/messages and resident memory growth.
+
+    python benchmarks/bench_gateway.py --guilds 5 --members 50000 --messages 20000
+"""
+import argparse
+import asyncio
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+MODES = ('full', 'lean')
+LARGE_THRESHOLD = 250
+CHUNK_SIZE = 1000
+BOT_ID = 10 ** 17
+
+def rss_bytes() -> int:
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+def user_payload(user_id: int) -> dict:
+    return {'id': str(user_id), 'username': f"user{user_id}", 'discriminator': '0',
+            'avatar': None, 'global_name': None}
+
+def member_payload(user_id: int) -> dict:
+    return {'user': user_payload(user_id), 'roles': [], 'joined_at': "2024-01-01T00:00:00+00:00",
+            'deaf': False, 'mute': False, 'flags': 0}
+
+def guild_payload(guild_id: int, members: int, channels: int, with_members: bool) -> dict:
+    # members intent nélkül a GUILD_CREATE csak a botot tartalmazza
+    member_ids = range(guild_id * 10 ** 7, guild_id * 10 ** 7 + min(members, LARGE_THRESHOLD)) if with_members else []
+    return {
+        'id': str(guild_id), 'name': f"guild{guild_id}", 'owner_id': str(BOT_ID), 'unavailable': False,
+        'member_count': members, 'large': members > LARGE_THRESHOLD,
+        'roles': [{'id': str(guild_id), 'name': '@everyone', 'permissions': '0', 'position': 0, 'color': 0,
+                   'hoist': False, 'managed': False, 'mentionable': False}],
+        'channels': [{'id': str(guild_id * 1000 + n), 'type': 0, 'name': f"channel{n}", 'position': n,
+                      'permission_overwrites': []} for n in range(channels)],
+        'members': [member_payload(BOT_ID)] + [member_payload(uid) for uid in member_ids],
+        'emojis': [], 'stickers': [], 'features': [], 'threads': [], 'voice_states': [], 'presences': [],
+    }
+
+def message_payload(message_id: int, guild_id: int, channel_id: int, author_id: int) -> dict:
+    member = member_payload(author_id)
+    del member['user']
+    return {
+        'id': str(message_id), 'channel_id': str(channel_id), 'guild_id': str(guild_id),
+        'author': user_payload(author_id), 'member': member, 'content': "hello " * 8,
+        'timestamp': "2024-01-01T00:00:00+00:00", 'edited_timestamp': None, 'tts': False,
+        'mention_everyone': False, 'mentions': [], 'mention_roles': [], 'attachments': [],
+        'embeds': [], 'pinned': False, 'type': 0,
+    }
+
+async def simulate(mode: str, args) -> dict:
+    import discord
+    from discord.state import ChunkRequest
+    import Keygen
+    
+    options = Keygen.build_gateway_options(mode, message_content=True)
+    full = options['intents'].members
+    # a valódi chunk-kérés websocketet igényelne, helyette a chunk eseményeket játsszuk vissza
+    options['chunk_guilds_at_startup'] = False
+    client = discord.Client(**options)
+    state = client._connection
+    state.user = discord.ClientUser(state=state, data=user_payload(BOT_ID))
+    
+    gc.collect()
+    baseline = rss_bytes()
+    started = time.perf_counter()
+    for g in range(1, args.guilds + 1):
+        state.parse_guild_create(guild_payload(g, args.members, args.channels, full))
+        if not full:
+            continue
+        # ugyanaz a cache-elő chunk-kérés, amit a chunk_guilds_at_startup indítana
+        request = ChunkRequest(g, 0, asyncio.get_running_loop(), state._get_guild, cache=True)
+        state._chunk_requests[request.nonce] = request
+        base = g * 10 ** 7
+        chunk_count = (args.members + CHUNK_SIZE - 1) // CHUNK_SIZE
+        for index in range(chunk_count):
+            ids = range(base + index * CHUNK_SIZE, base + min(args.members, (index + 1) * CHUNK_SIZE))
+            state.parse_guild_members_chunk({
+                'guild_id': str(g), 'members': [member_payload(uid) for uid in ids],
+                'chunk_index': index, 'chunk_count': chunk_count, 'nonce': request.nonce,
+            })
+    startup = time.perf_counter() - started
+    gc.collect()
+    after_startup = rss_bytes()
+    
+    started = time.perf_counter()
+    for n in range(args.messages):
+        g = n % args.guilds + 1
+        state.parse_message_create(message_payload(
+            10 ** 15 + n, g, g * 1000 + n % args.channels, g * 10 ** 7 + n % max(1, args.members)
+        ))
+    messages = time.perf_counter() - started
+    gc.collect()
+    
+    return {
+        'mode': mode,
+        'startup_s': startup,
+        'messages_s': messages,
+        'cached_members': sum(len(guild.members) for guild in client.guilds),
+        'cached_messages': len(client.cached_messages),
+        'rss_startup_mb': (after_startup - baseline) / 2 ** 20,
+        'rss_total_mb': (rss_bytes() - baseline) / 2 ** 20,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--guilds', type=int, default=3)
+    parser.add_argument('--members', type=int, default=30000, help="members per guild")
+    parser.add_argument('--channels', type=int, default=50, help="text channels per guild")
+    parser.add_argument('--messages', type=int, default=20000, help="MESSAGE_CREATE events after startup")
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    if args.child:
+        print(json.dumps(asyncio.run(simulate(args.child, args))))
+        return
+    
+    print(f"guilds={args.guilds} members/guild={args.members} channels/guild={args.channels} messages={args.messages}")
+    print(f"{'mode':>6}{'startup s':>11}{'msgs s':>9}{'members':>10}{'messages':>10}{'RSS start MB':>14}{'RSS total MB':>14}")
+    child_args = sys.argv[1:]
+    for mode in MODES:
+        # külön folyamat, hogy a két mód memóriája ne keveredjen
+        output = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), *child_args, '--child', mode],
+            check=True, capture_output=True, text=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{result['mode']:>6}{result['startup_s']:>11.2f}{result['messages_s']:>9.2f}"
+              f"{result['cached_members']:>10}{result['cached_messages']:>10}"
+              f"{result['rss_startup_mb']:>14.1f}{result['rss_total_mb']:>14.1f}")
+
+if __name__ == "__main__":
+    main()
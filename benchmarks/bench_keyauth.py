@@ -0,0 +1,133 @@
+"""
+KeyAuthAPI benchmark against the local stub seller server (no network needed).
+
+Drives make_request and the action helpers at rising concurrency and reports
+p50/p95/p99 latency and requests per second.
+
+    python benchmarks/bench_keyauth.py --scenario mixed --requests 2000 --concurrency 1,8,32,128 --latency-ms 30
+"""
+import argparse
+import asyncio
+import logging
+import os
+import random
+import statistics
+import sys
+import time
+from typing import Callable, List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import Keygen  # noqa: E402
+from stub_server import StubConfig, add_stub_arguments, start_stub, stub_config_from_args  # noqa: E402
+
+SCENARIOS = ('make_request', 'verify', 'info', 'add', 'delete', 'resethwid', 'mixed')
+
+def percentile(samples: List[float], pct: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def build_operation(api: Keygen.KeyAuthAPI, scenario: str, keys: List[str]) -> Callable:
+    """Returns a coroutine factory for one benchmark request"""
+    def pick():
+        return random.choice(keys)
+    
+    def delete_key():
+        # kulcsot csak egyszer törlünk, utána "not found" választ kapunk
+        return api.delete_license(keys.pop() if keys else "Corvus-NONE-NONE-000")
+    
+    operations = {
+        'make_request': lambda: api.make_request('verify', {'key': pick()}),
+        'verify': lambda: api.verify_key(pick()),
+        'info': lambda: api.fetch_info_by_key(pick()),
+        'add': lambda: api.add_license(expiry="30", level="1", amount=1),
+        'delete': delete_key,
+        'resethwid': lambda: api.reset_hwid_by_key(pick()),
+    }
+    if scenario != 'mixed':
+        return operations[scenario]
+    
+    # tipikus admin forgalom: főleg lekérdezés, néha írás
+    weighted = ['verify'] * 6 + ['info'] * 2 + ['resethwid', 'add']
+    return lambda: operations[random.choice(weighted)]()
+
+async def run_level(operation: Callable, total: int, concurrency: int):
+    latencies: List[float] = []
+    failures = 0
+    remaining = total
+    
+    async def worker():
+        nonlocal remaining, failures
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            result = await operation()
+            latencies.append(time.perf_counter() - started)
+            if not result.get('success'):
+                failures += 1
+    
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, failures, time.perf_counter() - started
+
+async def run_benchmark(args):
+    stub_config: StubConfig = stub_config_from_args(args)
+    stub, runner, api_url = await start_stub(stub_config)
+    seeded = stub.seed_licenses(args.keys)
+    
+    if not args.client_limits:
+        # a kliens oldali limiter/breaker a stub-ot mérné, nem a klienst
+        for name in Keygen.RATE_LIMIT_CONFIG:
+            Keygen.RATE_LIMIT_CONFIG[name] = (0, 1)
+        Keygen.BREAKER_CONFIG['failure_threshold'] = 10 ** 9
+        Keygen.SCHEDULER_CONFIG['concurrency'] = 0
+    if args.no_cache:
+        Keygen.CACHE_CONFIG['max_entries'] = 0
+    Keygen.RETRY_CONFIG['base_delay'] = args.retry_base_delay
+    
+    print(f"scenario={args.scenario} requests/level={args.requests} stub latency={stub_config.latency_ms}ms "
+          f"errors={stub_config.error_rate:.0%} 429={stub_config.rate_limit_rate:.0%} "
+          f"plain={stub_config.plain_text_rate:.0%} cache={'off' if args.no_cache else 'on'}")
+    print(f"{'conc':>6}{'rps':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fail':>7}{'upstream':>10}{'reuse':>8}")
+    
+    try:
+        for concurrency in args.concurrency:
+            api = Keygen.KeyAuthAPI(stub_config.seller_key, api_url)
+            await api.open()
+            stub.stats.requests = 0
+            operation = build_operation(api, args.scenario, list(seeded))
+            latencies, failures, elapsed = await run_level(operation, args.requests, concurrency)
+            pool = api.get_pool_stats()
+            print(f"{concurrency:>6}{len(latencies) / elapsed:>10.0f}"
+                  f"{percentile(latencies, 50) * 1000:>10.2f}{percentile(latencies, 95) * 1000:>10.2f}"
+                  f"{percentile(latencies, 99) * 1000:>10.2f}{failures:>7}{stub.stats.requests:>10}"
+                  f"{pool['reuse_ratio']:>8.0%}")
+            await api.close()
+        if args.verbose:
+            print(f"mean latency last level: {statistics.mean(latencies) * 1000:.2f} ms")
+    finally:
+        await runner.cleanup()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scenario', choices=SCENARIOS, default='mixed')
+    parser.add_argument('--requests', type=int, default=1000, help="requests per concurrency level")
+    parser.add_argument('--concurrency', default="1,4,16,64",
+                        type=lambda value: [int(v) for v in value.split(',')])
+    parser.add_argument('--keys', type=int, default=500, help="licenses seeded into the stub")
+    parser.add_argument('--no-cache', action='store_true', help="disable the response cache")
+    parser.add_argument('--client-limits', action='store_true',
+                        help="keep the client rate limiter, circuit breaker and scheduler enabled")
+    parser.add_argument('--retry-base-delay', type=float, default=0.05)
+    parser.add_argument('--verbose', action='store_true')
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    
+    logging.getLogger("corvus").setLevel(logging.DEBUG if args.verbose else logging.CRITICAL)
+    asyncio.run(run_benchmark(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Local key generator throughput: legacy per-key random.choices vs. the batched
+CSPRNG generator, with and without the issued-key index (set / Bloom filter).
+
+    python benchmarks/bench_keygen.py [--sizes 10000,100000,1000000]
+"""
+import argparse
+import os
+import random
+import string
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from Keygen import IssuedKeyIndex, generate_corvus_keys  # noqa: E402
+
+def legacy_generate(amount: int):
+    """The original generate_corvus_key loop (global non-cryptographic PRNG, one key at a time)"""
+    keys = []
+    for _ in range(amount):
+        parts = [
+            'Corvus',
+            ''.join(random.choices(string.ascii_uppercase + string.digits, k=4)),
+            ''.join(random.choices(string.ascii_uppercase + string.digits, k=4)),
+            ''.join(random.choices(string.ascii_uppercase + string.digits, k=3))
+        ]
+        keys.append('-'.join(parts))
+    return keys
+
+def measure(func, amount: int) -> float:
+    started = time.perf_counter()
+    keys = func(amount)
+    elapsed = time.perf_counter() - started
+    assert len(keys) == amount
+    return amount / elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default="10000,100000,1000000",
+                        type=lambda value: [int(v) for v in value.split(',')])
+    parser.add_argument('--preloaded', type=int, default=100000,
+                        help="keys already in the issued index before generating")
+    args = parser.parse_args()
+    
+    variants = {
+        'legacy': lambda n: legacy_generate(n),
+        'batch': lambda n: generate_corvus_keys(n),
+        'batch+set': None,
+        'batch+bloom': None,
+    }
+    
+    print(f"keys/second (issued index preloaded with {args.preloaded} keys)")
+    print(f"{'size':>9}" + "".join(f"{name:>14}" for name in variants))
+    for size in args.sizes:
+        row = []
+        for name, func in variants.items():
+            if name in ('batch+set', 'batch+bloom'):
+                index = IssuedKeyIndex('bloom' if name.endswith('bloom') else 'set',
+                                       capacity=size + args.preloaded)
+                index.update(generate_corvus_keys(args.preloaded))
+                func = lambda n, index=index: generate_corvus_keys(n, index)  # noqa: E731
+            row.append(measure(func, size))
+        print(f"{size:>9}" + "".join(f"{rate:>14,.0f}" for rate in row))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+Local stub of the KeyAuth seller endpoint (add, del, resetuser, verify, fetchuser,
+fetchallkeys, fetchallusers).
+
+Keeps an in-memory license store and can inject latency, 5xx errors, 429s and
+plain-text replies so KeyAuthAPI can be measured without touching keyauth.win.
+
+    python benchmarks/stub_server.py --port 8780 --latency-ms 40 --error-rate 0.02
+
+Point the bot at it with api_url = http://127.0.0.1:8780/api/seller/
+"""
+import argparse
+import asyncio
+import random
+import string
+import time
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+from aiohttp import web
+
+@dataclass
+class StubConfig:
+    seller_key: str = "stub-seller-key"
+    latency_ms: float = 0.0         # átlagos késleltetés
+    jitter_ms: float = 0.0          # +/- egyenletes zaj
+    error_rate: float = 0.0         # 5xx válaszok aránya
+    rate_limit_rate: float = 0.0    # 429 válaszok aránya
+    plain_text_rate: float = 0.0    # JSON helyett sima szöveg aránya
+    retry_after: Optional[float] = None
+    seed: Optional[int] = None
+
+@dataclass
+class StubStats:
+    requests: int = 0
+    by_action: Dict[str, int] = field(default_factory=dict)
+    errors: int = 0
+    rate_limited: int = 0
+    plain_text: int = 0
+
+class StubKeyAuth:
+    def __init__(self, config: StubConfig):
+        self.config = config
+        self.random = random.Random(config.seed)
+        self.licenses: Dict[str, Dict[str, Any]] = {}
+        self.stats = StubStats()
+    
+    def _fill_mask(self, mask: str) -> str:
+        alphabet = string.ascii_uppercase + string.digits
+        return ''.join(self.random.choice(alphabet) if ch == '*' else ch for ch in mask)
+    
+    def seed_licenses(self, count: int, mask: str = "Corvus-****-****-***", level: str = "1", expiry: str = "30"):
+        """Pre-populate the store, returns the created keys"""
+        keys = []
+        for _ in range(count):
+            key = self._fill_mask(mask)
+            self.licenses[key] = self._new_license(key, level, expiry)
+            keys.append(key)
+        return keys
+    
+    def _new_license(self, key: str, level: str, expiry: str) -> Dict[str, Any]:
+        return {
+            'key': key,
+            'level': level,
+            'expiry': expiry,
+            'status': 'Not Used',
+            'used': 0,
+            'hwid': '',
+            'owner': '',
+            'banned': False,
+            'created': int(time.time()),
+        }
+    
+    # Akciók: (success, message, extra mezők)
+    
+    def action_add(self, query) -> Tuple[bool, str, Dict[str, Any]]:
+        amount = max(1, int(query.get('amount', '1')))
+        mask = query.get('mask') or "******-******-******"
+        keys = []
+        for _ in range(amount):
+            key = self._fill_mask(mask)
+            self.licenses[key] = self._new_license(key, query.get('level', '1'), query.get('expiry', '1'))
+            keys.append(key)
+        if amount == 1:
+            return True, "License created", {'key': keys[0]}
+        return True, "Licenses created", {'keys': keys}
+    
+    def action_del(self, query):
+        if self.licenses.pop(query.get('key', ''), None) is None:
+            return False, "Key not found.", {}
+        return True, "Successfully deleted license", {}
+    
+    def action_resetuser(self, query):
+        license_info = self.licenses.get(query.get('user', ''))
+        if license_info is None:
+            return False, "User not found.", {}
+        license_info['hwid'] = ''
+        return True, "Successfully reset user", {}
+    
+    def action_verify(self, query):
+        license_info = self.licenses.get(query.get('key', ''))
+        if license_info is None:
+            return False, "Key not found.", {}
+        return True, "Key verified", {
+            k: license_info[k] for k in ('key', 'level', 'expiry', 'status', 'used')
+        }
+    
+    def action_fetchuser(self, query):
+        license_info = self.licenses.get(query.get('user', ''))
+        if license_info is None or not license_info['owner']:
+            return False, "User not found.", {}
+        return True, "Successfully retrieved user", {
+            k: license_info[k] for k in ('owner', 'hwid', 'banned', 'level', 'expiry')
+        }
+    
+    def action_fetchallkeys(self, query):
+        return True, "Successfully retrieved licenses", {'keys': [
+            {
+                'key': info['key'],
+                'level': info['level'],
+                # a valódi seller API másodpercben adja vissza
+                'expires': str(int(float(info['expiry']) * 86400)),
+                'status': info['status'],
+                'usedby': info['owner'] or None,
+                'banned': info['banned'] or None,
+                'note': None,
+                'genby': 'stub',
+                'gendate': info['created'],
+            }
+            for info in self.licenses.values()
+        ]}
+    
+    def action_fetchallusers(self, query):
+        return True, "Successfully retrieved users", {'users': [
+            {'username': info['owner'], 'hwid': info['hwid'], 'banned': info['banned']}
+            for info in self.licenses.values() if info['owner']
+        ]}
+    
+    async def handle(self, request: web.Request) -> web.Response:
+        config = self.config
+        query = request.query
+        action = query.get('type', '')
+        self.stats.requests += 1
+        self.stats.by_action[action] = self.stats.by_action.get(action, 0) + 1
+        
+        if config.latency_ms or config.jitter_ms:
+            delay = config.latency_ms + self.random.uniform(-config.jitter_ms, config.jitter_ms)
+            await asyncio.sleep(max(0.0, delay) / 1000)
+        
+        if config.rate_limit_rate and self.random.random() < config.rate_limit_rate:
+            self.stats.rate_limited += 1
+            headers = {'Retry-After': str(config.retry_after)} if config.retry_after is not None else {}
+            return web.Response(status=429, text="Too many requests", headers=headers)
+        if config.error_rate and self.random.random() < config.error_rate:
+            self.stats.errors += 1
+            return web.Response(status=502, text="Bad gateway")
+        if query.get('sellerkey') != config.seller_key:
+            return web.json_response({'success': False, 'message': "Seller key is invalid."})
+        
+        handler = getattr(self, f"action_{action}", None)
+        if handler is None:
+            return web.json_response({'success': False, 'message': "Unhandled Type"})
+        success, message, extra = handler(query)
+        
+        if config.plain_text_rate and self.random.random() < config.plain_text_rate:
+            self.stats.plain_text += 1
+            if action == 'add' and success:
+                return web.Response(text=' '.join(extra.get('keys') or [extra['key']]))
+            return web.Response(text=message)
+        return web.json_response({'success': success, 'message': message, **extra})
+    
+    def create_app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get('/api/seller/', self.handle)
+        app.router.add_get('/api/seller', self.handle)
+        return app
+
+async def start_stub(config: StubConfig, host: str = "127.0.0.1", port: int = 0):
+    """Start the stub in the running loop; returns (stub, runner, api_url)"""
+    stub = StubKeyAuth(config)
+    runner = web.AppRunner(stub.create_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = site._server.sockets[0].getsockname()[1]
+    return stub, runner, f"http://{host}:{bound_port}/api/seller/"
+
+def add_stub_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--jitter-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of 502 replies")
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help="fraction of 429 replies")
+    parser.add_argument('--plain-text-rate', type=float, default=0.0, help="fraction of plain-text replies")
+    parser.add_argument('--retry-after', type=float, default=None, help="Retry-After header on 429s")
+    parser.add_argument('--seed', type=int, default=None)
+
+def stub_config_from_args(args) -> StubConfig:
+    return StubConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        plain_text_rate=args.plain_text_rate,
+        retry_after=args.retry_after,
+        seed=args.seed,
+    )
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default="127.0.0.1")
+    parser.add_argument('--port', type=int, default=8780)
+    parser.add_argument('--seller-key', default="stub-seller-key")
+    parser.add_argument('--seed-licenses', type=int, default=0, help="pre-populate N licenses")
+    add_stub_arguments(parser)
+    args = parser.parse_args()
+    
+    config = stub_config_from_args(args)
+    config.seller_key = args.seller_key
+    stub = StubKeyAuth(config)
+    if args.seed_licenses:
+        stub.seed_licenses(args.seed_licenses)
+    print(f"KeyAuth stub listening on http://{args.host}:{args.port}/api/seller/ (seller key: {args.seller_key})")
+    web.run_app(stub.create_app(), host=args.host, port=args.port, access_log=None, print=None)
+
+if __name__ == "__main__":
+    main()
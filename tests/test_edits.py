@@ -0,0 +1,54 @@
+"""
+EditScheduler tests: per-message and per-channel state must not outlive the edits that need it.
+
+    python -m pytest -q tests
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import Keygen  # noqa: E402
+
+class Channel:
+    def __init__(self, id):
+        self.id = id
+
+class Message:
+    def __init__(self, id, channel_id):
+        self.id = id
+        self.channel = Channel(channel_id)
+        self.edits = []
+    
+    async def edit(self, **payload):
+        self.edits.append(payload)
+        return self
+
+def test_idle_channel_buckets_and_locks_are_dropped():
+    async def scenario():
+        scheduler = Keygen.EditScheduler(0, 100.0, 2)
+        messages = [Message(i, 1000 + i) for i in range(200)]
+        for message in messages:
+            scheduler.submit(message, content='progress')
+        await asyncio.gather(*(scheduler.final(message, content='done') for message in messages))
+        assert all(message.edits[-1] == {'content': 'done'} for message in messages)
+        assert not scheduler._locks and not scheduler._lock_users and not scheduler._bucket_users
+        
+        await asyncio.sleep(0.05)  # 2 token / 100 per mp alatt minden bucket újratöltődik
+        await scheduler.final(Message(999, 1), content='done')
+        assert list(scheduler._buckets) == [1]
+    
+    asyncio.run(scenario())
+
+def test_busy_bucket_is_kept_and_still_limits():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        scheduler = Keygen.EditScheduler(0, 20.0, 1)
+        started = loop.time()
+        await asyncio.gather(*(scheduler.final(Message(i, 7), content='done') for i in range(4)))
+        # 1 burst + 3 token 20/mp mellett: legalább 0.15 mp
+        assert loop.time() - started >= 0.14
+        assert list(scheduler._buckets) == [7]
+    
+    asyncio.run(scenario())
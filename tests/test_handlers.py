@@ -0,0 +1,43 @@
+"""
+Slash command handler tests: callbacks keep their options and record discord_handler_duration_seconds.
+
+    python -m pytest -q tests
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import Keygen  # noqa: E402
+
+def handler_count(kind: str, handler: str) -> int:
+    series = Keygen.metrics._values.get('discord_handler_duration_seconds', {})
+    hist = series.get(tuple(sorted({'kind': kind, 'handler': handler}.items())))
+    return hist[2] if hist else 0
+
+def test_timed_slash_commands_keep_their_options():
+    commands = {command.qualified_name: command for command in Keygen.bot.tree.walk_commands()
+                if isinstance(command, Keygen.app_commands.Command)}
+    assert {'menu', 'generate', 'delete', 'info', 'export', 'job list', 'job cancel'} <= set(commands)
+    assert [p.name for p in commands['delete'].parameters] == ['key', 'delete_user']
+    assert [p.name for p in commands['export'].parameters][:2] == ['fmt', 'level']
+    assert commands['job info'].checks  # admin_only_view a burkolt callbacken is megmarad
+
+def test_slash_callback_records_duration():
+    class Response:
+        async def send_message(self, *args, **kwargs):
+            raise RuntimeError("interaction failed")
+    
+    class Interaction:
+        response = Response()
+    
+    before = handler_count('app_command', 'job list')
+    jobs, Keygen.bot.jobs = Keygen.bot.jobs, None
+    try:
+        asyncio.run(Keygen.slash_job_list.callback(Interaction()))
+    except RuntimeError:
+        pass  # a hibás kezelő ideje is számít
+    finally:
+        Keygen.bot.jobs = jobs
+    assert handler_count('app_command', 'job list') == before + 1
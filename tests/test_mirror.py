@@ -0,0 +1,89 @@
+"""
+License mirror tests against the local stub seller server (expiry units, export filters, streaming).
+
+    python -m pytest -q tests
+"""
+import asyncio
+import json
+import os
+import random
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+
+import Keygen  # noqa: E402
+from stub_server import StubConfig, start_stub  # noqa: E402
+
+EXPIRIES = ("1", "7", "30", "90")
+
+def test_sync_stores_days_and_export_filters_match(tmp_path):
+    async def scenario():
+        stub, runner, api_url = await start_stub(StubConfig(seed=1))
+        expected = {}
+        for expiry in EXPIRIES:
+            for key in stub.seed_licenses(5, expiry=expiry):
+                expected[key] = expiry
+        api = Keygen.KeyAuthAPI(StubConfig.seller_key, api_url)
+        mirror = Keygen.LicenseMirror(str(tmp_path / "mirror.db"))
+        try:
+            await api.open()
+            await mirror.open()
+            await mirror.sync(api)
+            
+            row = await mirror.get(next(iter(expected)))
+            assert row['expiry'] == expected[row['key']]
+            
+            export_filter = Keygen.ExportFilter(min_days=7, max_days=30)
+            pages = Keygen.mirror_license_pages(mirror, export_filter, 3)
+            total = await pages.__anext__()
+            exported = {row['key']: row['expiry'] async for page in pages for row in page}
+            assert total == len(exported) == 10
+            assert exported == {key: expiry for key, expiry in expected.items() if expiry in ("7", "30")}
+            assert all(export_filter.matches({'expiry': expiry}) for expiry in exported.values())
+        finally:
+            await mirror.close()
+            await api.close()
+            await runner.cleanup()
+    
+    asyncio.run(scenario())
+
+def test_json_array_stream_any_chunking():
+    body = json.dumps({'success': True, 'message': 'ok', 'keys': [
+        {'key': f'KEY-{i}', 'level': '1', 'expires': str(i * 86400), 'note': 'a "quoted" \\ value'}
+        for i in range(50)
+    ], 'count': 50})
+    rng = random.Random(7)
+    for _ in range(20):
+        parser = Keygen.JsonArrayStream('keys')
+        items, pos = [], 0
+        while pos < len(body):
+            step = rng.randint(1, 40)
+            items += parser.feed(body[pos:pos + step])
+            pos += step
+        items += parser.feed('', eof=True)
+        assert parser.complete
+        assert items == json.loads(body)['keys']
+        assert parser.fields == {'success': True, 'message': 'ok', 'count': 50}
+
+def test_api_export_streams_all_licenses():
+    async def scenario():
+        stub, runner, api_url = await start_stub(StubConfig(seed=2))
+        keys = set(stub.seed_licenses(25, expiry="7"))
+        api = Keygen.KeyAuthAPI(StubConfig.seller_key, api_url)
+        try:
+            await api.open()
+            pages = Keygen.api_license_pages(api, 4)
+            assert await pages.__anext__() is None
+            sizes, exported = [], {}
+            async for page in pages:
+                sizes.append(len(page))
+                exported.update((row['key'], row['expiry']) for row in page)
+            assert exported == {key: "7" for key in keys}
+            assert max(sizes) <= 4
+        finally:
+            await api.close()
+            await runner.cleanup()
+    
+    asyncio.run(scenario())
@@ -0,0 +1,50 @@
+"""
+Paginated embed regression tests: every line must be shown whole, on some page.
+
+    python -m pytest -q tests
+"""
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import discord  # noqa: E402
+import Keygen  # noqa: E402
+
+def rendered_lines(view: Keygen.PaginatorView) -> list:
+    lines = []
+    for page in range(view.page_count):
+        view.page = page
+        value = view.render().fields[0].value
+        assert len(value) <= Keygen.FIELD_VALUE_LIMIT
+        lines.extend(value.split("\n"))
+    return lines
+
+def test_full_page_of_long_error_lines_is_not_cut():
+    async def scenario():
+        results = [(f"Corvus-{n:04d}-ABCDEFGHIJKLMNOPQRSTUVWXYZ", False, "Invalid license key format " * 3)
+                   for n in range(40)]
+        view = Keygen.paginated_lines_view(
+            lambda: discord.Embed(title="Batch"), "Results", results, format_line=Keygen.batch_result_line
+        )
+        assert rendered_lines(view) == [Keygen.batch_result_line(result) for result in results]
+        assert view.page_count > 40 // 15 + 1
+    
+    asyncio.run(scenario())
+
+def test_short_lines_keep_per_page():
+    async def scenario():
+        keys = [f"Corvus-{n:04d}-AAAA-BBB" for n in range(45)]
+        view = Keygen.paginated_lines_view(lambda: discord.Embed(title="Keys"), "Keys", keys, per_page=15)
+        assert view.page_starts == [0, 15, 30]
+        assert rendered_lines(view) == keys
+    
+    asyncio.run(scenario())
+
+def test_empty_list_has_one_page():
+    async def scenario():
+        view = Keygen.paginated_lines_view(lambda: discord.Embed(title="Keys"), "Keys", [])
+        assert view.page_count == 1 and view.render().fields[0].value == "-"
+    
+    asyncio.run(scenario())
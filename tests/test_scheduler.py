@@ -0,0 +1,172 @@
+"""
+RequestScheduler / KeyAuthAPI regression tests: deadlines must not leak slots or cut shared reads short.
+
+    python -m pytest -q tests
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import Keygen  # noqa: E402
+
+def idle(scheduler: Keygen.RequestScheduler) -> bool:
+    return not any(scheduler.active.values()) and not any(scheduler.depth(p) for p in Keygen.PRIORITY_CLASSES)
+
+def test_deadline_firing_as_slot_is_granted_releases_it():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        scheduler = Keygen.RequestScheduler(1, 1)
+        scheduler.active['interactive'] = 1  # egyetlen slot, foglalt
+        
+        deadline = loop.time() + 0.05
+        async def waiter():
+            async with scheduler.slot('interactive', 1, 1, deadline):
+                pass
+        task = asyncio.create_task(waiter())
+        await asyncio.sleep(0)
+        assert scheduler.depth('interactive') == 1
+        
+        # a slot átadása és a határidő ugyanabban a loop körben fut le
+        loop.call_at(deadline - 0.02, scheduler._release, 'interactive')
+        time.sleep(0.1)
+        try:
+            await task
+        except TimeoutError:
+            pass
+        await asyncio.sleep(0)
+        assert idle(scheduler), scheduler.active
+        
+        async with asyncio.timeout(1):
+            async with scheduler.slot('interactive'):
+                pass
+    
+    asyncio.run(scenario())
+
+def test_deadline_while_queued_leaves_no_waiter():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        scheduler = Keygen.RequestScheduler(1, 1)
+        async with scheduler.slot('interactive'):
+            try:
+                async with scheduler.slot('bulk', 1, 1, loop.time() + 0.01):
+                    raise AssertionError("slot granted while the only one is held")
+            except TimeoutError:
+                pass
+            assert scheduler.depth('bulk') == 0
+        assert idle(scheduler)
+    
+    asyncio.run(scenario())
+
+def test_backoff_does_not_hold_the_slot():
+    from aiohttp import web
+    
+    async def handle(request: web.Request) -> web.Response:
+        if request.query.get('key') == 'throttled':
+            return web.Response(status=429, text="Too many requests", headers={'Retry-After': '0.4'})
+        return web.json_response({'success': True, 'message': "Key verified"})
+    
+    async def scenario():
+        app = web.Application()
+        app.router.add_get('/api/seller/', handle)
+        app.router.add_get('/api/seller', handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        api = Keygen.KeyAuthAPI("seller", f"http://127.0.0.1:{port}/api/seller/")
+        api.scheduler = Keygen.RequestScheduler(1, 1)
+        api.rate_limiters = {name: Keygen.TokenBucket(0, 1) for name in api.rate_limiters}
+        
+        async def call(guild_id: int, key: str):
+            Keygen.bind_request_context(guild_id, guild_id)
+            started = time.monotonic()
+            result = await api.make_request('verify', {'key': key})
+            return result, time.monotonic() - started
+        
+        try:
+            await api.open()
+            throttled = asyncio.create_task(call(1, 'throttled'))
+            await asyncio.sleep(0.1)  # az első 429 után már backoffban van
+            result, elapsed = await call(2, 'other')
+            assert result['success'] and elapsed < 0.3, (result, elapsed)
+            assert not (await throttled)[0]['success']
+            assert idle(api.scheduler)
+        finally:
+            await api.close()
+            await runner.cleanup()
+    
+    asyncio.run(scenario())
+
+def start_slow_api(delay: float):
+    from aiohttp import web
+    
+    calls = []
+    async def handle(request: web.Request) -> web.Response:
+        calls.append(request.query.get('key'))
+        await asyncio.sleep(delay)
+        return web.json_response({'success': True, 'message': "Key verified"})
+    
+    async def start():
+        app = web.Application()
+        app.router.add_get('/api/seller/', handle)
+        app.router.add_get('/api/seller', handle)
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        api = Keygen.KeyAuthAPI("seller", f"http://127.0.0.1:{port}/api/seller/")
+        api.rate_limiters = {name: Keygen.TokenBucket(0, 1) for name in api.rate_limiters}
+        await api.open()
+        return api, runner, calls
+    return start()
+
+def test_coalesced_read_outlives_the_first_callers_deadline():
+    async def scenario():
+        api, runner, calls = await start_slow_api(0.3)
+        
+        async def call(deadline: float):
+            Keygen.bind_request_context(1, 1, None, time.monotonic() + deadline)
+            return await api.make_request('verify', {'key': 'shared'})
+        
+        try:
+            short = asyncio.create_task(call(0.1))
+            await asyncio.sleep(0.02)
+            first, second = await asyncio.gather(short, call(2.0))
+            assert not first['success'] and second['success'], (first, second)
+            assert calls == ['shared'] and api.flight_stats['coalesced'] == 1
+            assert not api._inflight and idle(api.scheduler)
+        finally:
+            await api.close()
+            await runner.cleanup()
+    
+    asyncio.run(scenario())
+
+def test_urgent_read_does_not_join_a_bulk_flight():
+    async def scenario():
+        api, runner, calls = await start_slow_api(0.1)
+        
+        async def call(priority: str):
+            Keygen.bind_request_context(1, 1, priority)
+            return await api.make_request('verify', {'key': 'shared'})
+        
+        try:
+            bulk = asyncio.create_task(call('bulk'))
+            await asyncio.sleep(0.02)
+            interactive = asyncio.create_task(call('interactive'))
+            await asyncio.sleep(0.02)
+            later = asyncio.create_task(call('write'))
+            results = await asyncio.gather(bulk, interactive, later)
+            assert all(result['success'] for result in results)
+            # a write a már futó interactive híváshoz csatlakozik
+            assert len(calls) == 2 and api.flight_stats['coalesced'] == 1
+            assert not api._inflight
+        finally:
+            await api.close()
+            await runner.cleanup()
+    
+    asyncio.run(scenario())